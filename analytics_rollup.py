@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+GmarUp Analytics Rollup - צבירת אירועי אנליטיקס לדליים של דקה/שעה/יום
+
+job ברקע מחשב מחדש את הדליים שנפתחו מאז ה-watermark האחרון (לפי
+category, action, label, url, כולל ספירת sessions ייחודיים), ומוציא אירועים
+גולמיים ישנים מהמסד החם באצוות קטנות כדי לא להחזיק את נעילת הכתיבה לאורך זמן -
+לארכיון החודשי (archive.py) יחד עם לוגי הפעילות, או מחיקה אם אין ארכיון.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from archive import TABLES as ARCHIVE_TABLES
+
+logger = logging.getLogger(__name__)
+
+# גרנולריות -> אורך ה-prefix של created_at (ISO) שמגדיר את הדלי
+GRANULARITIES = {
+    'minute': 16,   # 2026-10-18T12:34
+    'hour': 13,     # 2026-10-18T12
+    'day': 10,      # 2026-10-18
+}
+
+WATERMARK_KEY = 'analytics_rollup_watermark'
+
+# אירועים נכנסים דרך תור הכתיבה - מחשבים מחדש גם כמה דקות אחורה
+LATE_ARRIVAL = timedelta(minutes=5)
+
+# דלי יומי מחושב מחדש מהאירועים הגולמיים, לכן הם חייבים להישמר לפחות יומיים
+MIN_RETENTION_DAYS = 2
+
+
+class AnalyticsRollup:
+    def __init__(self, connection, retention_days=30, interval=60.0,
+                 prune_batch_size=500, prune_pause=0.05, archive=None):
+        self.connection = connection
+        self.archive = archive
+        self.retention_days = max(retention_days, MIN_RETENTION_DAYS)
+        self.interval = interval
+        self.prune_batch_size = prune_batch_size
+        self.prune_pause = prune_pause
+
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_run = None
+        self.last_pruned = 0
+
+    # --- צבירה ---
+
+    def _watermark(self, conn):
+        row = conn.execute('SELECT value FROM job_state WHERE name = ?', (WATERMARK_KEY,)).fetchone()
+        if row:
+            return row[0]
+        row = conn.execute('SELECT MIN(created_at) FROM analytics').fetchone()
+        return row[0]
+
+    def run_once(self, now=None):
+        """מחשב מחדש את כל הדליים שהתחילו מה-watermark ואילך"""
+        now = now or datetime.now()
+        with self.connection() as conn:
+            watermark = self._watermark(conn)
+            if watermark is None:
+                return 0
+
+            # טרנזקציה אחת - הדשבורד לא יראה דליים חצי-מחושבים
+            conn.execute('BEGIN IMMEDIATE')
+            written = 0
+            for granularity, length in GRANULARITIES.items():
+                start = watermark[:length]
+                conn.execute(
+                    'DELETE FROM analytics_rollup WHERE granularity = ? AND bucket >= ?',
+                    (granularity, start)
+                )
+                cursor = conn.execute(f'''
+                    INSERT INTO analytics_rollup
+                        (granularity, bucket, category, action, label, url, events, sessions)
+                    SELECT ?, substr(created_at, 1, {length}),
+                           COALESCE(category, ''), COALESCE(action, ''),
+                           COALESCE(label, ''), COALESCE(url, ''),
+                           COUNT(*), COUNT(DISTINCT session_id)
+                    FROM analytics
+                    WHERE created_at >= ?
+                    GROUP BY 2, 3, 4, 5, 6
+                ''', (granularity, start))
+                written += cursor.rowcount
+
+            next_watermark = (now - LATE_ARRIVAL).isoformat()
+            if next_watermark > watermark:
+                conn.execute('''
+                    INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                ''', (WATERMARK_KEY, next_watermark, now.isoformat()))
+
+        self.last_run = now.isoformat()
+        return written
+
+    # --- ניקוי אירועים גולמיים ---
+
+    def prune(self, now=None):
+        """מוציא מהמסד החם אירועים ישנים מחלון השמירה, באצוות קטנות עם הפסקה ביניהן"""
+        now = now or datetime.now()
+        retention_cutoff = (now - timedelta(days=self.retention_days)).isoformat()
+        with self.connection() as conn:
+            watermark = self._watermark(conn)
+
+        # לעולם לא מוחקים אירועים שהדלי היומי שלהם עוד עשוי להיות מחושב מחדש;
+        # בלי watermark אין עדיין אירועי אנליטיקס - לוגי הפעילות עוברים בכל זאת
+        cutoff = min(retention_cutoff, watermark[:10]) if watermark is not None else None
+
+        if self.archive is not None:
+            moved = 0
+            for table in ARCHIVE_TABLES:
+                table_cutoff = cutoff if table == 'analytics' else retention_cutoff
+                if table_cutoff is not None:
+                    moved += self.archive.move(self.connection, table, table_cutoff, self._stop)
+            self.last_pruned = moved
+            return moved
+
+        if cutoff is None:
+            return 0
+
+        deleted = 0
+        while not self._stop.is_set():
+            with self.connection() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM analytics WHERE id IN (
+                        SELECT id FROM analytics WHERE created_at < ? ORDER BY created_at LIMIT ?
+                    )
+                ''', (cutoff, self.prune_batch_size))
+                batch = cursor.rowcount
+            deleted += batch
+            if batch < self.prune_batch_size:
+                break
+            time.sleep(self.prune_pause)
+
+        if deleted:
+            logger.info(f"🧹 נמחקו {deleted} אירועי אנליטיקס גולמיים ישנים מ-{cutoff[:10]}")
+        self.last_pruned = deleted
+        return deleted
+
+    # --- שאילתות ---
+
+    def trends(self, conn, start, end, granularity=None, category=None, action=None,
+               group_by=('category', 'action', 'label', 'url')):
+        """מגמות מטבלת ה-rollup לדליים בטווח [start, end] (כולל הדלי של end).
+
+        כשמקבצים לפי פחות מימדים, sessions הוא סכום הספירות הייחודיות של כל
+        צירוף - חסם עליון ולא ספירה מדויקת.
+        """
+        if granularity is None:
+            span = datetime.fromisoformat(end) - datetime.fromisoformat(start)
+            granularity = 'minute' if span <= timedelta(hours=6) else 'hour' if span <= timedelta(days=7) else 'day'
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'granularity לא מוכרת: {granularity}')
+        for dimension in group_by:
+            if dimension not in ('category', 'action', 'label', 'url'):
+                raise ValueError(f'מימד לא מוכר: {dimension}')
+
+        length = GRANULARITIES[granularity]
+        where = ['granularity = ?', 'bucket >= ?', 'bucket <= ?']
+        params = [granularity, start[:length], end[:length]]
+        if category:
+            where.append('category = ?')
+            params.append(category)
+        if action:
+            where.append('action = ?')
+            params.append(action)
+
+        columns = ', '.join(['bucket'] + list(group_by))
+        rows = conn.execute(f'''
+            SELECT {columns}, SUM(events) AS events, SUM(sessions) AS sessions
+            FROM analytics_rollup
+            WHERE {' AND '.join(where)}
+            GROUP BY {columns}
+            ORDER BY bucket
+        ''', params).fetchall()
+        return granularity, [dict(row) for row in rows]
+
+    # --- thread רקע ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.prune()
+            except Exception as e:
+                logger.error(f"❌ שגיאה בצבירת אנליטיקס: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='analytics-rollup', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+GmarUp Archive - מחיצות חודשיות לטבלאות הלוג (analytics, activity_log, donation_activity)
+
+שורות ישנות עוברות מ-leads.db לקובץ ארכיון לחודש שלהן (archive/2026-01.db),
+כך שהקובץ החם נשאר קטן - גיבויים מהירים, ו-page cache שמחזיק את מה שבאמת
+נקרא. קובצי הארכיון מחוברים רק לפי הצורך (ATTACH DATABASE) ושאילתות על טווח
+תאריכים רצות כ-UNION ALL על הטבלה החמה ועל החודשים שבטווח.
+
+ההעברה היא INSERT OR IGNORE לארכיון ואז DELETE מהטבלה החמה, באצוות קטנות.
+במצב WAL טרנזקציה על כמה קבצים לא אטומית בין הקבצים - אם התהליך נפל באמצע,
+הסבב הבא משלים את המחיקה (ה-id הוא המפתח בארכיון, אז אין כפילויות בו).
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# טבלאות שעוברות לארכיון - כולן append-only עם id ו-created_at
+TABLES = ('analytics', 'activity_log', 'donation_activity')
+
+_MONTH_FILE = re.compile(r'^(\d{4}-\d{2})\.db$')
+
+
+def _alias(month):
+    return 'archive_' + month.replace('-', '_')
+
+
+class Archive:
+    def __init__(self, directory, batch_size=500, pause=0.05):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.pause = pause
+        self.moved = {table: 0 for table in TABLES}
+
+    def path(self, month):
+        return os.path.join(self.directory, f'{month}.db')
+
+    def months(self, start=None, end=None):
+        """חודשים שיש להם קובץ ארכיון, לפי הסדר - רק החופפים ל-[start, end] אם ניתנו"""
+        if not os.path.isdir(self.directory):
+            return []
+        months = sorted(m.group(1) for m in map(_MONTH_FILE.match, os.listdir(self.directory)) if m)
+        if start:
+            months = [month for month in months if month >= start[:7]]
+        if end:
+            months = [month for month in months if month <= end[:7]]
+        return months
+
+    # --- ATTACH ---
+
+    @contextmanager
+    def attached(self, conn, months):
+        """מחבר את קובצי החודשים לחיבור ומנתק בסיום (ATTACH לא אפשרי בתוך טרנזקציה)"""
+        if conn.in_transaction:
+            conn.commit()
+        aliases = []
+        try:
+            for month in months:
+                alias = _alias(month)
+                conn.execute(f'ATTACH DATABASE ? AS {alias}', (self.path(month),))
+                aliases.append(alias)
+            yield aliases
+        finally:
+            if conn.in_transaction:
+                conn.commit()
+            for alias in aliases:
+                conn.execute(f'DETACH DATABASE {alias}')
+
+    def max_months_per_query(self, conn):
+        # main תופס מקום אחד מתוך מגבלת הקבצים המחוברים (ברירת מחדל 10)
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - 1
+
+    # --- שאילתות על כל המחיצות ---
+
+    def union_query(self, conn, table, columns, where='', params=(), aliases=(), include_main=True):
+        """(sql, params) - UNION ALL על המחיצות המחוברות ועל הטבלה החמה ('' אם אין אף אחת).
+
+        עמודה שנוספה לטבלה אחרי שקובץ ארכיון נוצר חוזרת ממנו כ-NULL.
+        """
+        arms, all_params = [], []
+        for schema in tuple(aliases) + (('main',) if include_main else ()):
+            existing = self._columns(conn, schema, table)
+            if not existing:
+                continue
+            select = ', '.join(column if column in existing else f'NULL AS {column}' for column in columns)
+            arm = f'SELECT {select} FROM {schema}.{table}'
+            if where:
+                arm += f' WHERE {where}'
+            arms.append(arm)
+            all_params.extend(params)
+        return ' UNION ALL '.join(arms), all_params
+
+    def query_parts(self, conn, start=None, end=None):
+        """חודשי הארכיון בטווח, מחולקים לקבוצות שנכנסות למגבלת ה-ATTACH - מהישנה לחדשה.
+
+        הטבלה החמה מצטרפת לקבוצה האחרונה, עם החודשים החדשים ביותר - לשם בדיוק
+        נוחתות שורות שהועברו לארכיון בזמן קריאה ארוכה.
+        """
+        months = self.months(start, end)
+        size = self.max_months_per_query(conn)
+        parts = []
+        while len(months) > size:
+            parts.insert(0, months[-size:])
+            months = months[:-size]
+        parts.insert(0, months)
+        return parts
+
+    def delete(self, conn, table, column, values):
+        """מוחק מכל קובצי הארכיון את שורות table עם column IN values (לוגים של רשומה שנמחקה).
+
+        ATTACH לא אפשרי בתוך טרנזקציה, ולכן מחיקה פתוחה בחיבור נשמרת (commit) קודם,
+        וכל קבוצת חודשים נמחקת בטרנזקציה משלה. מחזיר כמה שורות נמחקו.
+        """
+        values = list(values)
+        deleted = 0
+        for months in self.query_parts(conn) if values else []:
+            if not months:
+                continue
+            with self.attached(conn, months) as aliases:
+                for alias in aliases:
+                    if not self._columns(conn, alias, table):
+                        continue
+                    for start in range(0, len(values), self.batch_size):
+                        chunk = values[start:start + self.batch_size]
+                        deleted += conn.execute(
+                            f'DELETE FROM {alias}.{table} WHERE {column} IN ({",".join("?" for _ in chunk)})', chunk
+                        ).rowcount
+        return deleted
+
+    # --- העברה לארכיון ---
+
+    def _columns(self, conn, schema, table):
+        return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+    def _ensure_table(self, conn, alias, table):
+        """הטבלה בקובץ הארכיון - אותן עמודות, בלי אילוצים (אין שם registrations/donations)"""
+        columns = [(row[1], row[2]) for row in conn.execute(f'PRAGMA main.table_info({table})')]
+        existing = set(self._columns(conn, alias, table))
+        if not existing:
+            definitions = ', '.join(
+                f'{name} INTEGER PRIMARY KEY' if name == 'id' else f'{name} {kind}'
+                for name, kind in columns
+            )
+            conn.execute(f'CREATE TABLE {alias}.{table} ({definitions})')
+            conn.execute(f'CREATE INDEX {alias}.idx_{table}_created_at ON {table}(created_at)')
+        else:
+            for name, kind in columns:
+                if name not in existing:
+                    conn.execute(f'ALTER TABLE {alias}.{table} ADD COLUMN {name} {kind}')
+        conn.commit()
+        return [name for name, _ in columns]
+
+    def _oldest_month(self, connection, table, cutoff):
+        with connection() as conn:
+            row = conn.execute(f'SELECT MIN(created_at) FROM {table}').fetchone()
+        if row[0] is None or row[0] >= cutoff:
+            return None
+        return row[0][:7]
+
+    def move(self, connection, table, cutoff, stop=None):
+        """מעביר שורות עם created_at < cutoff מהטבלה החמה לארכיון החודשי. מחזיר כמה הועברו"""
+        os.makedirs(self.directory, exist_ok=True)
+        moved = 0
+        while stop is None or not stop.is_set():
+            month = self._oldest_month(connection, table, cutoff)
+            if month is None:
+                break
+            # עד סוף החודש או עד ה-cutoff, המוקדם מביניהם
+            year, mon = int(month[:4]), int(month[5:])
+            next_month = f'{year + mon // 12:04d}-{mon % 12 + 1:02d}'
+            until = min(cutoff, next_month)
+
+            with connection() as conn, self.attached(conn, [month]) as (alias,):
+                columns = ', '.join(self._ensure_table(conn, alias, table))
+                while stop is None or not stop.is_set():
+                    ids = [row[0] for row in conn.execute(
+                        f'SELECT id FROM main.{table} WHERE created_at < ? ORDER BY created_at LIMIT ?',
+                        (until, self.batch_size)
+                    )]
+                    if not ids:
+                        break
+                    marks = ','.join('?' for _ in ids)
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute(f'''
+                        INSERT OR IGNORE INTO {alias}.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE id IN ({marks})
+                    ''', ids)
+                    conn.execute(f'DELETE FROM main.{table} WHERE id IN ({marks})', ids)
+                    conn.commit()
+                    moved += len(ids)
+                    self.moved[table] += len(ids)
+                    if len(ids) < self.batch_size:
+                        break
+                    # הכותבים האחרים מקבלים את נעילת הכתיבה בין האצוות
+                    time.sleep(self.pause)
+
+        if moved:
+            logger.info(f"🗄️ הועברו {moved} שורות {table} לארכיון (לפני {cutoff[:10]})")
+        return moved
+
+    def stats(self):
+        return {'partitions': len(self.months()), 'moved': dict(self.moved)}
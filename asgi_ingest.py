@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+GmarUp ASGI Ingest - נקודות הקצה הציבוריות החמות על asyncio
+
+/api/register, /api/donate ו-/api/admin/actions (track_analytics) בלבד - עם אותה
+ולידציה ואותו SQL כמו server.py (ingest.py). חיבור פתוח של לקוח איטי במובייל
+עולה כאן coroutine ולא thread שלם: העבודה מול SQLite רצה ב-executor ייעודי
+עם pool חיבורים משלו, ולוגים/אנליטיקס נכתבים באצוות דרך תור הכתיבה.
+ה-API של האדמין נשאר באפליקציית ה-WSGI (server.py).
+
+הרצה (uvicorn אופציונלי), מאחורי reverse proxy שמפנה רק את שלושת הנתיבים:
+    pip install uvicorn
+    uvicorn asgi_ingest:app --host 0.0.0.0 --port 8081 --proxy-headers
+
+הגבלת הקצב (rate_limit.py) לפי IP הלקוח - מאחורי proxy צריך --proxy-headers.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import traceback
+from urllib.parse import parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+from db import ConnectionPool, DB_PATH
+from write_queue import WriteBehindQueue
+from rate_limit import MemoryBuckets
+import rate_limit
+import migrations
+import ingest
+
+logger = logging.getLogger(__name__)
+
+# threads שמבצעים את העבודה מול SQLite (כתיבה ממילא סדרתית - אין טעם ביותר)
+DB_WORKERS = int(os.environ.get('GMARUP_INGEST_DB_WORKERS', 4))
+
+# גוף בקשה גדול מזה נדחה עם 413 - הטפסים שלנו קטנים
+MAX_BODY_SIZE = 64 * 1024
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type, Idempotency-Key'),
+    (b'access-control-expose-headers', b'Idempotent-Replayed, Retry-After'),
+    (b'access-control-allow-methods', b'POST,OPTIONS'),
+]
+
+db = ConnectionPool(DB_PATH, max_size=DB_WORKERS)
+write_queue = WriteBehindQueue(db)
+executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='ingest-db')
+rate_limiter = rate_limit.from_env(DB_PATH)
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+# --- עזרי HTTP ---
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError('הלקוח התנתק')
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def parse_body(headers, body):
+    """JSON או form-urlencoded (כמו admin_actions ב-Flask). None אם לא ניתן לפענח"""
+    content_type = headers.get(b'content-type', b'').decode('latin-1')
+    if content_type.startswith('application/x-www-form-urlencoded'):
+        return dict(parse_qsl(body.decode('utf-8')))
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def send_json(send, payload, status=200, extra_headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+        ] + CORS_HEADERS + list(extra_headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def run_db(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+# --- עבודה מול המסד (רצה ב-executor) ---
+
+def _save_registration(data, ip_address, user_agent):
+    with db.connection() as conn:
+        reg_id, now, attempt_count = ingest.insert_registration(conn, data, ip_address, user_agent)
+    write_queue.enqueue(*ingest.registration_activity(reg_id, now, attempt_count))
+    return reg_id
+
+
+def _save_donation(data, ip_address, user_agent, key):
+    with db.connection() as conn:
+        return ingest.create_donation(conn, data, ip_address, user_agent, key)
+
+
+async def too_many_requests(*hits):
+    """(payload, 429, Retry-After) אם אחד הדליים ריק, אחרת None"""
+    if isinstance(rate_limiter.backend, MemoryBuckets):
+        retry_after = rate_limiter.check(*hits)
+    else:
+        # דליים ב-SQLite - לא חוסמים את ה-loop
+        retry_after = await run_db(rate_limiter.check, *hits)
+    if not retry_after:
+        return None
+    return (
+        {'success': False, 'error': f'יותר מדי בקשות - נסה שוב בעוד {retry_after} שניות'},
+        429,
+        [(b'retry-after', str(retry_after).encode('ascii'))],
+    )
+
+
+# --- handlers ---
+
+async def register(data, ip_address, user_agent, headers):
+    limited = await too_many_requests(('register', ip_address))
+    if limited:
+        return limited
+    try:
+        ingest.validate_registration(data)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+
+    reg_id = await run_db(_save_registration, data, ip_address, user_agent)
+    logger.info(f"✅ רישום חדש נשמר בהצלחה: {data.get('fullName')} - {data.get('email')}")
+    return {
+        'success': True,
+        'message': 'ברוך הבא למשפחת גמראפ! ההרשמה התקבלה בהצלחה',
+        'registration_id': reg_id
+    }, 200
+
+
+async def donate(data, ip_address, user_agent, headers):
+    limited = await too_many_requests(('donate', ip_address))
+    if limited:
+        return limited
+    try:
+        ingest.validate_donation(data)
+        key = ingest.idempotency_key(headers.get(b'idempotency-key', b'').decode('latin-1'))
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+
+    try:
+        body, replayed = await run_db(_save_donation, data, ip_address, user_agent, key)
+    except ingest.IdempotencyConflict:
+        return {'success': False, 'error': 'Idempotency-Key כבר שימש לתרומה אחרת'}, 422
+    if replayed:
+        logger.info(f"🔁 ניסיון חוזר לתרומה {body['donation_id']} - הוחזרה התשובה השמורה")
+        return body, 200, [(b'idempotent-replayed', b'true')]
+    logger.info(f"✅ תרומה חדשה נוצרה: {body['donation_id']} - ₪{data.get('amount', 0)}")
+    return body, 200
+
+
+async def admin_actions(data, ip_address, user_agent, headers):
+    data = data or {}
+    if data.get('action', '') != 'track_analytics':
+        return {'success': False, 'error': 'פעולה לא מוכרת'}, 400
+    limited = await too_many_requests(('track', ip_address), ('track_session', data.get('sessionId')))
+    if limited:
+        return limited
+    # put_nowait לתור בזיכרון - לא חוסם את ה-loop (רק כשהתור מלא נכתב סינכרונית)
+    write_queue.enqueue(*ingest.analytics_event(data, ip_address))
+    return {'success': True, 'message': 'Analytics tracked'}, 200
+
+
+ROUTES = {
+    '/api/register': (register, 'שגיאה בשמירת הרישום. אנא נסה שוב'),
+    '/api/donate': (donate, 'שגיאה ביצירת התרומה. אנא נסה שוב'),
+    '/api/admin/actions': (admin_actions, 'שגיאה בביצוע הפעולה'),
+}
+
+
+# --- אפליקציית ASGI ---
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await run_db(startup)
+            except Exception as e:
+                logger.error(f"❌ שגיאה באתחול מסד הנתונים: {e}")
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await run_db(shutdown)
+            executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def startup():
+    with db.connection() as conn:
+        migrations.migrate(conn, connection=db.connection)
+    logger.info(f"🚀 ingest מוכן ({DB_WORKERS} threads למסד הנתונים)")
+
+
+def shutdown():
+    write_queue.stop()
+    db.close_all()
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 200, 'headers': CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    route = ROUTES.get(scope['path'])
+    if route is None:
+        await send_json(send, {'success': False, 'error': 'נתיב לא קיים'}, 404)
+        return
+    if scope['method'] != 'POST':
+        await send_json(send, {'success': False, 'error': 'שיטה לא נתמכת'}, 405)
+        return
+
+    handler, error_message = route
+    headers = dict(scope['headers'])
+    client = scope.get('client')
+    ip_address = client[0] if client else None
+    user_agent = headers.get(b'user-agent', b'').decode('latin-1')
+
+    extra_headers = ()
+    try:
+        body = await read_body(receive)
+        # handler מחזיר (payload, status) או (payload, status, headers נוספים)
+        payload, status, *rest = await handler(parse_body(headers, body), ip_address, user_agent, headers)
+        if rest:
+            extra_headers = rest[0]
+    except ConnectionResetError:
+        return
+    except RequestTooLarge:
+        payload, status = {'success': False, 'error': 'הבקשה גדולה מדי'}, 413
+    except Exception as e:
+        logger.error(f"❌ שגיאה ב-{scope['path']}: {e}")
+        logger.error(traceback.format_exc())
+        payload, status = {'success': False, 'error': error_message}, 500
+
+    await send_json(send, payload, status, extra_headers)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+GmarUp Backup - גיבוי חי של leads.db דרך ה-backup API של SQLite
+
+הגיבוי מועתק בצעדים קטנים של דפים (Connection.backup עם pages) עם הפסקה קצרה
+בין הצעדים, כך שהשרת ממשיך לכתוב כרגיל. כל עותק נבדק ב-PRAGMA integrity_check,
+נדחס ל-gzip ונשמר ב-database/backups/leads-YYYYmmdd-HHMMSS.db.gz; נשמרים רק
+ה-N האחרונים. ה-job ברקע רץ רק כשההגדרה auto_backup_enabled פעילה.
+
+כתיבה למסד באמצע גיבוי מתחילה את ההעתקה מחדש (כך עובד ה-backup API); אחרי כמה
+התחלות מחדש עוברים לצעד אחד - snapshot עקבי שב-WAL לא חוסם כותבים.
+קובצי הארכיון החודשיים (archive.py) קרים ולא נכללים - מספיק להעתיק אותם כקבצים.
+
+הרצה ידנית:
+    python backup.py                        # גיבוי עכשיו
+    python backup.py --list
+    python backup.py --verify database/backups/leads-20261018-030000.db.gz
+    python backup.py --restore database/backups/leads-20261018-030000.db.gz   (עדיף כשהשרת כבוי)
+"""
+
+import os
+import sys
+import gzip
+import time
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from db import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(DB_PATH), 'backups')
+DEFAULT_KEEP = 14
+DEFAULT_INTERVAL_HOURS = 24
+
+# דפים לכל צעד והפסקה בין צעדים - נעילת הקריאה מוחזקת רק לצעד אחד
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.005
+# התחלות מחדש (כתיבות במקביל) לפני מעבר ל-snapshot בצעד אחד
+MAX_RESTARTS = 3
+
+FILE_PREFIX = 'leads-'
+FILE_SUFFIX = '.db.gz'
+
+
+class _Restarted(Exception):
+    pass
+
+
+def integrity_check(path):
+    """'ok' או תיאור הבעיה הראשונה"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('PRAGMA integrity_check').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+def _decompress(path, target):
+    with gzip.open(path, 'rb') as src, open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+class BackupManager:
+    def __init__(self, db_path, directory=DEFAULT_DIRECTORY, keep=DEFAULT_KEEP,
+                 interval_hours=DEFAULT_INTERVAL_HOURS, enabled=None, check_interval=300.0):
+        self.db_path = db_path
+        self.directory = directory
+        self.keep = keep
+        self.interval = interval_hours * 3600
+        # callable - האם הגיבוי האוטומטי פעיל (הגדרת auto_backup_enabled)
+        self.enabled = enabled or (lambda: True)
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.last = None
+        self.total = 0
+        self.failures = 0
+
+    # --- קבצים ---
+
+    def backups(self):
+        """נתיבי הגיבויים מהישן לחדש"""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)]
+        return sorted(paths, key=lambda path: (os.path.getmtime(path), path))
+
+    def rotate(self):
+        removed = []
+        for path in self.backups()[:-self.keep] if self.keep > 0 else []:
+            os.remove(path)
+            removed.append(path)
+        return removed
+
+    def due(self, now=None):
+        backups = self.backups()
+        if not backups:
+            return True
+        return (now or time.time()) - os.path.getmtime(backups[-1]) >= self.interval
+
+    # --- גיבוי ---
+
+    def _copy(self, target_path):
+        """העתקה בצעדים; מחזיר (דפים, התחלות מחדש)"""
+        source = sqlite3.connect(self.db_path, timeout=30)
+        state = {'remaining': None, 'restarts': 0, 'pages': 0}
+        try:
+            for single_step in (False, True):
+                target = sqlite3.connect(target_path)
+                state['remaining'] = None
+
+                def progress(status, remaining, total):
+                    if state['remaining'] is not None and remaining > state['remaining']:
+                        state['restarts'] += 1
+                        if not single_step and state['restarts'] > MAX_RESTARTS:
+                            raise _Restarted()
+                    state['remaining'], state['pages'] = remaining, total
+                    if remaining:
+                        time.sleep(STEP_PAUSE)
+
+                try:
+                    source.backup(target, pages=-1 if single_step else PAGES_PER_STEP, progress=progress)
+                    # העותק עומד בפני עצמו - בלי קובצי WAL לידו
+                    target.execute('PRAGMA journal_mode = DELETE')
+                    return state['pages'], state['restarts']
+                except _Restarted:
+                    logger.info("💾 כתיבות רבות במהלך הגיבוי - עובר ל-snapshot בצעד אחד")
+                finally:
+                    target.close()
+        finally:
+            source.close()
+
+    def backup_now(self):
+        """גיבוי מלא: העתקה, בדיקת שלמות, דחיסה ורוטציה. מחזיר מילון עם פרטי הגיבוי"""
+        with self._lock:
+            started = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = f'{datetime.now():%Y%m%d-%H%M%S}'
+            name = f'{FILE_PREFIX}{stamp}{FILE_SUFFIX}'
+            copy = 1
+            while os.path.exists(os.path.join(self.directory, name)):
+                # שני גיבויים באותה שנייה (למשל גיבוי לפני שחזור)
+                copy += 1
+                name = f'{FILE_PREFIX}{stamp}-{copy}{FILE_SUFFIX}'
+            path = os.path.join(self.directory, name)
+            raw_path = os.path.join(self.directory, f'.{name}.db.tmp')
+            gz_path = os.path.join(self.directory, f'.{name}.tmp')
+            try:
+                pages, restarts = self._copy(raw_path)
+                result = integrity_check(raw_path)
+                if result != 'ok':
+                    raise RuntimeError(f'integrity_check נכשל: {result}')
+
+                raw_size = os.path.getsize(raw_path)
+                with open(raw_path, 'rb') as src, gzip.open(gz_path, 'wb', compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                # רק קובץ שלם מקבל את השם הסופי
+                os.replace(gz_path, path)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                for leftover in (raw_path, gz_path):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+
+            removed = self.rotate()
+            self.total += 1
+            self.last = {
+                'path': path,
+                'finished_at': time.time(),
+                'seconds': round(time.perf_counter() - started, 3),
+                'pages': pages,
+                'restarts': restarts,
+                'raw_bytes': raw_size,
+                'bytes': os.path.getsize(path),
+                'rotated': len(removed),
+            }
+        logger.info(f"💾 גיבוי נשמר: {name} ({self.last['bytes'] // 1024}KB, {self.last['seconds']}s)")
+        return self.last
+
+    def verify(self, path):
+        """פותח את הגיבוי הדחוס לקובץ זמני ומריץ integrity_check"""
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_path = os.path.join(tmp, 'verify.db')
+            try:
+                _decompress(path, raw_path)
+            except (OSError, EOFError) as e:
+                return f'לא ניתן לפתוח את הקובץ: {e}'
+            return integrity_check(raw_path)
+
+    def restore(self, path):
+        """משחזר גיבוי לתוך המסד דרך ה-backup API (שומר קודם גיבוי של המצב הנוכחי)"""
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_path = os.path.join(tmp, 'restore.db')
+            try:
+                _decompress(path, raw_path)
+            except (OSError, EOFError) as e:
+                raise RuntimeError(f'לא ניתן לפתוח את הגיבוי: {e}')
+            result = integrity_check(raw_path)
+            if result != 'ok':
+                raise RuntimeError(f'הגיבוי פגום: {result}')
+
+            safety = self.backup_now() if os.path.exists(self.db_path) else None
+            source = sqlite3.connect(raw_path)
+            target = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+        return safety
+
+    # --- thread רקע ---
+
+    def run_once(self):
+        if not self.enabled() or not self.due():
+            return None
+        return self.backup_now()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"❌ הגיבוי האוטומטי נכשל: {e}")
+            self._stop.wait(self.check_interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='backup', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        last = self.last or {}
+        return {
+            'total': self.total,
+            'failures': self.failures,
+            'last_finished_at': last.get('finished_at', 0),
+            'last_seconds': last.get('seconds', 0),
+            'last_bytes': last.get('bytes', 0),
+            'last_raw_bytes': last.get('raw_bytes', 0),
+            'count': len(self.backups()),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='גיבוי ושחזור של מסד הנתונים של GmarUp')
+    parser.add_argument('--db', default=DB_PATH, help='נתיב המסד')
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help='תיקיית הגיבויים')
+    parser.add_argument('--keep', type=int, default=int(os.environ.get('GMARUP_BACKUP_KEEP', DEFAULT_KEEP)))
+    parser.add_argument('--list', action='store_true', help='רשימת הגיבויים')
+    parser.add_argument('--verify', metavar='FILE', help='בדיקת שלמות של גיבוי')
+    parser.add_argument('--restore', metavar='FILE', help='שחזור גיבוי לתוך המסד')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    manager = BackupManager(args.db, args.dir, keep=args.keep)
+
+    if args.list:
+        for path in manager.backups():
+            print(f"{os.path.basename(path)}  {os.path.getsize(path) // 1024:>8}KB")
+        return 0
+
+    if args.verify:
+        result = manager.verify(args.verify)
+        print(f"{'✅' if result == 'ok' else '❌'} {args.verify}: {result}")
+        return 0 if result == 'ok' else 1
+
+    if args.restore:
+        safety = manager.restore(args.restore)
+        if safety:
+            print(f"💾 המצב הקודם נשמר ב-{safety['path']}")
+        print(f"✅ שוחזר {args.restore} לתוך {args.db}")
+        return 0
+
+    info = manager.backup_now()
+    print(f"✅ {info['path']} ({info['bytes'] // 1024}KB דחוס, {info['raw_bytes'] // 1024}KB, {info['seconds']}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: חיבור חדש לכל בקשה (create_connection הישן) מול ConnectionPool עם WAL
+
+הרצה:
+    python benchmarks/bench_connections.py --threads 8 --ops 2000
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db import ConnectionPool
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS registrations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL, email TEXT NOT NULL, phone TEXT NOT NULL,
+        created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS activity_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lead_id INTEGER, action TEXT NOT NULL, details TEXT, created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL
+    );
+    INSERT OR IGNORE INTO settings VALUES ('bit_phone', '0502277660', '');
+'''
+
+
+def request_work(conn, i):
+    """מדמה בקשה: רישום + לוג פעילות, ואז קריאת הגדרה (כמו donate)"""
+    now = datetime.now().isoformat()
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO registrations (name, email, phone, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+        (f'user {i}', f'user{i}@example.com', '050-0000000', now, now)
+    )
+    cursor.execute(
+        'INSERT INTO activity_log (lead_id, action, details, created_at) VALUES (?, ?, ?, ?)',
+        (cursor.lastrowid, 'registration', 'benchmark', now)
+    )
+    cursor.execute('SELECT value FROM settings WHERE key = ?', ('bit_phone',))
+    cursor.fetchone()
+
+
+def legacy_request(path, i):
+    # ההתנהגות הקודמת של server.create_connection - חיבור חדש, rollback journal
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    request_work(conn, i)
+    conn.commit()
+    conn.close()
+
+
+def run(label, fn, threads, ops):
+    errors = []
+    counter = iter(range(ops))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                fn(i)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    rps = ops / elapsed
+    print(f"{label:<28} {ops} ops in {elapsed:6.2f}s  ->  {rps:8.0f} req/s  (errors: {len(errors)})")
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description='השוואת חיבור-לבקשה מול ConnectionPool')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='gmarup-bench-')
+    legacy_path = os.path.join(workdir, 'legacy', 'leads.db')
+    pooled_path = os.path.join(workdir, 'pooled', 'leads.db')
+
+    os.makedirs(os.path.dirname(legacy_path))
+    conn = sqlite3.connect(legacy_path)
+    conn.executescript(SCHEMA)
+    conn.close()
+
+    pool = ConnectionPool(pooled_path, max_size=args.threads)
+    with pool.connection() as conn:
+        conn.executescript(SCHEMA)
+
+    def pooled_request(i):
+        with pool.connection() as conn:
+            request_work(conn, i)
+
+    print(f"threads={args.threads} ops={args.ops} dir={workdir}")
+    legacy = run('connection per request', lambda i: legacy_request(legacy_path, i), args.threads, args.ops)
+    pooled = run('ConnectionPool + WAL', pooled_request, args.threads, args.ops)
+    print(f"speedup: x{pooled / legacy:.1f}")
+
+    pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
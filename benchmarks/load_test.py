@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Load test: תפוקה (RPS) וזמני תגובה (p50/p95/p99) של ה-API תחת עומס
+
+מעלה את server.py על מסד נתונים זמני בפורט פנוי, מריץ תמהיל בקשות במקביל
+ושומר את התוצאות כ-JSON. עם --compare התוצאות מושוות להרצה קודמת ו-regression
+(ירידה ב-RPS או עלייה ב-p95/p99 מעבר לסף) מחזיר exit code 1.
+ספרייה סטנדרטית בלבד - רץ offline על מכונה אחת.
+
+הרצה:
+    python benchmarks/load_test.py --concurrency 32 --duration 20 --out results.json
+    python benchmarks/load_test.py --mix register=1,settings=10 --compare results.json
+    python benchmarks/load_test.py --production --workers 4 --threads 8
+    python benchmarks/load_test.py --smoke          # בקשה אחת לכל תרחיש (במקום test_api.py)
+    python benchmarks/load_test.py --url http://localhost:8080 --smoke
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_MIX = 'register=2,donate=1,donate_retry=1,settings=10,track=20,admin_registrations=1,admin_donations=1'
+
+# מפתחות ה-idempotency ייחודיים להרצה, גם מול שרת קיים (--url)
+RUN_ID = uuid.uuid4().hex[:8]
+
+
+# --- תרחישים: (method, path, body) או (method, path, body, headers) ---
+
+def scenario_register(i):
+    return 'POST', '/api/register', {
+        'fullName': f'בודק עומס {i}',
+        'email': f'load{i}@example.com',
+        'phone': f'050-{i % 10000000:07d}',
+        'emailConsent': True,
+        'studyLevel': random.choice(['beginner', 'intermediate', 'advanced']),
+    }
+
+
+def scenario_donate(i):
+    return 'POST', '/api/donate', {
+        'amount': random.choice([18, 36, 100, 180, 360]),
+        'donor_name': f'תורם {i}',
+        'source': 'load_test',
+    }, {'Idempotency-Key': f'load-{RUN_ID}-{i}'}
+
+
+def scenario_donate_retry(i):
+    # ניסיון חוזר של מובייל: כל מפתח נשלח פעמיים (לרוב במקביל, מ-workers שונים)
+    attempt = i // 2
+    return 'POST', '/api/donate', {
+        'amount': [18, 36, 100, 180, 360][attempt % 5],
+        'donor_name': f'תורם חוזר {attempt}',
+        'source': 'load_test',
+    }, {'Idempotency-Key': f'load-retry-{RUN_ID}-{attempt}'}
+
+
+def scenario_settings(i):
+    return 'GET', '/api/settings', None
+
+
+def scenario_track(i):
+    return 'POST', '/api/admin/actions', {
+        'action': 'track_analytics',
+        'sessionId': f'load-{i % 500}',
+        'category': 'Page',
+        'eventAction': 'page_view',
+        'url': '/',
+    }
+
+
+def scenario_admin_registrations(i):
+    return 'GET', '/api/admin/registrations?limit=100', None
+
+
+def scenario_admin_donations(i):
+    return 'GET', '/api/admin/donations?limit=100', None
+
+
+SCENARIOS = {
+    'register': scenario_register,
+    'donate': scenario_donate,
+    'donate_retry': scenario_donate_retry,
+    'settings': scenario_settings,
+    'track': scenario_track,
+    'admin_registrations': scenario_admin_registrations,
+    'admin_donations': scenario_admin_donations,
+}
+
+
+def parse_mix(text):
+    """'register=2,settings=10' -> [('register', 2), ('settings', 10)]"""
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"❌ תרחיש לא מוכר: {name} (זמינים: {', '.join(SCENARIOS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+# --- הפעלת השרת ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir):
+    port = free_port()
+    env = dict(os.environ,
+               GMARUP_DB_PATH=os.path.join(workdir, 'leads.db'),
+               GMARUP_PORT=str(port),
+               GMARUP_NO_BROWSER='1')
+    # כל העומס מגיע מ-IP אחד - מכסות גבוהות כדי שהמגביל יימדד בלי לדחות בקשות
+    env.setdefault('GMARUP_RATE_LIMITS', 'register=1000000/1,donate=1000000/1,track=1000000/1,track_session=1000000/1')
+    command = [sys.executable, 'server.py']
+    if args.production:
+        command += ['--production', '--bind', f'127.0.0.1:{port}']
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+        if args.threads:
+            command += ['--threads', str(args.threads)]
+
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ השרת נסגר מיד - ראה {log.name}")
+        try:
+            status, _ = request_once(url, 'GET', '/api/test', None)
+            if status == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"❌ השרת לא עלה תוך 30 שניות - ראה {log.name}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- לקוח HTTP ---
+
+class Client:
+    """חיבור keep-alive אחד לכל worker של הבדיקה"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+
+    def request(self, method, path, body, headers=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = dict(headers or {})
+        if payload:
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, data
+            except (http.client.HTTPException, ConnectionError):
+                # השרת סגר חיבור keep-alive - מנסים פעם אחת בחיבור חדש
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def request_once(url, method, path, body, headers=None):
+    client = Client(url)
+    try:
+        return client.request(method, path, body, headers)
+    finally:
+        client.close()
+
+
+# --- הרצת העומס ---
+
+def run_load(url, mix, concurrency, duration, warmup):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    statuses = {}
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker():
+        client = Client(url)
+        rng = random.Random()
+        while True:
+            started = time.monotonic()
+            if started >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            with lock:
+                i = next(counter)
+            scenario = SCENARIOS[name](i)
+            begin = time.perf_counter()
+            try:
+                status, _ = client.request(*scenario)
+            except (OSError, http.client.HTTPException):
+                status = 0
+            elapsed = (time.perf_counter() - begin) * 1000
+            # בקשות שהתחילו בזמן החימום לא נמדדות
+            if started >= measure_from:
+                with lock:
+                    samples[name].append(elapsed)
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if status >= 400 or status == 0:
+                        errors[name] += 1
+        client.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return samples, errors, statuses
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return round(sorted_values[index], 2)
+
+
+def summarize(values, errors, duration):
+    values = sorted(values)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'rps': round(len(values) / duration, 1),
+        'mean_ms': round(sum(values) / len(values), 2) if values else None,
+        'p50_ms': percentile(values, 50),
+        'p95_ms': percentile(values, 95),
+        'p99_ms': percentile(values, 99),
+        'max_ms': round(values[-1], 2) if values else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# --- השוואה להרצה קודמת ---
+
+def compare(current, baseline, threshold):
+    """מחזיר רשימת regressions: ירידה ב-RPS או עלייה ב-p95/p99 של יותר מ-threshold אחוז"""
+    regressions = []
+    print(f"\n{'scenario':<22} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, now in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric, higher_is_better in (('rps', True), ('p95_ms', False), ('p99_ms', False)):
+            old, new = before.get(metric), now.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = '  ⚠️' if worse > threshold else ''
+            print(f"{name:<22} {metric:<8} {old:>10} {new:>10} {change:>+7.1f}%{flag}")
+            if worse > threshold:
+                regressions.append(f'{name} {metric}: {old} -> {new} ({change:+.1f}%)')
+    return regressions
+
+
+def duplicate_donations(workdir):
+    """תרומות כפולות מ-donate_retry (אותו מפתח נשלח פעמיים) - חייב להיות 0"""
+    conn = sqlite3.connect(os.path.join(workdir, 'leads.db'))
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) - COUNT(DISTINCT donor_name) FROM donations WHERE donor_name LIKE 'תורם חוזר %'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def smoke(url, mix):
+    print(f"=== בדיקת GmarUp Server API ===\nשרת: {url}\n")
+    ok = True
+    for name, _ in mix:
+        scenario = SCENARIOS[name](random.randint(0, 10 ** 6))
+        method, path = scenario[:2]
+        try:
+            status, data = request_once(url, *scenario)
+        except OSError as e:
+            print(f"❌ {name}: שגיאת חיבור: {e}")
+            ok = False
+            continue
+        mark = '✅' if status < 400 else '❌'
+        ok = ok and status < 400
+        print(f"{mark} {name:<22} {method} {path} -> {status} ({len(data)} bytes)")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test ל-API של GmarUp')
+    parser.add_argument('--url', help='שרת קיים (ברירת מחדל: מעלה server.py על מסד זמני)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'משקלות תרחישים (ברירת מחדל: {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0, help='שניות מדידה')
+    parser.add_argument('--warmup', type=float, default=2.0, help='שניות חימום שלא נמדדות')
+    parser.add_argument('--production', action='store_true', help='להעלות את השרת במצב production (gunicorn)')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--out', help='קובץ JSON לתוצאות')
+    parser.add_argument('--compare', help='קובץ JSON של הרצה קודמת להשוואה')
+    parser.add_argument('--threshold', type=float, default=10.0, help='אחוז החמרה שנחשב regression')
+    parser.add_argument('--smoke', action='store_true', help='בקשה אחת לכל תרחיש ובדיקת סטטוס')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix='gmarup-load-')
+    process = None
+    url = args.url
+    if not url:
+        process, url = start_server(args, workdir)
+        print(f"🚀 השרת עלה: {url} (מסד זמני: {workdir})")
+
+    try:
+        if args.smoke:
+            return smoke(url, mix)
+
+        print(f"⏱️ concurrency={args.concurrency} duration={args.duration}s warmup={args.warmup}s mix={args.mix}")
+        samples, errors, statuses = run_load(url, mix, args.concurrency, args.duration, args.warmup)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    all_values = [v for values in samples.values() for v in values]
+    result = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': git_revision(),
+            'mode': 'external' if args.url else ('production' if args.production else 'dev'),
+            'workers': args.workers,
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'mix': args.mix,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+        },
+        'total': summarize(all_values, sum(errors.values()), args.duration),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'scenarios': {name: summarize(samples[name], errors[name], args.duration) for name, _ in mix},
+    }
+    # רק כשהשרת רץ על המסד הזמני שלנו
+    if process is not None and 'donate_retry' in samples:
+        result['duplicate_donations'] = duplicate_donations(workdir)
+
+    print(f"\n{'scenario':<22} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, stats in list(result['scenarios'].items()) + [('TOTAL', result['total'])]:
+        print(f"{name:<22} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8} "
+              f"{stats['p50_ms'] or '-':>8} {stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 התוצאות נשמרו ב-{args.out}")
+
+    if 'duplicate_donations' in result:
+        if result['duplicate_donations']:
+            print(f"\n❌ {result['duplicate_donations']} תרומות כפולות למרות Idempotency-Key")
+            return 1
+        print("\n✅ אין תרומות כפולות מניסיונות חוזרים")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions (סף {args.threshold}%):")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ אין regressions מעבר ל-{args.threshold}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
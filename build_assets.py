@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+GmarUp Asset Build - מיניפיקציה, fingerprint ודחיסה מראש של קבצים סטטיים
+
+יוצר את תיקיית dist/ (לא נשמרת ב-git):
+    dist/css/main.<hash>.css (+ .gz / .br)
+    dist/js/main.<hash>.js   (+ .gz / .br)
+    dist/assets/images/...   (עותק עם hash + השם המקורי)
+    dist/index.html, admin.html, thank-you.html - עם הפניות לשמות החדשים
+    dist/manifest.json       - מיפוי לשרת (static_assets.py)
+
+הרצה:
+    python build_assets.py
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+
+# אופציונלי - מיניפיקציה טובה יותר ודחיסת brotli כשהחבילות מותקנות
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(ROOT, 'dist')
+
+HTML_FILES = ('index.html', 'admin.html', 'thank-you.html')
+ASSET_DIRS = ('css', 'js', os.path.join('assets', 'images'))
+
+# סוגים שכדאי לדחוס (תמונות כבר דחוסות)
+COMPRESSIBLE = ('.css', '.js', '.html', '.svg', '.json', '.pdf')
+
+# משתנה דחוס נשמר רק אם הוא חוסך לפחות 5%
+MIN_SAVING = 0.95
+
+
+def minify_css(text):
+    if rcssmin:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    if rjsmin:
+        return rjsmin.jsmin(text)
+    # בלי rjsmin - רק הסרה שמרנית של הזחות ושורות ריקות (לא נוגעים במחרוזות)
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def fingerprint(rel_path, data):
+    digest = hashlib.sha256(data).hexdigest()
+    base, ext = os.path.splitext(rel_path)
+    return f'{base}.{digest[:10]}{ext}', digest
+
+
+def write_variants(path, data):
+    """כותב את הקובץ + גרסאות gz/br. מחזיר את רשימת הקידודים שנוצרו"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    encodings = []
+    if not path.endswith(COMPRESSIBLE):
+        return encodings
+
+    # mtime=0 - פלט דטרמיניסטי, build חוזר לא משנה את הקבצים
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data) * MIN_SAVING:
+        with open(path + '.gz', 'wb') as f:
+            f.write(gz)
+        encodings.append('gzip')
+
+    if brotli:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data) * MIN_SAVING:
+            with open(path + '.br', 'wb') as f:
+                f.write(br)
+            encodings.append('br')
+
+    return encodings
+
+
+def build(build_dir=BUILD_DIR):
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    manifest = {}
+    renames = {}
+    total_in = total_out = 0
+
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(ROOT, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            source = os.path.join(source_dir, name)
+            if not os.path.isfile(source):
+                continue
+            rel_path = os.path.join(asset_dir, name).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            total_in += len(data)
+
+            if name.endswith('.css'):
+                data = minify_css(data.decode('utf-8')).encode('utf-8')
+            elif name.endswith('.js'):
+                data = minify_js(data.decode('utf-8')).encode('utf-8')
+            total_out += len(data)
+
+            hashed_path, digest = fingerprint(rel_path, data)
+            encodings = write_variants(os.path.join(build_dir, hashed_path), data)
+            entry = {'etag': digest[:32], 'encodings': encodings, 'source': rel_path}
+            manifest[hashed_path] = dict(entry, immutable=True)
+
+            # גם השם המקורי (קישורים חיצוניים, ה-PDF) - בלי immutable
+            write_variants(os.path.join(build_dir, rel_path), data)
+            manifest[rel_path] = dict(entry, immutable=False)
+            renames[rel_path] = hashed_path
+
+    # הפניות ב-HTML: href="css/main.css" -> href="css/main.<hash>.css"
+    pattern = re.compile(r'''((?:href|src)=["'])(/?)([^"'?#]+)''')
+
+    def rewrite(match):
+        prefix, slash, path = match.groups()
+        return prefix + slash + renames.get(path, path)
+
+    # srcset="assets/images/logo.png?w=80 80w, ..." - כל מועמד בנפרד
+    srcset_pattern = re.compile(r'''(srcset=["'])([^"']+)''')
+
+    def rewrite_srcset(match):
+        prefix, candidates = match.groups()
+        parts = []
+        for candidate in candidates.split(','):
+            url, _, descriptor = candidate.strip().partition(' ')
+            path, sep, query = url.partition('?')
+            parts.append(f"{renames.get(path, path)}{sep}{query} {descriptor}".strip())
+        return prefix + ', '.join(parts)
+
+    for name in HTML_FILES:
+        source = os.path.join(ROOT, name)
+        if not os.path.exists(source):
+            continue
+        with open(source, 'r', encoding='utf-8') as f:
+            html = srcset_pattern.sub(rewrite_srcset, pattern.sub(rewrite, f.read()))
+        data = html.encode('utf-8')
+        encodings = write_variants(os.path.join(build_dir, name), data)
+        manifest[name] = {
+            'etag': hashlib.sha256(data).hexdigest()[:32],
+            'encodings': encodings,
+            'immutable': False,
+        }
+
+    with open(os.path.join(build_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"✅ נבנו {len(renames)} קבצים + {len(HTML_FILES)} דפים אל {build_dir}")
+    print(f"   css/js/תמונות: {total_in // 1024} KB -> {total_out // 1024} KB אחרי מיניפיקציה")
+    if brotli is None:
+        print("💡 brotli לא מותקן - נוצרו רק גרסאות gzip (pip install brotli)")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='בניית קבצים סטטיים ל-production')
+    parser.add_argument('--out', default=BUILD_DIR, help='תיקיית פלט (ברירת מחדל: dist/)')
+    args = parser.parse_args()
+    build(args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,9 +4,15 @@
 import sqlite3
 import os
 from datetime import datetime, timedelta
+import sys
 import json
 import random
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from ingest import canonical_email, canonical_phone
+
 def init_database():
     db_path = os.path.join(os.path.dirname(__file__), 'leads.db')
     
@@ -15,152 +21,11 @@ def init_database():
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        print("Creating database tables...")
-        
-        # Create registrations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS registrations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT NOT NULL,
-                newsletter INTEGER DEFAULT 0,
-                source TEXT DEFAULT "beta_landing",
-                status TEXT DEFAULT "pending_beta",
-                notes TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                ip_address TEXT,
-                user_agent TEXT,
-                attempt_count INTEGER DEFAULT 1,
-                lead_score INTEGER DEFAULT 0,
-                last_contacted TEXT
-            )
-        ''')
-        
-        # Create donations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS donations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                donation_id TEXT UNIQUE NOT NULL,
-                amount INTEGER NOT NULL,
-                donor_name TEXT NOT NULL,
-                donor_email TEXT,
-                donor_phone TEXT,
-                message TEXT,
-                is_anonymous INTEGER DEFAULT 0,
-                source TEXT DEFAULT "website",
-                status TEXT DEFAULT "pending",
-                payment_method TEXT DEFAULT "bit",
-                transaction_id TEXT,
-                created_at TEXT NOT NULL,
-                completed_at TEXT,
-                ip_address TEXT,
-                user_agent TEXT
-            )
-        ''')
-        
-        # Create analytics table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                category TEXT NOT NULL,
-                action TEXT NOT NULL,
-                label TEXT,
-                value INTEGER,
-                url TEXT,
-                user_agent TEXT,
-                ip_address TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        
-        # Create activity log table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lead_id INTEGER,
-                action TEXT NOT NULL,
-                details TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (lead_id) REFERENCES registrations(id)
-            )
-        ''')
-        
-        # Create donation activity table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS donation_activity (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                donation_id INTEGER,
-                action TEXT NOT NULL,
-                details TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (donation_id) REFERENCES donations(id)
-            )
-        ''')
-        
-        # Create communications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS communications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                audience TEXT NOT NULL,
-                message TEXT NOT NULL,
-                recipients_count INTEGER NOT NULL,
-                sent_at TEXT NOT NULL,
-                status TEXT DEFAULT "sent"
-            )
-        ''')
-        
-        # Create settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        ''')
+        print("Applying schema migrations...")
         
-        print("Creating indexes...")
-        
-        # Create indexes for better performance
-        indexes = [
-            'CREATE INDEX IF NOT EXISTS idx_registrations_email ON registrations(email)',
-            'CREATE INDEX IF NOT EXISTS idx_registrations_created_at ON registrations(created_at)',
-            'CREATE INDEX IF NOT EXISTS idx_registrations_status ON registrations(status)',
-            'CREATE INDEX IF NOT EXISTS idx_registrations_source ON registrations(source)',
-            'CREATE INDEX IF NOT EXISTS idx_donations_status ON donations(status)',
-            'CREATE INDEX IF NOT EXISTS idx_donations_created_at ON donations(created_at)',
-            'CREATE INDEX IF NOT EXISTS idx_donations_amount ON donations(amount)',
-            'CREATE INDEX IF NOT EXISTS idx_analytics_category ON analytics(category)',
-            'CREATE INDEX IF NOT EXISTS idx_analytics_session ON analytics(session_id)',
-            'CREATE INDEX IF NOT EXISTS idx_analytics_created_at ON analytics(created_at)'
-        ]
-        
-        for index in indexes:
-            cursor.execute(index)
-        
-        print("Inserting default settings...")
-        
-        # Insert default settings
-        default_settings = [
-            ('whatsapp_link', 'https://chat.whatsapp.com/LNmVCXvv35S9SsbWTol2qW'),
-            ('bit_phone', '0502277660'),
-            ('admin_email', 'gmarupil@gmail.com'),
-            ('site_title', 'גמראפ - לימוד גמרא לכל אחד'),
-            ('memorial_counter_start', '2500'),
-            ('donations_counter_start', '120000'),
-            ('auto_backup_enabled', '1'),
-            ('email_notifications', '1'),
-            ('analytics_enabled', '1')
-        ]
-        
-        for key, value in default_settings:
-            cursor.execute('''
-                INSERT OR IGNORE INTO settings (key, value, updated_at)
-                VALUES (?, ?, ?)
-            ''', (key, value, datetime.now().isoformat()))
+        # Tables, indexes and default settings come from the shared migration engine
+        applied = migrations.migrate(conn)
+        print(f"Schema version {migrations.LATEST_VERSION} ({applied} migrations applied)")
         
         print("Inserting sample data...")
         
@@ -175,11 +40,14 @@ def init_database():
         
         for i, (name, email, phone, newsletter, source, status) in enumerate(sample_registrations):
             created_at = (datetime.now() - timedelta(days=random.randint(1, 7))).isoformat()
+            # email_key is unique, so re-running the script skips sample rows that already exist
             cursor.execute('''
-                INSERT OR IGNORE INTO registrations 
-                (name, email, phone, newsletter, source, status, created_at, updated_at, ip_address, lead_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, email, phone, newsletter, source, status, created_at, datetime.now().isoformat(), '127.0.0.1', random.randint(20, 95)))
+                INSERT INTO registrations 
+                (name, email, phone, newsletter, source, status, created_at, updated_at, ip_address, lead_score, email_key, phone_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (email_key) DO NOTHING
+            ''', (name, email, phone, newsletter, source, status, created_at, datetime.now().isoformat(), '127.0.0.1', random.randint(20, 95),
+                  canonical_email(email), canonical_phone(phone)))
         
         # Insert sample donations
         sample_donations = [
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+GmarUp DB - מנהל חיבורים משותף למסד הנתונים (pool + WAL)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+import search_index
+
+logger = logging.getLogger(__name__)
+
+# מיקום מסד הנתונים (משותף ל-server.py ול-asgi_ingest.py); GMARUP_DB_PATH לבדיקות/benchmarks
+DB_PATH = os.environ.get('GMARUP_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'leads.db')
+
+# הגדרות ביצועים לכל חיבור חדש
+PRAGMAS = (
+    ('synchronous', 'NORMAL'),          # בטוח ב-WAL, חוסך fsync בכל commit
+    ('cache_size', -16000),             # ~16MB page cache לחיבור
+    ('mmap_size', 64 * 1024 * 1024),    # קריאות דרך mmap
+    ('busy_timeout', 5000),             # המתנה לנעילה במקום "database is locked"
+    ('temp_store', 'MEMORY'),
+)
+
+
+class ConnectionPool:
+    """Pool של חיבורי SQLite שמשותפים בין threads.
+
+    חיבור נלקח מה-pool לכל בקשה דרך connection(), שמבצע commit בסיום
+    או rollback בשגיאה ומחזיר את החיבור ל-pool במקום לסגור אותו.
+    """
+
+    def __init__(self, path, max_size=8, timeout=10.0, factory=None):
+        self.path = path
+        # מחלקת Connection חלופית (למשל SQLProfiler.connection_factory())
+        self.factory = factory or sqlite3.Connection
+        self.max_size = max_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._wal_ready = False
+        self._pid = os.getpid()
+
+        # observer(wait_seconds, held_seconds) - נקרא אחרי כל connection() (metrics.py)
+        self.observer = None
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        # טריגרי אינדקס החיפוש (מיגרציה 10) קוראים לפונקציות האלה
+        search_index.register(conn)
+
+        # journal_mode נשמר בקובץ עצמו - מספיק להגדיר פעם אחת
+        if not self._wal_ready:
+            mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+            if mode.lower() != 'wal':
+                logger.warning(f"⚠️ לא ניתן להפעיל WAL, מצב יומן: {mode}")
+            self._wal_ready = True
+        return conn
+
+    def _check_fork(self):
+        # חיבורי SQLite אסור להעביר בין תהליכים - אחרי fork מתחילים pool נקי
+        if self._pid != os.getpid():
+            self._idle = []
+            self._created = 0
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def acquire(self):
+        """לוקח חיבור מה-pool (או יוצר חדש אם לא הגענו למקסימום)"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._check_fork()
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        self._created -= 1
+                        raise
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError('אין חיבור פנוי למסד הנתונים')
+                self._cond.wait(remaining)
+            self._in_use += 1
+            return conn
+
+    def release(self, conn):
+        """מחזיר חיבור ל-pool"""
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """חיבור לבקשה אחת - commit אוטומטי בסיום, rollback בשגיאה"""
+        start = time.perf_counter()
+        conn = self.acquire()
+        acquired = time.perf_counter()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+            if self.observer is not None:
+                self.observer(acquired - start, time.perf_counter() - acquired)
+
+    def close_all(self):
+        """סוגר את כל החיבורים הפנויים (לכיבוי השרת)"""
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._created -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+            }
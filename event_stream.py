@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+GmarUp Event Stream - פיד חי (Server-Sent Events) של שינויים לדשבורד האדמין
+
+מקור האמת הוא change_log (seq עולה תמיד) - ה-seq הוא גם ה-id של כל אירוע, כך
+ש-Last-Event-ID מאפשר להמשיך בדיוק מהמקום שבו החיבור נפל. thread אחד (tailer)
+קורא את היומן, שולף את השורות שהשתנו פעם אחת, מסריאל כל אירוע פעם אחת ומפיץ
+לכל המנויים.
+
+notify() אחרי commit בתהליך הזה מעיר את ה-tailer מיד; שינויים מתהליכים אחרים
+(workers נוספים, asgi_ingest.py) נקלטים בסריקה התקופתית של היומן.
+ה-tailer רץ רק כשיש מנויים. לכל חיבור תור חסום בבתים - חיבור שלא מספיק לקרוא
+מקבל אירוע reset ונסגר (הלקוח טוען דלתא ומתחבר מחדש).
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# סריקת היומן כשאין notify (שינויים מתהליכים אחרים)
+POLL_INTERVAL = 1.0
+# שורת הערה שמחזיקה את החיבור פתוח מול proxies
+HEARTBEAT_INTERVAL = 15.0
+# חיבור נסגר אחרי זמן זה והדפדפן מתחבר מחדש עם Last-Event-ID (משחרר threads ב-reload)
+MAX_STREAM_SECONDS = 300
+# הדפדפן ממתין כך לפני התחברות מחדש
+RETRY_MS = 3000
+# זיכרון מקסימלי לאירועים שממתינים לחיבור אחד
+MAX_PENDING_BYTES = 256 * 1024
+# אירועים אחרונים בזיכרון להמשך חיבור בלי לגשת למסד
+BACKLOG_SIZE = 1000
+# שינויים שנקראים מהיומן בכל סבב
+BATCH_SIZE = 500
+
+
+class Subscription:
+    def __init__(self, hub):
+        self.hub = hub
+        self._cond = threading.Condition()
+        self._events = deque()
+        self._pending_bytes = 0
+        self.overflowed = False
+        self.closed = False
+
+    def put(self, event):
+        with self._cond:
+            if self.overflowed or self.closed:
+                return
+            if self._pending_bytes + len(event) > MAX_PENDING_BYTES:
+                # לקוח איטי - לא מחזיקים עוד אירועים בזיכרון בשבילו
+                self.overflowed = True
+                self._events.clear()
+                self._pending_bytes = 0
+            else:
+                self._events.append(event)
+                self._pending_bytes += len(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """אירועים שהצטברו (רשימה, אולי ריקה אחרי timeout)"""
+        with self._cond:
+            if not self._events and not self.overflowed and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            self._pending_bytes = 0
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+def format_event(seq, event, payload):
+    return f'id: {seq}\nevent: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode('utf-8')
+
+
+class EventHub:
+    """tailer משותף ל-change_log והפצה למנויי SSE בתהליך הנוכחי"""
+
+    def __init__(self, pool, tables, max_subscribers=16):
+        self.pool = pool
+        # טבלה -> עמודות שנשלחות באירוע upsert
+        self.tables = tables
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._backlog = deque(maxlen=BACKLOG_SIZE)
+        self._last_seq = None
+        self._thread = None
+        self._closed = False
+        self.published = 0
+        self.overflows = 0
+
+    # --- צד הכתיבה ---
+
+    def notify(self):
+        """נקרא אחרי commit של שינוי - מעיר את ה-tailer בלי לחכות לסריקה הבאה"""
+        if self._subscribers:
+            self._wake.set()
+
+    # --- מנויים ---
+
+    def subscribe(self, last_event_id=None):
+        """(subscription, אירועי backlog) או None אם הגענו למקסימום חיבורים"""
+        with self._lock:
+            if self._closed or len(self._subscribers) >= self.max_subscribers:
+                return None
+            if self._last_seq is None:
+                self._last_seq = self._current_seq()
+            subscription = Subscription(self)
+            backlog = self._replay(last_event_id)
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+                self._thread.start()
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if subscription.overflowed:
+                self.overflows += 1
+
+    def _replay(self, last_event_id):
+        """אירועים שהלקוח פספס מאז last_event_id (מה-backlog או מהיומן)"""
+        if last_event_id is None or last_event_id >= self._last_seq:
+            return []
+        if self._backlog and self._backlog[0][0] <= last_event_id + 1:
+            return [event for seq, event in self._backlog if seq > last_event_id]
+        with self.pool.connection() as conn:
+            min_seq = conn.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+            if min_seq is None or last_event_id < min_seq - 1:
+                # היומן כבר נוקה - הלקוח צריך טעינה מלאה
+                return [format_event(self._last_seq, 'reset', {'reason': 'expired'})]
+            events = []
+            since = last_event_id
+            while since < self._last_seq:
+                batch, since = self._read_changes(conn, since, self._last_seq)
+                if not batch:
+                    break
+                events.extend(event for _, event in batch)
+                if len(events) > BACKLOG_SIZE:
+                    return [format_event(self._last_seq, 'reset', {'reason': 'too_many_changes'})]
+            return events
+
+    # --- tailer ---
+
+    def _current_seq(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+
+    def _read_changes(self, conn, since, until=None):
+        """([(seq, event bytes)], seq אחרון) - שליפת השורות בשאילתה אחת לכל טבלה"""
+        sql = 'SELECT seq, table_name, row_id, op FROM change_log WHERE seq > ?'
+        params = [since]
+        if until is not None:
+            sql += ' AND seq <= ?'
+            params.append(until)
+        changes = conn.execute(sql + ' ORDER BY seq LIMIT ?', params + [BATCH_SIZE]).fetchall()
+        if not changes:
+            return [], since
+
+        rows = {}
+        for table, fields in self.tables.items():
+            ids = list({row_id for _, t, row_id, op in changes if t == table and op == 'upsert'})
+            if ids:
+                result = conn.execute(
+                    f'SELECT {", ".join(fields)} FROM {table} WHERE id IN ({",".join("?" for _ in ids)})', ids
+                )
+                rows.update({(table, row['id']): dict(row) for row in result})
+
+        events = []
+        for seq, table, row_id, op in changes:
+            payload = {'table': table, 'id': row_id, 'op': op}
+            if table in self.tables and op == 'upsert':
+                row = rows.get((table, row_id))
+                if row is None:
+                    # נמחקה מאז - אירוע מחיקה יגיע בהמשך היומן
+                    payload['op'] = 'delete'
+                else:
+                    payload['row'] = row
+            events.append((seq, format_event(seq, 'change', payload)))
+        return events, changes[-1][0]
+
+    def _run(self):
+        logger.info("📡 פיד השינויים החי התחיל")
+        while True:
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+            with self._lock:
+                if self._closed or not self._subscribers:
+                    # אין מנויים - ה-thread נעצר ויתחיל מחדש במנוי הבא
+                    self._thread = None
+                    self._last_seq = None
+                    self._backlog.clear()
+                    break
+            try:
+                with self.pool.connection() as conn:
+                    events, last_seq = self._read_changes(conn, self._last_seq)
+            except Exception as e:
+                logger.error(f"❌ קריאת יומן השינויים לפיד נכשלה: {e}")
+                continue
+            if not events:
+                continue
+            with self._lock:
+                self._last_seq = last_seq
+                self._backlog.extend(events)
+                subscribers = list(self._subscribers)
+                self.published += len(events)
+            for subscription in subscribers:
+                for _, event in events:
+                    subscription.put(event)
+            if len(events) == BATCH_SIZE:
+                # יש עוד ביומן - ממשיכים מיד
+                self._wake.set()
+        logger.info("📡 פיד השינויים החי נעצר (אין מנויים)")
+
+    def stream(self, subscription, backlog):
+        """גנרטור של גוף תשובת ה-SSE לחיבור אחד"""
+        started = time.monotonic()
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('ascii')
+            for event in backlog:
+                yield event
+            while time.monotonic() - started < MAX_STREAM_SECONDS:
+                events = subscription.get(HEARTBEAT_INTERVAL)
+                if subscription.closed:
+                    return
+                if subscription.overflowed:
+                    yield format_event(self._last_seq or 0, 'reset', {'reason': 'slow_consumer'})
+                    return
+                if events:
+                    yield b''.join(events)
+                else:
+                    yield b': ping\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'last_seq': self._last_seq,
+                'published': self.published,
+                'overflows': self.overflows,
+            }
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+GmarUp Image Variants - גרסאות מוקטנות של תמונות ב-WebP/AVIF
+
+תמונות מ-assets/images מוקטנות לרוחבים קבועים (WIDTHS) ומומרות ל-WebP, ול-AVIF
+כשיש מקודד (Pillow עם AVIF או avifenc). התוצאות נשמרות בדיסק לפי hash של
+קובץ המקור, כך ששינוי בתמונה יוצר גרסאות חדשות בלי צורך לנקות מטמון.
+
+Pillow אופציונלי - בלעדיו מוגשות התמונות המקוריות כמו קודם.
+
+הכנה מראש של כל הגרסאות:
+    python image_variants.py
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+
+from werkzeug.security import safe_join
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, '.image-cache')
+IMAGE_DIR = 'assets/images'
+
+# רוחבים שמותר לבקש (?w=) - בקשה אחרת מעוגלת כלפי מעלה
+WIDTHS = (80, 160, 320, 640, 1024, 1600)
+
+SOURCE_FORMATS = {'.png': 'png', '.jpg': 'jpeg', '.jpeg': 'jpeg'}
+MIMETYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+}
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+
+
+def _pillow_avif():
+    try:
+        return Image is not None and features.check('avif')
+    except (ValueError, AttributeError):
+        return False
+
+
+def snap_width(requested, original):
+    """רוחב מבוקש -> הרוחב הקבוע הקרוב מלמעלה (לעולם לא הגדלה)"""
+    if requested is None or requested >= original:
+        return original
+    for width in WIDTHS:
+        if width >= requested:
+            return min(width, original)
+    return original
+
+
+class ImageVariants:
+    def __init__(self, root=ROOT, cache_dir=CACHE_DIR):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.available = Image is not None
+        self.avif = 'pillow' if _pillow_avif() else ('avifenc' if shutil.which('avifenc') else None)
+        self._lock = threading.Lock()
+        # rel_path -> (mtime, size, sha, (width, height))
+        self._sources = {}
+
+        if not self.available:
+            logger.info("🖼️ Pillow לא מותקן - תמונות מוגשות בגודל המקורי (pip install Pillow)")
+
+    def formats(self):
+        return (['avif'] if self.avif else []) + ['webp']
+
+    def handles(self, rel_path):
+        return (self.available and rel_path.startswith(IMAGE_DIR + '/')
+                and os.path.splitext(rel_path)[1].lower() in SOURCE_FORMATS)
+
+    def _resolve(self, rel_path):
+        """נתיב המקור בתוך root, או None (.., נתיב מוחלט, או קובץ שלא קיים)"""
+        path = safe_join(self.root, rel_path)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path
+
+    def _source(self, rel_path):
+        """(mtime, size, sha, (width, height)) של המקור, או None אם אין כזה"""
+        path = self._resolve(rel_path)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        cached = self._sources.get(rel_path)
+        if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        with Image.open(path) as image:
+            size = image.size
+        entry = (stat.st_mtime, stat.st_size, digest, size)
+        self._sources[rel_path] = entry
+        return entry
+
+    # --- בחירת גרסה ---
+
+    def negotiate(self, rel_path, accept, width_hint):
+        """(format, width, etag) הטוב ביותר ללקוח, או None אם המקור הוא הבחירה
+        (או שאין מקור תקין - אז send_from_directory מחזיר 404)"""
+        try:
+            source = self._source(rel_path)
+        except Exception as e:
+            # תמונה פגומה או לא קריאה - מוגש המקור כמו שהוא
+            logger.warning(f"⚠️ לא ניתן לקרוא את התמונה {rel_path}: {e}")
+            return None
+        if source is None:
+            return None
+        _, _, digest, (original_width, _) = source
+        source_format = SOURCE_FORMATS[os.path.splitext(rel_path)[1].lower()]
+
+        fmt = source_format
+        for candidate in self.formats():
+            if MIMETYPES[candidate] in (accept or ''):
+                fmt = candidate
+                break
+
+        width = snap_width(width_hint, original_width)
+        if fmt == source_format and width == original_width:
+            return None
+        return fmt, width, f'{digest}-{width}-{fmt}'
+
+    def path(self, rel_path, fmt, width):
+        """נתיב לגרסה בדיסק - נוצרת בפעם הראשונה שמבקשים אותה"""
+        digest = self._source(rel_path)[2]
+        name = os.path.splitext(os.path.basename(rel_path))[0]
+        target = os.path.join(self.cache_dir, digest, f'{name}-{width}.{fmt}')
+        if os.path.exists(target):
+            return target
+        with self._lock:
+            if not os.path.exists(target):
+                self._render(self._resolve(rel_path), target, fmt, width)
+        return target
+
+    # --- קידוד ---
+
+    def _render(self, source, target, fmt, width):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with Image.open(source) as image:
+            if width < image.width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            # כתיבה לקובץ זמני והחלפה אטומית - בקשה מקבילה לא תקרא קובץ חצי-כתוב
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.' + fmt)
+            os.close(fd)
+            try:
+                if fmt == 'avif' and self.avif == 'avifenc':
+                    self._avifenc(image, tmp)
+                elif fmt == 'png':
+                    image.save(tmp, 'PNG', optimize=True)
+                else:
+                    image.save(tmp, fmt.upper(), quality=QUALITY[fmt])
+                os.replace(tmp, target)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        logger.info(f"🖼️ נוצרה גרסה {os.path.basename(target)} ({os.path.getsize(target) // 1024} KB)")
+
+    def _avifenc(self, image, target):
+        fd, png = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        try:
+            image.save(png, 'PNG')
+            subprocess.run(['avifenc', '-q', str(QUALITY['avif']), png, target],
+                           check=True, capture_output=True, timeout=60)
+        finally:
+            os.remove(png)
+
+    def warm(self):
+        """יוצר מראש את כל הגרסאות לכל התמונות"""
+        count = 0
+        image_dir = os.path.join(self.root, IMAGE_DIR)
+        for name in sorted(os.listdir(image_dir)):
+            rel_path = f'{IMAGE_DIR}/{name}'
+            source = self._source(rel_path) if self.handles(rel_path) else None
+            if source is None:
+                continue
+            original_width = source[3][0]
+            source_format = SOURCE_FORMATS[os.path.splitext(name)[1].lower()]
+            widths = sorted({snap_width(w, original_width) for w in WIDTHS})
+            for width in widths:
+                for fmt in self.formats() + [source_format]:
+                    if fmt == source_format and width == original_width:
+                        continue
+                    self.path(rel_path, fmt, width)
+                    count += 1
+        return count
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    variants = ImageVariants()
+    if not variants.available:
+        print("❌ נדרש Pillow: pip install Pillow")
+        return 1
+    count = variants.warm()
+    print(f"✅ {count} גרסאות תמונה מוכנות ב-{variants.cache_dir} (AVIF: {variants.avif or 'לא זמין'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
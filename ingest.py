@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+GmarUp Ingest - ולידציה ו-SQL משותפים לנקודות הקצה הציבוריות
+
+משמש גם את server.py (Flask) וגם את asgi_ingest.py, כך שרישום, תרומה ואירוע
+אנליטיקס נשמרים בדיוק אותו דבר בשני השרתים. הפונקציות לא תלויות ב-request -
+הן מקבלות את הנתונים, ה-IP וה-User-Agent, וזורקות ValueError על קלט לא תקין.
+"""
+
+import re
+import json
+import uuid
+import hashlib
+from datetime import datetime, timedelta
+
+ACTIVITY_LOG_SQL = 'INSERT INTO activity_log (lead_id, action, details, created_at) VALUES (?, ?, ?, ?)'
+DONATION_ACTIVITY_SQL = 'INSERT INTO donation_activity (donation_id, action, details, created_at) VALUES (?, ?, ?, ?)'
+ANALYTICS_SQL = (
+    'INSERT INTO analytics (session_id, category, action, label, value, url, ip_address, created_at) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+)
+
+BIT_PAYMENT_URL = 'https://www.bitpay.co.il/app/me/14D6AE95-19DD-340D-BE3D-1EB146D9A0B420D2?amount={amount}'
+
+
+# --- רישום ---
+
+GMAIL_DOMAINS = ('gmail.com', 'googlemail.com')
+
+
+def canonical_email(email):
+    """מפתח השוואה לאימייל: אותיות קטנות, וב-Gmail בלי נקודות ובלי +תגית"""
+    email = (email or '').strip().lower()
+    if '@' not in email:
+        return email or None
+    local, _, domain = email.rpartition('@')
+    if domain in GMAIL_DOMAINS:
+        local = local.split('+', 1)[0].replace('.', '')
+        domain = 'gmail.com'
+    return f'{local}@{domain}'
+
+
+def canonical_phone(phone):
+    """מפתח השוואה לטלפון ישראלי: ספרות בלבד, קידומת 972+ הופכת ל-0"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('00972'):
+        digits = digits[5:]
+    elif digits.startswith('972'):
+        digits = digits[3:]
+    if digits and not digits.startswith('0'):
+        digits = '0' + digits
+    return digits or None
+
+
+def validate_registration(data):
+    if not data:
+        raise ValueError('לא התקבלו נתונים')
+
+    # בדיקת שדות חובה
+    required_fields = ['fullName', 'email', 'phone', 'emailConsent']
+    for field in required_fields:
+        if field == 'emailConsent':
+            if not data.get(field):
+                raise ValueError('חובה לאשר קבלת עדכונים באימייל')
+        elif not data.get(field):
+            raise ValueError(f'שדה חובה חסר: {field}')
+
+
+def insert_registration(conn, data, ip_address, user_agent):
+    """שומר רישום ומחזיר (id, now, attempt_count). לוג הפעילות נשאר לקורא (תור הכתיבה)
+
+    UPSERT לפי email_key: שליחה חוזרת של אותו אדם לא יוצרת שורה חדשה אלא
+    מעדכנת את פרטי הקשר, מעלה את attempt_count ומרעננת את updated_at.
+    """
+    now = datetime.now().isoformat()
+    email = data.get('email', '')
+    phone = data.get('phone', '')
+    row = conn.execute('''
+        INSERT INTO registrations
+        (name, email, phone, source, created_at, updated_at, ip_address, user_agent, lead_score, notes,
+         email_key, phone_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (email_key) DO UPDATE SET
+            name = excluded.name,
+            phone = excluded.phone,
+            phone_key = excluded.phone_key,
+            ip_address = excluded.ip_address,
+            user_agent = excluded.user_agent,
+            updated_at = excluded.updated_at,
+            attempt_count = COALESCE(attempt_count, 1) + 1
+        RETURNING id, attempt_count
+    ''', (
+        data.get('fullName', ''),
+        email,
+        phone,
+        data.get('source', 'website'),
+        now,
+        now,
+        ip_address,
+        user_agent or '',
+        75,  # ציון ליד ברירת מחדל
+        f"רמת לימוד: {data.get('studyLevel', 'לא צוין')}, אישור דיוור: {'כן' if data.get('emailConsent', False) else 'לא'}",
+        canonical_email(email),
+        canonical_phone(phone)
+    )).fetchone()
+    return row[0], now, row[1]
+
+
+def registration_activity(reg_id, now, attempt_count=1):
+    if attempt_count > 1:
+        return ACTIVITY_LOG_SQL, (reg_id, 'repeat_registration', f'רישום חוזר דרך האתר (ניסיון {attempt_count})', now)
+    return ACTIVITY_LOG_SQL, (reg_id, 'registration', 'רישום חדש דרך האתר', now)
+
+
+# --- תרומה ---
+
+def validate_donation(data):
+    if not data or not data.get('amount'):
+        raise ValueError('חסר סכום תרומה')
+
+
+def insert_donation(conn, data, ip_address, user_agent):
+    """יוצר תרומה בסטטוס pending ומחזיר (donation_id, id, now)"""
+    # יצירת מזהה תרומה ייחודי
+    donation_id = f"DON_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    now = datetime.now().isoformat()
+
+    cursor = conn.execute('''
+        INSERT INTO donations
+        (donation_id, amount, donor_name, donor_email, donor_phone, message, source, status, created_at, ip_address, user_agent, is_anonymous)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        donation_id,
+        data.get('amount', 0),
+        data.get('donor_name', 'תורם אנונימי'),
+        data.get('donor_email', ''),
+        data.get('donor_phone', ''),
+        data.get('message', ''),
+        data.get('source', 'website'),
+        'pending',
+        now,
+        ip_address,
+        user_agent or '',
+        data.get('is_anonymous', 0)
+    ))
+    return donation_id, cursor.lastrowid, now
+
+
+def donation_activity(don_db_id, amount, now):
+    return DONATION_ACTIVITY_SQL, (don_db_id, 'created', f'תרומה חדשה של ₪{amount}', now)
+
+
+def donation_response(donation_id, amount):
+    """גוף התשובה ללקוח - כולל קישור תשלום BIT"""
+    return {
+        'success': True,
+        'donation_id': donation_id,
+        'payment_url': BIT_PAYMENT_URL.format(amount=amount),
+        'message': 'תרומה נוצרה בהצלחה - סטטוס: ממתין לאישור תשלום'
+    }
+
+
+# --- Idempotency-Key ---
+
+# כמה זמן ניסיון חוזר עם אותו מפתח מקבל את התשובה השמורה
+IDEMPOTENCY_TTL_HOURS = 24
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """אותו Idempotency-Key נשלח עם גוף בקשה אחר"""
+
+
+def idempotency_key(value):
+    """הכותרת Idempotency-Key אחרי ניקוי; None אם לא נשלחה, ValueError אם לא תקינה"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    if len(value) > MAX_IDEMPOTENCY_KEY_LENGTH or not value.isascii() or not value.isprintable():
+        raise ValueError('Idempotency-Key לא תקין')
+    return value
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def idempotency_cutoff():
+    return (datetime.now() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)).isoformat()
+
+
+def create_donation(conn, data, ip_address, user_agent, key=None):
+    """תרומה, לוג הפעילות שלה והתשובה השמורה למפתח - בטרנזקציה אחת.
+
+    מחזיר (body, replayed): מפתח שכבר נשמר מחזיר את התשובה המקורית בלי כתיבה;
+    אותו מפתח עם גוף אחר זורק IdempotencyConflict.
+    """
+    fingerprint = request_fingerprint(data) if key else None
+    # IMMEDIATE - שני ניסיונות מקבילים עם אותו מפתח ממתינים זה לזה ורק הראשון כותב
+    conn.execute('BEGIN IMMEDIATE')
+    if key:
+        row = conn.execute(
+            'SELECT fingerprint, response FROM idempotency_keys WHERE scope = ? AND key = ? AND created_at >= ?',
+            ('donate', key, idempotency_cutoff())
+        ).fetchone()
+        if row:
+            if row[0] != fingerprint:
+                raise IdempotencyConflict(key)
+            return json.loads(row[1]), True
+
+    donation_id, don_db_id, now = insert_donation(conn, data, ip_address, user_agent)
+    amount = data.get('amount', 0)
+    conn.execute(*donation_activity(don_db_id, amount, now))
+    body = donation_response(donation_id, amount)
+    if key:
+        # REPLACE - מפתח שפג תוקפו אבל עוד לא נוקה
+        conn.execute(
+            'INSERT OR REPLACE INTO idempotency_keys (scope, key, fingerprint, response, created_at) VALUES (?, ?, ?, ?, ?)',
+            ('donate', key, fingerprint, json.dumps(body, ensure_ascii=False), now)
+        )
+    return body, False
+
+
+def prune_idempotency_keys(conn):
+    return conn.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (idempotency_cutoff(),)).rowcount
+
+
+# --- אנליטיקס ---
+
+def analytics_event(data, ip_address):
+    """(sql, params) לאירוע אנליטיקס - נכתב באצווה דרך תור הכתיבה"""
+    return ANALYTICS_SQL, (
+        data.get('sessionId', ''),
+        data.get('category', 'Page'),
+        data.get('eventAction', data.get('action', 'visit')),
+        data.get('label', ''),
+        data.get('value', 1),
+        data.get('url', '/'),
+        ip_address,
+        datetime.now().isoformat()
+    )
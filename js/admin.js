@@ -5,12 +5,20 @@ let currentData = {
     registrations: [],
     donations: [],
     analytics: [],
-    settings: {}
+    settings: {},
+    summary: null
 };
 
+// Columns the dashboard actually renders - sent as fields= to the list endpoints
+const REGISTRATION_LIST_FIELDS = 'id,name,email,phone,source,status,created_at,updated_at,notes';
+const DONATION_LIST_FIELDS = 'id,donation_id,amount,donor_name,donor_email,donor_phone,message,status,created_at,completed_at';
+
 let currentSection = 'dashboard';
 let lastRefresh = null;
 let refreshInterval = null;
+let changeToken = null;
+let liveStream = null;
+const selectedIds = { registrations: new Set(), donations: new Set() };
 
 // Initialize dashboard on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -155,16 +163,21 @@ async function loadAllData() {
     try {
         showLoading();
         
+        // Take the change token before loading, so nothing written meanwhile is missed
+        const changes = await makeApiCall('/api/admin/changes').catch(() => null);
+        
         // Load data in parallel for better performance
         await Promise.all([
             loadRegistrations(),
             loadDonations(),
             loadAnalytics(),
-            loadSettings()
+            loadSettings(),
+            loadSummary()
         ]);
         
         updateDashboardStats();
         lastRefresh = new Date();
+        changeToken = changes ? changes.token : null;
         
         console.log('✅ All data loaded successfully');
         showNotification('נתונים עודכנו בהצלחה', 'success');
@@ -180,7 +193,7 @@ async function loadAllData() {
 async function loadRegistrations() {
     try {
         console.log('📋 Loading registrations from API...');
-        const data = await makeApiCall('/api/admin/registrations');
+        const data = await fetchAllPages('/api/admin/registrations', REGISTRATION_LIST_FIELDS);
         currentData.registrations = data || [];
         
         console.log(`📋 Successfully loaded ${currentData.registrations.length} registrations`);
@@ -206,7 +219,7 @@ async function loadRegistrations() {
 async function loadDonations() {
     try {
         console.log('💝 Loading donations from API...');
-        const data = await makeApiCall('/api/admin/donations');
+        const data = await fetchAllPages('/api/admin/donations', DONATION_LIST_FIELDS);
         currentData.donations = data || [];
         
         console.log(`💝 Successfully loaded ${currentData.donations.length} donations`);
@@ -293,6 +306,18 @@ async function loadSettings() {
     }
 }
 
+async function loadSummary() {
+    try {
+        currentData.summary = await makeApiCall('/api/admin/summary');
+        return currentData.summary;
+        
+    } catch (error) {
+        // Fall back to computing the header stats from the loaded tables
+        console.error('Error loading summary:', error);
+        currentData.summary = null;
+    }
+}
+
 // Real API calls to the server
 async function makeApiCall(endpoint, options = {}) {
     try {
@@ -322,18 +347,44 @@ async function makeApiCall(endpoint, options = {}) {
     }
 }
 
+// Follow keyset pagination (X-Next-Cursor) until the last page
+async function fetchAllPages(endpoint, fields, pageSize = 1000, filters = {}) {
+    const rows = [];
+    let cursor = null;
+    
+    do {
+        const params = new URLSearchParams({ limit: pageSize, fields: fields, ...filters });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        
+        const response = await fetch(`${endpoint}?${params}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        
+        rows.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    
+    return rows;
+}
+
 // Update dashboard statistics
 function updateDashboardStats() {
-    // Update registrations count
-    const totalRegs = currentData.registrations.length;
+    const summary = currentData.summary;
+    
+    // Server-side rollups when available, otherwise count the loaded tables
+    const totalRegs = summary ? summary.registrations.total : currentData.registrations.length;
     document.getElementById('total-registrations').textContent = totalRegs.toLocaleString('he-IL');
     
     // Update donations
-    const totalDonationAmount = currentData.donations
+    const totalDonationAmount = summary ? summary.donations.completed_amount : currentData.donations
         .filter(d => d.status === 'completed')
         .reduce((sum, d) => sum + d.amount, 0);
     
-    const totalDonationsCount = currentData.donations.filter(d => d.status === 'completed').length;
+    const totalDonationsCount = summary ? summary.donations.completed_count :
+        currentData.donations.filter(d => d.status === 'completed').length;
     
     document.getElementById('total-donations-amount').textContent = `₪${totalDonationAmount.toLocaleString('he-IL')}`;
     document.getElementById('total-donations-count').textContent = totalDonationsCount.toLocaleString('he-IL');
@@ -345,16 +396,22 @@ function updateDashboardStats() {
         advanced: 0
     };
     
-    currentData.registrations.forEach(reg => {
-        const notes = reg.notes || '';
-        if (notes.includes('beginner') || notes.includes('מתחיל')) {
-            studyLevels.beginner++;
-        } else if (notes.includes('intermediate') || notes.includes('בינוני')) {
-            studyLevels.intermediate++;
-        } else if (notes.includes('advanced') || notes.includes('מתקדם')) {
-            studyLevels.advanced++;
-        }
-    });
+    if (summary) {
+        Object.keys(studyLevels).forEach(level => {
+            studyLevels[level] = summary.registrations.by_study_level[level] || 0;
+        });
+    } else {
+        currentData.registrations.forEach(reg => {
+            const notes = reg.notes || '';
+            if (notes.includes('beginner') || notes.includes('מתחיל')) {
+                studyLevels.beginner++;
+            } else if (notes.includes('intermediate') || notes.includes('בינוני')) {
+                studyLevels.intermediate++;
+            } else if (notes.includes('advanced') || notes.includes('מתקדם')) {
+                studyLevels.advanced++;
+            }
+        });
+    }
     
     document.getElementById('beginners-count').textContent = studyLevels.beginner.toLocaleString('he-IL');
     document.getElementById('intermediate-count').textContent = studyLevels.intermediate.toLocaleString('he-IL');
@@ -364,25 +421,11 @@ function updateDashboardStats() {
 }
 
 // Table rendering functions
-function renderRegistrationsTable() {
-    const tbody = document.getElementById('registrations-table');
-    
-    if (!currentData.registrations || currentData.registrations.length === 0) {
-        tbody.innerHTML = `
-            <tr>
-                <td colspan="9" class="empty-state">
-                    <div class="empty-state-icon">👥</div>
-                    <div class="empty-state-title">אין רישומים עדיין</div>
-                    <div class="empty-state-desc">רישומים חדשים יופיעו כאן</div>
-                </td>
-            </tr>
-        `;
-        return;
-    }
-    
-    tbody.innerHTML = currentData.registrations.map((reg, index) => `
+function registrationRow(reg) {
+    return `
         <tr data-id="${reg.id}">
             <td class="table-actions">
+                <input type="checkbox" class="row-select" ${selectedIds.registrations.has(reg.id) ? 'checked' : ''} onchange="toggleRowSelection('registrations', ${reg.id}, this.checked)" title="בחר">
                 <button class="action-btn edit" onclick="editRegistration(${reg.id})" title="ערוך">✏️</button>
                 <button class="action-btn delete" onclick="deleteRegistration(${reg.id})" title="מחק">🗑️</button>
             </td>
@@ -399,30 +442,14 @@ function renderRegistrationsTable() {
             <td style="font-weight: 600;">${reg.name}</td>
             <td style="color: var(--gray-500);">${reg.id}</td>
         </tr>
-    `).join('');
-    
-    console.log(`📋 Rendered ${currentData.registrations.length} registrations`);
+    `;
 }
 
-function renderDonationsTable() {
-    const tbody = document.getElementById('donations-table');
-    
-    if (!currentData.donations || currentData.donations.length === 0) {
-        tbody.innerHTML = `
-            <tr>
-                <td colspan="9" class="empty-state">
-                    <div class="empty-state-icon">💝</div>
-                    <div class="empty-state-title">אין תרומות עדיין</div>
-                    <div class="empty-state-desc">תרומות חדשות יופיעו כאן</div>
-                </td>
-            </tr>
-        `;
-        return;
-    }
-    
-    tbody.innerHTML = currentData.donations.map((don, index) => `
+function donationRow(don) {
+    return `
         <tr data-id="${don.id}">
             <td class="table-actions">
+                <input type="checkbox" class="row-select" ${selectedIds.donations.has(don.id) ? 'checked' : ''} onchange="toggleRowSelection('donations', ${don.id}, this.checked)" title="בחר">
                 <button class="action-btn edit" onclick="editDonation(${don.id})" title="ערוך">✏️</button>
                 <button class="action-btn delete" onclick="deleteDonation(${don.id})" title="מחק">🗑️</button>
             </td>
@@ -439,7 +466,47 @@ function renderDonationsTable() {
             <td style="font-weight: 600;">${don.donor_name}</td>
             <td style="color: var(--gray-500);">${don.id}</td>
         </tr>
-    `).join('');
+    `;
+}
+
+function renderRegistrationsTable() {
+    const tbody = document.getElementById('registrations-table');
+    
+    if (!currentData.registrations || currentData.registrations.length === 0) {
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="9" class="empty-state">
+                    <div class="empty-state-icon">👥</div>
+                    <div class="empty-state-title">אין רישומים עדיין</div>
+                    <div class="empty-state-desc">רישומים חדשים יופיעו כאן</div>
+                </td>
+            </tr>
+        `;
+        return;
+    }
+    
+    tbody.innerHTML = currentData.registrations.map(registrationRow).join('');
+    
+    console.log(`📋 Rendered ${currentData.registrations.length} registrations`);
+}
+
+function renderDonationsTable() {
+    const tbody = document.getElementById('donations-table');
+    
+    if (!currentData.donations || currentData.donations.length === 0) {
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="9" class="empty-state">
+                    <div class="empty-state-icon">💝</div>
+                    <div class="empty-state-title">אין תרומות עדיין</div>
+                    <div class="empty-state-desc">תרומות חדשות יופיעו כאן</div>
+                </td>
+            </tr>
+        `;
+        return;
+    }
+    
+    tbody.innerHTML = currentData.donations.map(donationRow).join('');
     
     console.log(`💰 Rendered ${currentData.donations.length} donations`);
 }
@@ -763,20 +830,184 @@ async function deleteDonation(id) {
     }
 }
 
+// Full-text search - ranked server-side over all registrations and donations (/api/admin/search)
+let searchTimer = null;
+let searchSeq = 0;
+let lastSearchQuery = '';
+
+function onSearchInput(value) {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => runSearch(value.trim()), 200);
+}
+
+async function runSearch(query, offset = 0) {
+    const panel = document.getElementById('search-results');
+    if (!query) {
+        panel.style.display = 'none';
+        return;
+    }
+    
+    // Ignore responses that arrive after a newer query was sent
+    const seq = ++searchSeq;
+    lastSearchQuery = query;
+    try {
+        const result = await makeApiCall(`/api/admin/search?q=${encodeURIComponent(query)}&offset=${offset}`);
+        if (seq !== searchSeq) return;
+        renderSearchResults(result, offset > 0);
+    } catch (error) {
+        console.error('Search failed:', error);
+    }
+}
+
+function escapeHTML(text) {
+    return String(text ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    }[ch]));
+}
+
+function renderSearchResults(result, append) {
+    const panel = document.getElementById('search-results');
+    const list = result.results.map(hit => {
+        const record = hit.record;
+        const title = hit.type === 'registrations'
+            ? `👥 ${escapeHTML(record.name)} · ${escapeHTML(getStatusText(record.status))}`
+            : `💝 ${escapeHTML(record.donor_name)} · ₪${record.amount} · ${escapeHTML(getDonationStatusText(record.status))}`;
+        const snippet = escapeHTML(hit.snippet).replace(/\[/g, '<mark>').replace(/\]/g, '</mark>');
+        return `
+            <button class="search-hit" onclick="openSearchResult('${hit.type}', ${hit.id})">
+                <span class="search-hit-title">${title}</span>
+                <span class="search-hit-snippet">${snippet}</span>
+            </button>
+        `;
+    }).join('');
+    
+    const more = result.next_offset !== null
+        ? `<button class="search-more" onclick="this.remove(); runSearch(lastSearchQuery, ${result.next_offset})">עוד תוצאות</button>`
+        : '';
+    
+    if (append) {
+        panel.insertAdjacentHTML('beforeend', list + more);
+    } else {
+        panel.innerHTML = result.total === 0
+            ? '<div class="search-empty">לא נמצאו תוצאות</div>'
+            : `<div class="search-summary">${result.total} תוצאות</div>` + list + more;
+    }
+    panel.style.display = 'block';
+}
+
+function openSearchResult(type, id) {
+    document.getElementById('search-results').style.display = 'none';
+    switchToSection(type);
+    
+    const row = document.querySelector(`#${type}-table tr[data-id="${id}"]`);
+    if (row) {
+        row.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        row.classList.add('search-highlight');
+        setTimeout(() => row.classList.remove('search-highlight'), 2500);
+    }
+}
+
+// Bulk actions - multi-select rows, one request per action (/api/admin/bulk/<table>)
+function toggleRowSelection(type, id, checked) {
+    if (checked) {
+        selectedIds[type].add(id);
+    } else {
+        selectedIds[type].delete(id);
+    }
+    updateBulkBar(type);
+}
+
+function toggleSelectAll(type, checked) {
+    document.querySelectorAll(`#${type}-table .row-select`).forEach(checkbox => {
+        checkbox.checked = checked;
+        const id = Number(checkbox.closest('tr').dataset.id);
+        if (checked) {
+            selectedIds[type].add(id);
+        } else {
+            selectedIds[type].delete(id);
+        }
+    });
+    updateBulkBar(type);
+}
+
+function clearSelection(type) {
+    selectedIds[type].clear();
+    document.querySelectorAll(`#${type}-table .row-select`).forEach(checkbox => checkbox.checked = false);
+    const selectAll = document.getElementById(`${type}-select-all`);
+    if (selectAll) selectAll.checked = false;
+    updateBulkBar(type);
+}
+
+function updateBulkBar(type) {
+    const bar = document.getElementById(`${type}-bulk`);
+    if (!bar) return;
+    const count = selectedIds[type].size;
+    document.getElementById(`${type}-bulk-count`).textContent = count;
+    bar.style.display = count > 0 ? 'flex' : 'none';
+}
+
+async function runBulkAction(type, action) {
+    const ids = Array.from(selectedIds[type]);
+    if (ids.length === 0) return;
+    
+    const body = { action, ids };
+    if (action === 'status') {
+        body.status = document.getElementById(`${type}-bulk-status`).value;
+    } else if (action === 'note') {
+        const note = prompt(`הערה להוספה ל-${ids.length} רשומות:`);
+        if (!note) return;
+        body.note = note;
+    } else if (action === 'delete') {
+        if (!confirm(`האם אתה בטוח שברצונך למחוק ${ids.length} רשומות? פעולה זו לא ניתנת לביטול.`)) return;
+    }
+    
+    try {
+        const result = await makeApiCall(`/api/admin/bulk/${type}`, {
+            method: 'POST',
+            body: JSON.stringify(body)
+        });
+        
+        const missing = result.results.filter(r => r.result === 'not_found').length;
+        clearSelection(type);
+        // The changed rows arrive through the regular delta sync
+        await syncChanges();
+        showNotification(
+            missing > 0 ? `עודכנו ${result.affected} רשומות (${missing} לא נמצאו)` : `עודכנו ${result.affected} רשומות`,
+            'success'
+        );
+        console.log(`📦 Bulk ${action} on ${result.affected} ${type}`);
+        
+    } catch (error) {
+        console.error('Bulk action failed:', error);
+        showNotification('שגיאה בביצוע הפעולה המרובה', 'error');
+    }
+}
+
 // Filtering functions
-function filterRegistrations() {
-    const statusFilter = document.getElementById('reg-status-filter').value;
-    const sourceFilter = document.getElementById('reg-source-filter').value;
+// Status/source filters run on the server (indexed query grammar); study level is parsed from notes here
+function serverFilters(filterIds) {
+    const filters = {};
+    Object.entries(filterIds).forEach(([param, elementId]) => {
+        const value = document.getElementById(elementId).value;
+        if (value) filters[param] = value;
+    });
+    return filters;
+}
+
+async function filterRegistrations() {
+    const filters = serverFilters({ status: 'reg-status-filter', source: 'reg-source-filter' });
     const levelFilter = document.getElementById('reg-level-filter').value;
     
     let filteredData = currentData.registrations;
     
-    if (statusFilter) {
-        filteredData = filteredData.filter(r => r.status === statusFilter);
-    }
-    
-    if (sourceFilter) {
-        filteredData = filteredData.filter(r => r.source === sourceFilter);
+    if (Object.keys(filters).length > 0) {
+        try {
+            filteredData = await fetchAllPages('/api/admin/registrations', REGISTRATION_LIST_FIELDS, 1000, filters);
+        } catch (error) {
+            console.error('Failed to filter registrations:', error);
+            showNotification('שגיאה בסינון הרישומים', 'error');
+            return;
+        }
     }
     
     if (levelFilter) {
@@ -788,159 +1019,87 @@ function filterRegistrations() {
     
     // Re-render table with filtered data
     const tbody = document.getElementById('registrations-table');
-    tbody.innerHTML = filteredData.map((reg, index) => `
-        <tr data-id="${reg.id}">
-            <td class="table-actions">
-                <button class="action-btn edit" onclick="editRegistration(${reg.id})" title="ערוך">✏️</button>
-                <button class="action-btn delete" onclick="deleteRegistration(${reg.id})" title="מחק">🗑️</button>
-            </td>
-            <td>
-                <span class="status-badge status-${(reg.status || 'pending').replace('_', '-')}">
-                    ${getStatusText(reg.status || 'pending_beta')}
-                </span>
-            </td>
-            <td>${formatDate(reg.created_at)}</td>
-            <td>${getStudyLevelFromNotes(reg.notes || '')}</td>
-            <td>${getSourceText(reg.source)}</td>
-            <td><a href="tel:${reg.phone}" style="color: var(--primary-600);">${reg.phone}</a></td>
-            <td><a href="mailto:${reg.email}" style="color: var(--primary-600);">${reg.email}</a></td>
-            <td style="font-weight: 600;">${reg.name}</td>
-            <td style="color: var(--gray-500);">${reg.id}</td>
-        </tr>
-    `).join('');
+    tbody.innerHTML = filteredData.map(registrationRow).join('');
     
     console.log(`🔍 Filtered to ${filteredData.length} registrations`);
 }
 
-function filterDonations() {
-    const statusFilter = document.getElementById('don-status-filter').value;
+async function filterDonations() {
+    const filters = serverFilters({ status: 'don-status-filter' });
     
     let filteredData = currentData.donations;
     
-    if (statusFilter) {
-        filteredData = filteredData.filter(d => d.status === statusFilter);
+    if (Object.keys(filters).length > 0) {
+        try {
+            filteredData = await fetchAllPages('/api/admin/donations', DONATION_LIST_FIELDS, 1000, filters);
+        } catch (error) {
+            console.error('Failed to filter donations:', error);
+            showNotification('שגיאה בסינון התרומות', 'error');
+            return;
+        }
     }
     
     // Re-render table with filtered data
     const tbody = document.getElementById('donations-table');
-    tbody.innerHTML = filteredData.map((don, index) => `
-        <tr data-id="${don.id}">
-            <td class="table-actions">
-                <button class="action-btn edit" onclick="editDonation(${don.id})" title="ערוך">✏️</button>
-                <button class="action-btn delete" onclick="deleteDonation(${don.id})" title="מחק">🗑️</button>
-            </td>
-            <td>
-                <span class="status-badge status-${don.status || 'pending'}">
-                    ${getDonationStatusText(don.status || 'pending')}
-                </span>
-            </td>
-            <td>${formatDate(don.created_at)}</td>
-            <td style="max-width: 150px; overflow: hidden; text-overflow: ellipsis;" title="${don.message || 'ללא הודעה'}">${don.message || 'ללא הודעה'}</td>
-            <td>${don.donor_phone ? `<a href="tel:${don.donor_phone}" style="color: var(--primary-600);">${don.donor_phone}</a>` : '-'}</td>
-            <td>${don.donor_email ? `<a href="mailto:${don.donor_email}" style="color: var(--primary-600);">${don.donor_email}</a>` : '-'}</td>
-            <td style="font-weight: 700; color: var(--green-600);">₪${don.amount.toLocaleString('he-IL')}</td>
-            <td style="font-weight: 600;">${don.donor_name}</td>
-            <td style="color: var(--gray-500);">${don.id}</td>
-        </tr>
-    `).join('');
+    tbody.innerHTML = filteredData.map(donationRow).join('');
     
     console.log(`🔍 Filtered to ${filteredData.length} donations`);
 }
 
 // Data export functions
+// הייצוא נבנה בשרת בסטרימינג (/api/admin/export) - לא תלוי במה שנטען לדשבורד
+const EXPORT_STATUS_FILTERS = {
+    registrations: 'reg-status-filter',
+    donations: 'don-status-filter'
+};
+
 function exportData(type) {
     console.log(`📁 Exporting data: ${type}`);
     ensureSidebarClosed();
     
-    let data, filename;
-    
-    switch (type) {
-        case 'registrations':
-            data = currentData.registrations;
-            filename = `gmarup-registrations-${new Date().toISOString().split('T')[0]}.csv`;
-            break;
-        case 'donations':
-            data = currentData.donations;
-            filename = `gmarup-donations-${new Date().toISOString().split('T')[0]}.csv`;
-            break;
-        case 'analytics':
-            data = currentData.analytics;
-            filename = `gmarup-analytics-${new Date().toISOString().split('T')[0]}.csv`;
-            break;
-        case 'all':
-            exportAllData();
-            return;
-        default:
-            showNotification('סוג ייצוא לא ידוע', 'error');
-            return;
+    if (type === 'all') {
+        exportAllData();
+        return;
     }
     
-    if (!data || data.length === 0) {
-        showNotification('אין נתונים לייצוא', 'error');
+    if (!['registrations', 'donations', 'analytics'].includes(type)) {
+        showNotification('סוג ייצוא לא ידוע', 'error');
         return;
     }
     
-    try {
-        const csv = convertToCSV(data);
-        downloadCSV(csv, filename);
-        showNotification(`ייצוא ${type} הושלם בהצלחה`, 'success');
-    } catch (error) {
-        console.error('Export error:', error);
-        showNotification('שגיאה בייצוא הנתונים', 'error');
+    const params = new URLSearchParams({ format: 'csv' });
+    const statusFilter = document.getElementById(EXPORT_STATUS_FILTERS[type]);
+    if (statusFilter && statusFilter.value) {
+        params.set('status', statusFilter.value);
     }
-}
-
-function convertToCSV(data) {
-    if (!data || data.length === 0) return '';
     
-    const headers = Object.keys(data[0]);
-    const csvHeaders = headers.join(',');
-    
-    const csvRows = data.map(row => {
-        return headers.map(header => {
-            const value = row[header];
-            // Escape commas and quotes in CSV
-            if (typeof value === 'string' && (value.includes(',') || value.includes('"'))) {
-                return `"${value.replace(/"/g, '""')}"`;
-            }
-            return value || '';
-        }).join(',');
-    });
-    
-    return [csvHeaders, ...csvRows].join('\n');
+    downloadURL(`/api/admin/export/${type}?${params}`);
+    showNotification(`ייצוא ${type} התחיל`, 'success');
 }
 
-function downloadCSV(csv, filename) {
-    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
+function downloadURL(url) {
     const link = document.createElement('a');
-    
-    if (link.download !== undefined) {
-        const url = URL.createObjectURL(blob);
-        link.setAttribute('href', url);
-        link.setAttribute('download', filename);
-        link.style.visibility = 'hidden';
-        document.body.appendChild(link);
-        link.click();
-        document.body.removeChild(link);
-    } else {
-        alert('הדפדפן שלך לא תומך בהורדת קבצים');
-    }
+    link.href = url;
+    link.style.visibility = 'hidden';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
 }
 
 function exportAllData() {
-    const allData = {
-        registrations: currentData.registrations,
-        donations: currentData.donations,
-        analytics: currentData.analytics,
+    // כל טבלה כ-NDJSON מהשרת, וההגדרות (קטנות) מהזיכרון
+    ['registrations', 'donations', 'analytics'].forEach((type, index) => {
+        setTimeout(() => downloadURL(`/api/admin/export/${type}?format=ndjson`), index * 500);
+    });
+    
+    const settings = {
         settings: currentData.settings,
         exported_at: new Date().toISOString()
     };
-    
-    const json = JSON.stringify(allData, null, 2);
-    const blob = new Blob([json], { type: 'application/json' });
+    const blob = new Blob([JSON.stringify(settings, null, 2)], { type: 'application/json' });
     const link = document.createElement('a');
     
-    const filename = `gmarup-full-export-${new Date().toISOString().split('T')[0]}.json`;
+    const filename = `gmarup-settings-${new Date().toISOString().split('T')[0]}.json`;
     
     const url = URL.createObjectURL(blob);
     link.href = url;
@@ -948,7 +1107,7 @@ function exportAllData() {
     link.click();
     URL.revokeObjectURL(url);
     
-    showNotification('ייצוא מלא הושלם בהצלחה', 'success');
+    showNotification('ייצוא מלא התחיל', 'success');
 }
 
 // Settings management
@@ -1169,13 +1328,130 @@ async function refreshAnalytics() {
 
 // Auto-refresh setup
 function setupAutoRefresh() {
-    // Refresh data every 30 seconds for better real-time updates
+    // Live feed first; the 30-second delta poll is the fallback while it is down
+    setupLiveStream();
+    
     refreshInterval = setInterval(() => {
+        if (liveStream && liveStream.readyState === EventSource.OPEN && Date.now() - lastRefresh < 5 * 60 * 1000) {
+            return;
+        }
         console.log('🔄 Auto-refreshing data...');
-        loadAllData();
+        syncChanges();
     }, 30 * 1000);
     
-    console.log('⏰ Auto-refresh setup: every 30 seconds');
+    console.log('⏰ Auto-refresh setup: live stream + every 30 seconds fallback');
+}
+
+// Live change feed (Server-Sent Events) - event ids are change-log seqs, so the
+// browser resumes from the same place as the delta token after a reconnect
+function setupLiveStream() {
+    if (!window.EventSource || liveStream) {
+        return;
+    }
+    const seq = changeToken ? changeToken.split('.')[0] : '';
+    liveStream = new EventSource(`/api/admin/stream${seq ? `?last_event_id=${seq}` : ''}`);
+    
+    liveStream.addEventListener('change', event => {
+        applyLiveChange(JSON.parse(event.data), event.lastEventId);
+    });
+    liveStream.addEventListener('reset', () => {
+        console.log('🔄 Live stream reset - syncing changes');
+        syncChanges();
+    });
+    liveStream.onerror = () => {
+        // Too many viewers (503) closes the stream for good - polling takes over
+        if (liveStream.readyState === EventSource.CLOSED) {
+            console.log('📡 Live stream closed - falling back to polling');
+            liveStream = null;
+        }
+    };
+}
+
+let liveRenderTimer = null;
+
+function applyLiveChange(change, seq) {
+    if (!(change.table in selectedIds)) {
+        // Settings and other tables carry no row - the delta endpoint has them
+        syncChanges();
+        return;
+    }
+    const delta = change.op === 'delete'
+        ? { upserted: [], deleted: [change.id] }
+        : { upserted: [change.row], deleted: [] };
+    currentData[change.table] = mergeRows(currentData[change.table], delta);
+    
+    if (changeToken && seq) {
+        changeToken = `${seq}.${changeToken.split('.')[1]}`;
+    }
+    lastRefresh = new Date();
+    
+    // A burst of events (bulk actions) re-renders once
+    clearTimeout(liveRenderTimer);
+    liveRenderTimer = setTimeout(async () => {
+        await loadSummary();
+        updateDashboardStats();
+        loadSectionData(currentSection);
+    }, 250);
+}
+
+// Delta sync - merge rows changed since the last token instead of reloading everything
+async function syncChanges() {
+    if (!changeToken) {
+        return loadAllData();
+    }
+    
+    try {
+        const delta = await makeApiCall(`/api/admin/changes?since=${encodeURIComponent(changeToken)}`);
+        
+        if (delta.reset) {
+            console.log('🔄 Change token expired - full reload');
+            return loadAllData();
+        }
+        
+        const regsChanged = delta.registrations.upserted.length + delta.registrations.deleted.length > 0;
+        const donsChanged = delta.donations.upserted.length + delta.donations.deleted.length > 0;
+        
+        if (regsChanged) {
+            currentData.registrations = mergeRows(currentData.registrations, delta.registrations);
+        }
+        if (donsChanged) {
+            currentData.donations = mergeRows(currentData.donations, delta.donations);
+        }
+        if (delta.analytics.length > 0) {
+            currentData.analytics = [...delta.analytics, ...currentData.analytics].slice(0, 200);
+        }
+        if (delta.settings) {
+            currentData.settings = delta.settings;
+            localStorage.setItem('admin_settings_backup', JSON.stringify(currentData.settings));
+        }
+        
+        changeToken = delta.token;
+        lastRefresh = new Date();
+        
+        if (regsChanged || donsChanged || delta.analytics.length > 0 || delta.settings) {
+            if (regsChanged || donsChanged) {
+                await loadSummary();
+            }
+            updateDashboardStats();
+            loadSectionData(currentSection);
+            console.log(`🔄 Merged changes: ${delta.registrations.upserted.length} registrations, ${delta.donations.upserted.length} donations, ${delta.analytics.length} events`);
+        }
+        
+    } catch (error) {
+        console.error('❌ Error syncing changes:', error);
+    }
+}
+
+function mergeRows(rows, delta) {
+    const byId = new Map(rows.map(row => [row.id, row]));
+    
+    delta.deleted.forEach(id => byId.delete(id));
+    delta.upserted.forEach(row => byId.set(row.id, { ...byId.get(row.id), ...row }));
+    
+    // Keep the server order: newest first
+    return Array.from(byId.values()).sort((a, b) =>
+        (b.created_at || '').localeCompare(a.created_at || '') || b.id - a.id
+    );
 }
 
 // Loading states
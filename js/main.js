@@ -302,6 +302,43 @@ function joinWhatsApp() {
     }
 }
 
+// Donation save with an idempotency key - a retry or a second tap for the same
+// amount reuses the key until the server answers, so it never creates a duplicate
+const pendingDonationKeys = {};
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return 'don-' + Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+}
+
+async function saveDonation(donationData) {
+    const slot = donationData.source + ':' + donationData.amount;
+    const key = pendingDonationKeys[slot] || (pendingDonationKeys[slot] = newIdempotencyKey());
+    const request = {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': key
+        },
+        body: JSON.stringify(donationData)
+    };
+    
+    let response;
+    try {
+        response = await fetch('/api/donate', request);
+    } catch (networkError) {
+        // Flaky mobile connection - one retry with the same key
+        response = await fetch('/api/donate', request);
+    }
+    if (response.status < 500) {
+        // The server has a definite answer for this key - the next donation gets a new one
+        delete pendingDonationKeys[slot];
+    }
+    return response;
+}
+
 // Donation functions
 async function donate(amount) {
     try {
@@ -319,13 +356,7 @@ async function donate(amount) {
         };
         
         try {
-            const response = await fetch('/api/donate', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(donationData)
-            });
+            const response = await saveDonation(donationData);
             
             if (response.ok) {
                 const result = await response.json();
@@ -481,13 +512,7 @@ function initializeDonationModal() {
                 
                 this.innerHTML = '🔄 שומר תרומה...';
                 
-                const response = await fetch('/api/donate', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(donationData)
-                });
+                const response = await saveDonation(donationData);
                 
                 if (response.ok) {
                     const result = await response.json();
@@ -12,8 +12,8 @@ def main():
     os.chdir(os.path.dirname(__file__))
     
     try:
-        # הפעל את השרת החדש
-        subprocess.run([sys.executable, 'server.py'])
+        # הפעל את השרת החדש (פרמטרים מועברים הלאה, למשל --production --workers 4)
+        subprocess.run([sys.executable, 'server.py'] + sys.argv[1:])
     except KeyboardInterrupt:
         print("\n✅ Server stopped")
     except Exception as e:
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+GmarUp List Query - דקדוק סינון ומיון לרשימות האדמין, מתורגם ל-SQL עם פרמטרים
+
+פרמטרים נתמכים (כולם אופציונליים, מצטברים ב-AND):
+    status=a,b   source=a,b        רשימת ערכים (IN)
+    from= / to=                    טווח על created_at (to של תאריך בלבד כולל את כל היום)
+    min_amount= / max_amount=      טווח סכום (תרומות)
+    sort=created_at / -amount ...  מינוס = סדר יורד; ברירת מחדל -created_at
+
+רק עמודות מהרשימות הלבנות כאן נכנסות ל-SQL - ערכים תמיד עוברים כפרמטרים.
+לכל צירוף מסנן/מיון יש אינדקס מורכב ב-migrations.INDEXES; test_query_plans.py
+מוודא זאת מול EXPLAIN QUERY PLAN.
+"""
+
+import json
+import base64
+from datetime import datetime, timedelta
+
+# עמודות שאפשר לסנן לפיהן בכל טבלה
+FILTER_COLUMNS = {
+    'registrations': ('created_at', 'status', 'source'),
+    'donations': ('created_at', 'status', 'source', 'amount'),
+    'analytics': ('created_at',),
+    'activity_log': ('created_at',),
+    'donation_activity': ('created_at',),
+}
+
+# פרמטר -> עמודה לסינון לפי רשימת ערכים
+IN_FILTERS = {'status': 'status', 'source': 'source'}
+
+# פרמטר -> (עמודה, אופרטור) לסינון טווח מספרי
+RANGE_FILTERS = {
+    'min_amount': ('amount', '>='),
+    'max_amount': ('amount', '<='),
+}
+
+# עמודות מיון לכל טבלה - כולן NOT NULL, כך ש-(עמודה, id) הוא מפתח keyset תקין
+SORT_COLUMNS = {
+    'registrations': ('created_at', 'updated_at'),
+    'donations': ('created_at', 'amount'),
+}
+DEFAULT_SORT = '-created_at'
+
+
+def _values(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(',') if v.strip()]
+
+
+def _require_column(table, column, param):
+    if column not in FILTER_COLUMNS[table]:
+        raise ValueError(f'לטבלה {table} אין {param}')
+
+
+def where_clause(table, args):
+    """(where, params) מהמסננים ב-args. where ריק אם אין מסננים"""
+    where, params = [], []
+    if args.get('from'):
+        where.append('created_at >= ?')
+        params.append(datetime.fromisoformat(args['from']).isoformat())
+    if args.get('to'):
+        end = datetime.fromisoformat(args['to'])
+        if 'T' not in args['to']:
+            # תאריך בלבד = כולל את כל היום
+            end += timedelta(days=1)
+        where.append('created_at < ?')
+        params.append(end.isoformat())
+
+    for param, column in IN_FILTERS.items():
+        if args.get(param):
+            _require_column(table, column, param)
+            values = _values(args[param])
+            where.append(f'{column} IN ({",".join("?" for _ in values)})')
+            params.extend(values)
+
+    for param, (column, op) in RANGE_FILTERS.items():
+        if args.get(param) not in (None, ''):
+            _require_column(table, column, param)
+            where.append(f'{column} {op} ?')
+            params.append(float(args[param]))
+
+    return ' AND '.join(where), params
+
+
+def parse_sort(table, value):
+    """(עמודה, יורד?) מ-sort=; זורק ValueError על עמודה שלא ברשימה"""
+    value = value or DEFAULT_SORT
+    descending = value.startswith('-')
+    column = value.lstrip('-+')
+    if column not in SORT_COLUMNS[table]:
+        raise ValueError(f'מיון לא נתמך: {value} (אפשרויות: {", ".join(SORT_COLUMNS[table])})')
+    return column, descending
+
+
+def encode_cursor(sort, value, row_id):
+    """cursor אטום לעמוד הבא - המיון והמיקום האחרון לפי (עמודת המיון, id)"""
+    raw = json.dumps([sort, value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError('cursor לא תקין')
+    if cursor_sort != sort:
+        raise ValueError('ה-cursor שייך למיון אחר')
+    return value, row_id
+
+
+def page_query(table, columns, args, limit):
+    """(sql, params, sort_column, sort) לעמוד אחד - keyset על (עמודת המיון, id)"""
+    sort = args.get('sort') or DEFAULT_SORT
+    sort_column, descending = parse_sort(table, sort)
+    where, params = where_clause(table, args)
+    conditions = [where] if where else []
+
+    if args.get('cursor'):
+        conditions.append(f'({sort_column}, id) {"<" if descending else ">"} (?, ?)')
+        params.extend(decode_cursor(args['cursor'], sort))
+
+    direction = 'DESC' if descending else 'ASC'
+    sql = f'SELECT {", ".join(columns)} FROM {table}'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {sort_column} {direction}, id {direction} LIMIT ?'
+    return sql, params + [limit], sort_column, sort
+
+
+def count_query(table, args):
+    where, params = where_clause(table, args)
+    sql = f'SELECT COUNT(*) FROM {table}'
+    if where:
+        sql += ' WHERE ' + where
+    return sql, params
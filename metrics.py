@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+GmarUp Metrics - מדידת בקשות וחשיפה בפורמט Prometheus (/api/metrics)
+
+לכל route: מספר בקשות לפי סטטוס, והיסטוגרמות של זמן כולל, זמן מסד נתונים
+(זמן החזקת חיבור מה-pool), זמן סריאליזציה ל-JSON וגודל תשובה. בנוסף: בקשות
+פתוחות כרגע וזמן המתנה לחיבור פנוי ב-pool.
+
+המדדים נשמרים בזיכרון של התהליך - במצב production כל worker מחזיק מדדים משלו
+(gmarup_process_pid מזהה איזה worker ענה ל-scrape).
+לוג גישה מובנה (JSON לשורה) מופעל עם GMARUP_ACCESS_LOG=1.
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+access_logger = logging.getLogger('gmarup.access')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# זמני DB וסריאליזציה של הבקשה הנוכחית (לכל thread בנפרד)
+_current = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        # labels -> [מונה לכל bucket (לא מצטבר) + inf, sum, count]
+        self.series = {}
+
+    def observe(self, value, labels=()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        names = self.label_names + ('le',)
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                yield f'{self.name}_bucket{_format_labels(names, labels + (_format_number(bound),))} {cumulative}'
+            label_text = _format_labels(self.label_names, labels)
+            yield f'{self.name}_sum{label_text} {round(series[-2], 6)}'
+            yield f'{self.name}_count{label_text} {series[-1]}'
+
+
+class Metrics:
+    def __init__(self, prefix='gmarup', access_log=False):
+        self.access_log = access_log
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.collectors = []
+        route = ('route', 'method')
+
+        self.requests = Counter(f'{prefix}_http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+        self.duration = Histogram(f'{prefix}_http_request_duration_seconds', 'Total request time', LATENCY_BUCKETS, route)
+        self.db_time = Histogram(f'{prefix}_http_db_duration_seconds', 'Time holding a DB connection per request', LATENCY_BUCKETS, route)
+        self.serialize_time = Histogram(f'{prefix}_http_serialize_duration_seconds', 'JSON serialization time per request', LATENCY_BUCKETS, route)
+        self.size = Histogram(f'{prefix}_http_response_size_bytes', 'Response body size', SIZE_BUCKETS, route)
+        self.pool_wait = Histogram(f'{prefix}_db_pool_wait_seconds', 'Wait for a free pooled connection', LATENCY_BUCKETS)
+        self.prefix = prefix
+
+    # --- hooks ---
+
+    def observe_db(self, wait, held):
+        """ConnectionPool.observer"""
+        with self._lock:
+            self.pool_wait.observe(wait)
+        if getattr(_current, 'active', False):
+            _current.db += held
+
+    def add_serialize_time(self, seconds):
+        if getattr(_current, 'active', False):
+            _current.serialize += seconds
+
+    def begin(self):
+        _current.active = True
+        _current.db = 0.0
+        _current.serialize = 0.0
+        g.metrics_start = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (route, request.method)
+        size = response.content_length
+        db, serialize = _current.db, _current.serialize
+
+        with self._lock:
+            self.requests.inc(labels + (str(response.status_code),))
+            self.duration.observe(total, labels)
+            self.db_time.observe(db, labels)
+            self.serialize_time.observe(serialize, labels)
+            if size is not None:
+                self.size.observe(size, labels)
+
+        if self.access_log:
+            access_logger.info(json.dumps({
+                'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'route': route,
+                'status': response.status_code,
+                'ms': round(total * 1000, 2),
+                'db_ms': round(db * 1000, 2),
+                'serialize_ms': round(serialize * 1000, 2),
+                'bytes': size,
+                'ip': request.remote_addr,
+                'ua': request.headers.get('User-Agent', ''),
+            }, ensure_ascii=False))
+        return response
+
+    def end(self, exc=None):
+        if getattr(_current, 'active', False):
+            _current.active = False
+            with self._lock:
+                self.in_flight -= 1
+
+    def init_app(self, app, pool):
+        pool.observer = self.observe_db
+        app.json = TimedJSONProvider(app, self)
+        app.before_request(self.begin)
+        app.after_request(self.finish)
+        app.teardown_request(self.end)
+
+    def add_collector(self, fn):
+        """fn() -> [(name, type, help, value)] - מדדים שנקראים רק בזמן ה-scrape.
+
+        עם labels: (name, type, help, {label_values: value}, label_names)
+        """
+        self.collectors.append(fn)
+
+    # --- פלט ---
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append(f'# TYPE {self.prefix}_http_requests_in_flight gauge')
+            lines.append(f'{self.prefix}_http_requests_in_flight {self.in_flight}')
+            for metric in (self.requests, self.duration, self.db_time, self.serialize_time, self.size, self.pool_wait):
+                lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, kind, help_text, value, *label_names in collector():
+                lines.append(f'# HELP {self.prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {self.prefix}_{name} {kind}')
+                if label_names:
+                    for labels, series in sorted(value.items()):
+                        lines.append(f'{self.prefix}_{name}{_format_labels(label_names[0], labels)} {_format_number(series)}')
+                else:
+                    lines.append(f'{self.prefix}_{name} {_format_number(value)}')
+        lines.append(f'# TYPE {self.prefix}_process_pid gauge')
+        lines.append(f'{self.prefix}_process_pid {os.getpid()}')
+        return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify רגיל שמודד את זמן הסריאליזציה לבקשה הנוכחית"""
+
+    def __init__(self, app, metrics):
+        super().__init__(app)
+        self.metrics = metrics
+
+    def response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            self.metrics.add_serialize_time(time.perf_counter() - start)
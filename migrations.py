@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+GmarUp Migrations - מנוע מיגרציות אחיד לשרת ול-database/init_db.py
+
+כל מיגרציה מקבלת מספר גרסה ורצה פעם אחת בטרנזקציה משלה; הגרסה נשמרת
+ב-PRAGMA user_version. כשהסכמה עדכנית, migrate() מסתכמת בשתי שאילתות.
+אינדקסים מוגדרים בנפרד ב-INDEXES - על טבלאות גדולות הם נבנים ברקע.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+import search_index
+from ingest import canonical_email, canonical_phone
+
+logger = logging.getLogger(__name__)
+
+# טבלאות שיומן השינויים (סנכרון דלתא) עוקב אחריהן
+CHANGE_TRACKED_TABLES = ('registrations', 'donations', 'settings')
+
+# כמה רישומים/מפתחות כפולים מעובדים בכל סבב של מיגרציה 6
+MERGE_BATCH_SIZE = 500
+
+# טבלה עם יותר שורות מזה - האינדקס שלה נבנה ב-thread רקע ולא חוסם את העלייה
+ONLINE_INDEX_THRESHOLD = 50000
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_column(conn, table, column, definition):
+    if column not in _columns(conn, table):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _seed_settings(conn, settings):
+    now = datetime.now().isoformat()
+    conn.executemany('''
+        INSERT OR IGNORE INTO settings (key, value, updated_at)
+        VALUES (?, ?, ?)
+    ''', [(key, value, now) for key, value in settings])
+
+
+def _v1_base_schema(conn):
+    """הסכמה המקורית של server.init_database"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS registrations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            source TEXT DEFAULT 'website',
+            status TEXT DEFAULT 'new',
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            ip_address TEXT,
+            user_agent TEXT,
+            lead_score INTEGER DEFAULT 75,
+            notes TEXT,
+            last_contacted TEXT,
+            attempt_count INTEGER DEFAULT 1
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS donations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            donation_id TEXT UNIQUE NOT NULL,
+            amount REAL NOT NULL,
+            donor_name TEXT NOT NULL,
+            donor_email TEXT,
+            donor_phone TEXT,
+            message TEXT,
+            source TEXT DEFAULT 'website',
+            status TEXT DEFAULT 'pending',
+            created_at TEXT NOT NULL,
+            completed_at TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            is_anonymous INTEGER DEFAULT 0
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            action TEXT NOT NULL,
+            label TEXT,
+            value INTEGER,
+            url TEXT,
+            ip_address TEXT,
+            created_at TEXT NOT NULL
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS activity_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lead_id INTEGER,
+            action TEXT NOT NULL,
+            details TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (lead_id) REFERENCES registrations (id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS donation_activity (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            donation_id INTEGER,
+            action TEXT NOT NULL,
+            details TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (donation_id) REFERENCES donations (id)
+        )
+    ''')
+
+    _seed_settings(conn, [
+        ('whatsapp_link', 'https://chat.whatsapp.com/LNmVCXvv35S9SsbWTol2qW'),
+        ('bit_phone', '0502277660'),
+        ('admin_email', 'gmarupil@gmail.com'),
+        ('site_title', 'גמראפ - לימוד גמרא לכל אחד'),
+        ('memorial_counter_start', '2500'),
+        ('admin_password', '0544227754')
+    ])
+
+
+def _v2_init_db_columns(conn):
+    """עמודות וטבלאות שהיו רק ב-database/init_db.py"""
+    _add_column(conn, 'registrations', 'newsletter', 'INTEGER DEFAULT 0')
+    _add_column(conn, 'donations', 'payment_method', "TEXT DEFAULT 'bit'")
+    _add_column(conn, 'donations', 'transaction_id', 'TEXT')
+    _add_column(conn, 'analytics', 'user_agent', 'TEXT')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS communications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            audience TEXT NOT NULL,
+            message TEXT NOT NULL,
+            recipients_count INTEGER NOT NULL,
+            sent_at TEXT NOT NULL,
+            status TEXT DEFAULT 'sent'
+        )
+    ''')
+
+    _seed_settings(conn, [
+        ('donations_counter_start', '120000'),
+        ('auto_backup_enabled', '1'),
+        ('email_notifications', '1'),
+        ('analytics_enabled', '1')
+    ])
+
+
+def _v3_change_log(conn):
+    """יומן שינויים לסנכרון דלתא - seq עולה תמיד, מחיקות נשמרות כ-tombstone"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+    ''')
+    for table in CHANGE_TRACKED_TABLES:
+        for event, op, ref in (('INSERT', 'upsert', 'NEW'), ('UPDATE', 'upsert', 'NEW'), ('DELETE', 'delete', 'OLD')):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_change
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, op, changed_at)
+                    VALUES ('{table}', {ref}.rowid, '{op}', strftime('%Y-%m-%dT%H:%M:%S', 'now'));
+                END
+            ''')
+
+    # האינדקסים על created_at בודד מוחלפים ב-(created_at, id) של העימוד
+    conn.execute('DROP INDEX IF EXISTS idx_registrations_created_at')
+    conn.execute('DROP INDEX IF EXISTS idx_donations_created_at')
+
+
+def _study_level_sql(notes):
+    # אותו זיהוי כמו getStudyLevelFromNotes ב-admin.js
+    return f'''CASE
+        WHEN {notes} LIKE '%beginner%' OR {notes} LIKE '%מתחיל%' THEN 'beginner'
+        WHEN {notes} LIKE '%intermediate%' OR {notes} LIKE '%בינוני%' THEN 'intermediate'
+        WHEN {notes} LIKE '%advanced%' OR {notes} LIKE '%מתקדם%' THEN 'advanced'
+        ELSE 'unknown' END'''
+
+
+def _registration_stats_delta(ref, delta):
+    return f'''
+        INSERT INTO registration_stats (day, status, source, study_level, count)
+        VALUES (substr({ref}.created_at, 1, 10), COALESCE({ref}.status, ''), COALESCE({ref}.source, ''),
+                {_study_level_sql(f'{ref}.notes')}, {delta})
+        ON CONFLICT (day, status, source, study_level) DO UPDATE SET count = count + excluded.count;
+    '''
+
+
+def _donation_stats_delta(ref, sign):
+    return f'''
+        INSERT INTO donation_stats (day, status, count, amount)
+        VALUES (substr({ref}.created_at, 1, 10), COALESCE({ref}.status, ''), {sign}1, {sign}{ref}.amount)
+        ON CONFLICT (day, status) DO UPDATE SET
+            count = count + excluded.count,
+            amount = amount + excluded.amount;
+    '''
+
+
+def _v4_summary_rollups(conn):
+    """טבלאות סיכום שמתעדכנות ע"י טריגרים - הדשבורד לא סופר טבלאות מלאות"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS registration_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            source TEXT NOT NULL,
+            study_level TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status, source, study_level)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS donation_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_insert_stats AFTER INSERT ON registrations
+        BEGIN {_registration_stats_delta('NEW', 1)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_delete_stats AFTER DELETE ON registrations
+        BEGIN {_registration_stats_delta('OLD', -1)} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_update_stats
+        AFTER UPDATE OF created_at, status, source, notes ON registrations
+        BEGIN
+            {_registration_stats_delta('OLD', -1)}
+            {_registration_stats_delta('NEW', 1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_donations_insert_stats AFTER INSERT ON donations
+        BEGIN {_donation_stats_delta('NEW', '+')} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_donations_delete_stats AFTER DELETE ON donations
+        BEGIN {_donation_stats_delta('OLD', '-')} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_donations_update_stats
+        AFTER UPDATE OF created_at, status, amount ON donations
+        BEGIN
+            {_donation_stats_delta('OLD', '-')}
+            {_donation_stats_delta('NEW', '+')}
+        END
+    ''')
+
+    # מילוי ראשוני מהנתונים הקיימים
+    conn.execute('DELETE FROM registration_stats')
+    conn.execute(f'''
+        INSERT INTO registration_stats (day, status, source, study_level, count)
+        SELECT substr(created_at, 1, 10), COALESCE(status, ''), COALESCE(source, ''),
+               {_study_level_sql('notes')}, COUNT(*)
+        FROM registrations
+        GROUP BY 1, 2, 3, 4
+    ''')
+    conn.execute('DELETE FROM donation_stats')
+    conn.execute('''
+        INSERT INTO donation_stats (day, status, count, amount)
+        SELECT substr(created_at, 1, 10), COALESCE(status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+        FROM donations
+        GROUP BY 1, 2
+    ''')
+
+
+def _v5_analytics_rollup(conn):
+    """דליים של דקה/שעה/יום לאירועי אנליטיקס + מצב של jobs ברקע"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_rollup (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            category TEXT NOT NULL,
+            action TEXT NOT NULL,
+            label TEXT NOT NULL,
+            url TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket, category, action, label, url)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_state (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _commit_batch(conn):
+    """משחרר את נעילת הכתיבה בין אצוות של מיגרציה ארוכה ולוקח אותה מחדש.
+
+    worker אחר יכול להיכנס באמצע ולהריץ את אותה מיגרציה - לכן מיגרציה שקוראת
+    לזה חייבת להיות אידמפוטנטית (ולבחור כל אצווה מחדש מתוך המסד).
+    """
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+
+
+def _merge_registration_group(conn, rows, now):
+    """מאחד שורות עם אותו email_key לשורה הוותיקה ביותר"""
+    survivor, duplicates = rows[0], rows[1:]
+    latest = max(rows, key=lambda row: row['updated_at'] or '')
+    notes = []
+    for row in rows:
+        if row['notes'] and row['notes'] not in notes:
+            notes.append(row['notes'])
+    duplicate_ids = [(row['id'],) for row in duplicates]
+
+    conn.execute('''
+        UPDATE registrations
+        SET name = ?, phone = ?, phone_key = ?, status = ?, notes = ?, newsletter = ?,
+            attempt_count = ?, updated_at = ?, last_contacted = ?
+        WHERE id = ?
+    ''', (
+        latest['name'], latest['phone'], latest['phone_key'], latest['status'], '\n'.join(notes),
+        max(row['newsletter'] or 0 for row in rows),
+        sum(row['attempt_count'] or 1 for row in rows),
+        latest['updated_at'],
+        max((row['last_contacted'] for row in rows if row['last_contacted']), default=None),
+        survivor['id']
+    ))
+    conn.executemany('UPDATE activity_log SET lead_id = ? WHERE lead_id = ?',
+                     [(survivor['id'], row_id) for row_id, in duplicate_ids])
+    conn.executemany('DELETE FROM registrations WHERE id = ?', duplicate_ids)
+    conn.execute('''
+        INSERT INTO activity_log (lead_id, action, details, created_at) VALUES (?, ?, ?, ?)
+    ''', (survivor['id'], 'merged', f"אוחדו רישומים כפולים: {', '.join(str(i) for i, in duplicate_ids)}", now))
+
+
+def _v6_registration_keys(conn):
+    """email_key/phone_key קנוניים, איחוד כפילויות קיימות ואינדקס ייחודי ל-UPSERT"""
+    _add_column(conn, 'registrations', 'email_key', 'TEXT')
+    _add_column(conn, 'registrations', 'phone_key', 'TEXT')
+
+    # מילוי המפתחות באצוות לפי id - commit אחרי כל אצווה, כדי לא להחזיק את
+    # נעילת הכתיבה לאורך כל המיגרציה על טבלה גדולה
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, email, phone FROM registrations WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, MERGE_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany('UPDATE registrations SET email_key = ?, phone_key = ? WHERE id = ?',
+                         [(canonical_email(row[1]), canonical_phone(row[2]), row[0]) for row in rows])
+        last_id = rows[-1][0]
+        _commit_batch(conn)
+
+    # אינדקס זמני - כל אצווה מחפשת את הכפילויות הבאות מחדש בלי סריקה מלאה
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_email_key_merge ON registrations(email_key)')
+    columns = ('id', 'name', 'phone', 'phone_key', 'status', 'notes', 'newsletter',
+               'attempt_count', 'updated_at', 'last_contacted')
+    now = datetime.now().isoformat()
+    merged = 0
+    while True:
+        batch = [row[0] for row in conn.execute('''
+            SELECT email_key FROM registrations
+            WHERE email_key IS NOT NULL
+            GROUP BY email_key HAVING COUNT(*) > 1
+            LIMIT ?
+        ''', (MERGE_BATCH_SIZE,))]
+        if not batch:
+            break
+        groups = {}
+        for row in conn.execute(f'''
+            SELECT email_key, {', '.join(columns)} FROM registrations
+            WHERE email_key IN ({','.join('?' for _ in batch)})
+            ORDER BY email_key, id
+        ''', batch):
+            groups.setdefault(row[0], []).append(dict(zip(columns, tuple(row)[1:])))
+        for rows in groups.values():
+            _merge_registration_group(conn, rows, now)
+        merged += len(batch)
+        _commit_batch(conn)
+    if merged:
+        logger.info(f"🔗 אוחדו {merged} קבוצות של רישומים כפולים")
+
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_registrations_email_key ON registrations(email_key)')
+    conn.execute('DROP INDEX IF EXISTS idx_registrations_email_key_merge')
+
+
+def _search_index_values(kind, ref):
+    """(name, email, phone, body) לאינדקס החיפוש - טלפון גם כספרות בלבד"""
+    if kind == 'r':
+        return (f"{ref}.name", f"{ref}.email",
+                f"COALESCE({ref}.phone, '') || ' ' || COALESCE({ref}.phone_key, '')", f"{ref}.notes")
+    digits = f"replace(replace(replace(COALESCE({ref}.donor_phone, ''), '-', ''), ' ', ''), '+972', '0')"
+    return (f"{ref}.donor_name", f"{ref}.donor_email",
+            f"COALESCE({ref}.donor_phone, '') || ' ' || {digits}", f"{ref}.message")
+
+
+def _v7_search_index(conn):
+    """אינדקס FTS5 לחיפוש בדשבורד (search_index.py) - rowid = id*2 (+1 לתרומה)"""
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED, name, email, phone, body,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+    for table, kind, offset, columns in (
+        ('registrations', 'r', 0, 'name, email, phone, phone_key, notes'),
+        ('donations', 'd', 1, 'donor_name, donor_email, donor_phone, message'),
+    ):
+        insert = f'''
+            INSERT INTO search_index (rowid, kind, name, email, phone, body)
+            VALUES (NEW.id * 2 + {offset}, '{kind}', {', '.join(_search_index_values(kind, 'NEW'))});
+        '''
+        delete = f'DELETE FROM search_index WHERE rowid = OLD.id * 2 + {offset};'
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_search AFTER INSERT ON {table}
+            BEGIN {insert} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_search AFTER DELETE ON {table}
+            BEGIN {delete} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_search AFTER UPDATE OF {columns} ON {table}
+            BEGIN {delete} {insert} END
+        ''')
+        conn.execute(f'''
+            INSERT INTO search_index (rowid, kind, name, email, phone, body)
+            SELECT id * 2 + {offset}, '{kind}', {', '.join(_search_index_values(kind, table))}
+            FROM {table}
+        ''')
+
+
+def _v8_drop_single_column_indexes(conn):
+    """אינדקסים על עמודה בודדת שהוחלפו באינדקסים המורכבים של list_query"""
+    for name in ('idx_registrations_status', 'idx_registrations_source',
+                 'idx_donations_status', 'idx_donations_amount'):
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def _v9_idempotency_keys(conn):
+    """תשובות שמורות לפי Idempotency-Key - ניסיון חוזר מחזיר אותן בלי כתיבה חדשה"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (scope, key)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at)')
+
+
+def _search_terms_values(kind, ref):
+    """(name, email, phone, body, terms) לאינדקס החיפוש - בלי ניקוד, ו-terms בלי אותיות שימוש"""
+    name, email, phone, body = _search_index_values(kind, ref)
+    name, body = f'search_text({name})', f'search_text({body})'
+    terms = f"search_prefixes(COALESCE({name}, '') || ' ' || COALESCE({body}, ''))"
+    return name, email, phone, body, terms
+
+
+def _v10_search_terms(conn):
+    """אינדקס החיפוש מחדש עם נרמול עברית בתוכן (search_index.search_text/search_prefixes)"""
+    search_index.register(conn)
+    for table in ('registrations', 'donations'):
+        for event in ('insert', 'delete', 'update'):
+            conn.execute(f'DROP TRIGGER IF EXISTS trg_{table}_{event}_search')
+    conn.execute('DROP TABLE IF EXISTS search_index')
+    conn.execute('''
+        CREATE VIRTUAL TABLE search_index USING fts5(
+            kind UNINDEXED, name, email, phone, body, terms,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+    for table, kind, offset, columns in (
+        ('registrations', 'r', 0, 'name, email, phone, phone_key, notes'),
+        ('donations', 'd', 1, 'donor_name, donor_email, donor_phone, message'),
+    ):
+        insert = f'''
+            INSERT INTO search_index (rowid, kind, name, email, phone, body, terms)
+            VALUES (NEW.id * 2 + {offset}, '{kind}', {', '.join(_search_terms_values(kind, 'NEW'))});
+        '''
+        delete = f'DELETE FROM search_index WHERE rowid = OLD.id * 2 + {offset};'
+        conn.execute(f'''
+            CREATE TRIGGER trg_{table}_insert_search AFTER INSERT ON {table}
+            BEGIN {insert} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER trg_{table}_delete_search AFTER DELETE ON {table}
+            BEGIN {delete} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER trg_{table}_update_search AFTER UPDATE OF {columns} ON {table}
+            BEGIN {delete} {insert} END
+        ''')
+        conn.execute(f'''
+            INSERT INTO search_index (rowid, kind, name, email, phone, body, terms)
+            SELECT id * 2 + {offset}, '{kind}', {', '.join(_search_terms_values(kind, table))}
+            FROM {table}
+        ''')
+
+
+# (גרסה, תיאור, פונקציה) - לפי הסדר, לעולם לא משנים מיגרציה שכבר שוחררה
+MIGRATIONS = [
+    (1, 'base schema', _v1_base_schema),
+    (2, 'columns and tables from database/init_db.py', _v2_init_db_columns),
+    (3, 'change log for dashboard delta sync', _v3_change_log),
+    (4, 'trigger-maintained dashboard rollups', _v4_summary_rollups),
+    (5, 'analytics time-bucket rollups', _v5_analytics_rollup),
+    (6, 'canonical email/phone keys and duplicate merge', _v6_registration_keys),
+    (7, 'FTS5 search index for the admin dashboard', _v7_search_index),
+    (8, 'replace single-column filter indexes with composite ones', _v8_drop_single_column_indexes),
+    (9, 'idempotency keys for /api/donate retries', _v9_idempotency_keys),
+    (10, 'Hebrew normalization (niqqud, prefixes) in the search index', _v10_search_terms),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# (שם, טבלה, הגדרה)
+INDEXES = [
+    ('idx_registrations_created_id', 'registrations', '(created_at, id)'),
+    ('idx_registrations_email', 'registrations', '(email)'),
+    ('idx_registrations_status_created', 'registrations', '(status, created_at, id)'),
+    ('idx_registrations_source_created', 'registrations', '(source, created_at, id)'),
+    ('idx_registrations_updated_id', 'registrations', '(updated_at, id)'),
+    ('idx_registrations_phone_key', 'registrations', '(phone_key)'),
+    ('idx_donations_created_id', 'donations', '(created_at, id)'),
+    ('idx_donations_status_created', 'donations', '(status, created_at, id)'),
+    ('idx_donations_source_created', 'donations', '(source, created_at, id)'),
+    ('idx_donations_amount_id', 'donations', '(amount, id)'),
+    ('idx_analytics_created_at', 'analytics', '(created_at)'),
+    ('idx_analytics_category', 'analytics', '(category)'),
+    ('idx_analytics_session', 'analytics', '(session_id)'),
+    ('idx_activity_log_lead_id', 'activity_log', '(lead_id)'),
+    ('idx_donation_activity_donation_id', 'donation_activity', '(donation_id)'),
+    # העברה לארכיון (archive.py) לפי created_at
+    ('idx_activity_log_created_at', 'activity_log', '(created_at)'),
+    ('idx_donation_activity_created_at', 'donation_activity', '(created_at)'),
+]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def missing_indexes(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [index for index in INDEXES if index[0] not in existing]
+
+
+def _create_index(conn, name, table, columns):
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}{columns}')
+    conn.commit()
+
+
+def _build_indexes_online(connection, indexes):
+    # כל אינדקס בטרנזקציה משלו; ב-WAL הקוראים ממשיכים לעבוד בזמן הבנייה
+    for name, table, columns in indexes:
+        try:
+            with connection() as conn:
+                _create_index(conn, name, table, columns)
+            logger.info(f"🗂️ אינדקס {name} נבנה ברקע")
+        except Exception as e:
+            logger.error(f"❌ בניית אינדקס {name} נכשלה: {e}")
+
+
+def migrate(conn, connection=None):
+    """מעדכן את הסכמה לגרסה האחרונה ומוודא שכל האינדקסים קיימים.
+
+    connection - factory לחיבור חדש (כמו db.connection); אם ניתן, אינדקסים על
+    טבלאות גדולות נבנים ב-thread רקע. בלעדיו הכל נבנה כאן.
+    מיגרציה ארוכה יכולה לעשות commit בין אצוות (_commit_batch) - הגרסה נקבעת
+    רק בטרנזקציה האחרונה שלה.
+    מחזיר את מספר המיגרציות שהורצו.
+    """
+    # טריגרי אינדקס החיפוש קוראים לפונקציות Python - גם לכתיבות בחיבור הזה אחר כך
+    search_index.register(conn)
+    applied = 0
+    if schema_version(conn) < LATEST_VERSION:
+        for version, description, apply in MIGRATIONS:
+            if conn.in_transaction:
+                conn.commit()
+            # BEGIN IMMEDIATE + בדיקה חוזרת - כמה workers יכולים לעלות יחד
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                apply(conn)
+                # worker אחר שנכנס בין האצוות אולי כבר התקדם - לעולם לא מורידים גרסה
+                conn.execute(f'PRAGMA user_version = {max(version, schema_version(conn))}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied += 1
+            logger.info(f"🧱 מיגרציה {version} הורצה: {description}")
+
+    missing = missing_indexes(conn)
+    if not missing:
+        return applied
+
+    deferred = []
+    for name, table, columns in missing:
+        rows = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table}').fetchone()[0]
+        if connection is not None and rows > ONLINE_INDEX_THRESHOLD:
+            deferred.append((name, table, columns))
+        else:
+            _create_index(conn, name, table, columns)
+
+    if deferred:
+        logger.info(f"🗂️ {len(deferred)} אינדקסים על טבלאות גדולות ייבנו ברקע")
+        threading.Thread(
+            target=_build_indexes_online, args=(connection, deferred),
+            name='online-index-build', daemon=True
+        ).start()
+
+    return applied
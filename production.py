@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+GmarUp Production Server - הרצת האפליקציה תחת gunicorn (pre-fork, gthread)
+
+כל worker הוא תהליך נפרד עם threads משלו, pool חיבורים משלו ותור כתיבה משלו.
+האפליקציה נטענת בכל worker אחרי ה-fork (בלי preload), כך ש:
+- אף חיבור SQLite לא עובר fork
+- SIGHUP ל-master מבצע reload הדרגתי: workers חדשים עם הקוד החדש,
+  הישנים מסיימים את הבקשות הפתוחות ויוצאים
+jobs ברקע (צבירת אנליטיקס) רצים רק ב-worker אחד - זה שמחזיק את נעילת ה-leader.
+
+gunicorn אופציונלי ורץ רק בלינוקס/מק:
+    pip install gunicorn
+    python server.py --production --workers 4 --threads 8 --bind 0.0.0.0:8080
+"""
+
+import os
+import time
+import logging
+import threading
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'workers': min(4, (os.cpu_count() or 1) * 2),
+    'threads': 8,
+    'bind': f"0.0.0.0:{os.environ.get('GMARUP_PORT', 8080)}",
+    'keepalive': 5,
+    'timeout': 30,
+    'graceful_timeout': 30,
+}
+
+# threads שחיבורי SSE (פיד הדשבורד) לעולם לא תופסים - כל חיבור מחזיק thread של
+# gthread עד 5 דקות, כך ש-/api/register ו-/api/donate תמיד מקבלים thread פנוי
+STREAM_RESERVED_THREADS = 2
+
+# כל כמה שניות worker שאינו leader מנסה שוב לתפוס את הנעילה
+LEADER_RETRY_INTERVAL = 5.0
+
+# ה-handle נשאר פתוח כל חיי ה-worker - מערכת ההפעלה משחררת את הנעילה כשהוא מת
+_leader_handle = None
+
+
+def acquire_leader_lock(path):
+    """נעילת קובץ לא-חוסמת - True רק ל-worker הראשון שתפס אותה"""
+    global _leader_handle
+    try:
+        import fcntl
+    except ImportError:
+        # Windows - אין fork, יש רק תהליך אחד
+        return True
+    handle = open(path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _leader_handle = handle
+    return True
+
+
+# --- hooks של gunicorn (רצים בתוך ה-worker) ---
+
+def post_worker_init(worker):
+    import server
+
+    # כל thread של ה-worker צריך חיבור משלו
+    server.db.max_size = max(server.db.max_size, worker.cfg.threads)
+
+    # מעבר לתקרה הדשבורד מקבל 503 וממשיך בסנכרון התקופתי; ליותר צופים חיים -
+    # להגדיל את --threads (כל thread נוסף הוא עוד חיבור ועוד זיכרון ל-worker)
+    stream_cap = max(0, worker.cfg.threads - STREAM_RESERVED_THREADS)
+    if server.event_hub.max_subscribers > stream_cap:
+        logger.info(f"📡 חיבורי הפיד החי מוגבלים ל-{stream_cap} (threads={worker.cfg.threads})")
+        server.event_hub.max_subscribers = stream_cap
+
+    # המיגרציות בטוחות לריצה מקבילה (BEGIN IMMEDIATE + בדיקת גרסה חוזרת)
+    server.init_database()
+
+    # אחרי reload ה-workers החדשים עולים לפני שהישנים יצאו - ממשיכים לנסות
+    threading.Thread(target=_become_leader, args=(server,), name='leader-lock', daemon=True).start()
+
+
+def _become_leader(server, interval=LEADER_RETRY_INTERVAL):
+    path = server.DB_PATH + '.jobs.lock'
+    while not acquire_leader_lock(path):
+        time.sleep(interval)
+    server.analytics_rollup.start()
+    server.backups.start()
+    logger.info(f"👑 worker {os.getpid()} מריץ את ה-jobs ברקע")
+
+
+def worker_exit(server_, worker):
+    import server
+
+    server.event_hub.close()
+    server.analytics_rollup.stop()
+    server.backups.stop()
+    server.write_queue.stop()
+    server.settings_cache.close()
+    server.db.close_all()
+
+
+def run(options):
+    """מפעיל את gunicorn עם האפשרויות (workers, threads, bind, keepalive, ...)"""
+    if BaseApplication is None:
+        print("❌ מצב production דורש gunicorn: pip install gunicorn")
+        return 1
+
+    class GmarUpApplication(BaseApplication):
+        def load_config(self):
+            config = dict(DEFAULTS, **{k: v for k, v in options.items() if v is not None})
+            config.update({
+                'worker_class': 'gthread',
+                'preload_app': False,
+                'post_worker_init': post_worker_init,
+                'worker_exit': worker_exit,
+                'proc_name': 'gmarup',
+            })
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from server import app
+            return app
+
+    GmarUpApplication().run()
+    return 0
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+GmarUp Rate Limit - token bucket לכל IP/סשן על נקודות הכתיבה הציבוריות
+
+לכל כלל (register, donate, track, track_session) יש קצב ו-burst: דלי מתמלא
+בקצב הקבוע עד burst אסימונים, וכל בקשה לוקחת אסימון אחד. בקשה בלי אסימון
+מקבלת 429 עם Retry-After - הזמן עד שיתמלא אסימון.
+
+ברירת המחדל היא דליים בזיכרון התהליך (LRU חסום - דלי שלא נגעו בו הכי הרבה זמן
+מפנה מקום לחדש). במצב production עם כמה workers כל worker סופר לבד, כך שהמכסה
+בפועל מוכפלת במספר ה-workers; GMARUP_RATE_LIMIT_BACKEND=sqlite משתף את הדליים
+בין התהליכים דרך קובץ SQLite נפרד (rate_limit_sqlite.py).
+
+הגדרה ממשתני סביבה:
+    GMARUP_RATE_LIMITS="register=5/60,donate=10/60,track=off"   (בקשות/שניות, או off)
+    GMARUP_RATE_LIMIT_BACKEND=memory|sqlite
+    GMARUP_RATE_LIMIT_DB=/path/rate_limit.db                    (ברירת מחדל: ליד leads.db)
+    GMARUP_RATE_LIMIT_MAX_KEYS=10000
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+Rule = namedtuple('Rule', 'rate burst')
+
+# כלל -> "בקשות/שניות" (burst = מספר הבקשות)
+DEFAULT_RULES = {
+    'register': '5/60',        # לכל IP
+    'donate': '10/60',         # לכל IP
+    'track': '300/60',         # לכל IP (כמה משתמשים מאחורי NAT אחד)
+    'track_session': '120/60', # לכל sessionId
+}
+
+DEFAULT_MAX_KEYS = 10000
+
+
+def parse_rule(text):
+    """'5/60' -> Rule(rate=5/60 לשנייה, burst=5); 'off' -> None"""
+    text = text.strip().lower()
+    if text in ('off', '0', ''):
+        return None
+    count, _, seconds = text.partition('/')
+    count, seconds = int(count), float(seconds or 1)
+    if count < 1 or seconds <= 0:
+        raise ValueError(f'כלל לא תקין: {text}')
+    return Rule(rate=count / seconds, burst=count)
+
+
+def parse_rules(text, defaults=DEFAULT_RULES):
+    """כללי ברירת המחדל עם הדריסות מ-"register=5/60,track=off" """
+    specs = dict(defaults)
+    for part in (text or '').split(','):
+        if part.strip():
+            name, _, spec = part.partition('=')
+            specs[name.strip()] = spec
+    rules = {name: parse_rule(spec) for name, spec in specs.items()}
+    return {name: rule for name, rule in rules.items() if rule is not None}
+
+
+class MemoryBuckets:
+    """דליים בזיכרון - OrderedDict כ-LRU, O(1) לבקשה וזיכרון חסום ב-max_keys"""
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def take(self, key, rule):
+        """(מותר?, שניות עד האסימון הבא)"""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = rule.burst
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                tokens = min(rule.burst, bucket[0] + (now - bucket[1]) * rule.rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rule.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimiter:
+    def __init__(self, rules, backend=None):
+        self.rules = rules
+        self.backend = backend if backend is not None else MemoryBuckets()
+        self._lock = threading.Lock()
+        self.allowed = {name: 0 for name in rules}
+        self.rejected = {name: 0 for name in rules}
+
+    def hit(self, name, identity):
+        """לוקח אסימון מהדלי של (כלל, identity). מחזיר 0 אם מותר, אחרת שניות להמתנה"""
+        rule = self.rules.get(name)
+        if rule is None or not identity:
+            return 0
+        try:
+            allowed, retry_after = self.backend.take(f'{name}:{identity}', rule)
+        except Exception as e:
+            # תקלה במגביל לא חוסמת רישומים אמיתיים
+            logger.error(f"❌ שגיאה במגביל הקצב ({name}): {e}")
+            return 0
+        with self._lock:
+            if allowed:
+                self.allowed[name] += 1
+            else:
+                self.rejected[name] += 1
+        return 0 if allowed else max(1, math.ceil(retry_after))
+
+    def check(self, *hits):
+        """כמה בדיקות (כלל, identity) - מחזיר את ההמתנה הארוכה ביותר (0 = מותר)"""
+        return max((self.hit(name, identity) for name, identity in hits), default=0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': type(self.backend).__name__,
+                'keys': len(self.backend),
+                'allowed': dict(self.allowed),
+                'rejected': dict(self.rejected),
+            }
+
+
+def from_env(db_path):
+    """מגביל לפי משתני הסביבה (ראה למעלה)"""
+    env = os.environ.get
+    rules = parse_rules(env('GMARUP_RATE_LIMITS'))
+    max_keys = int(env('GMARUP_RATE_LIMIT_MAX_KEYS', DEFAULT_MAX_KEYS))
+    backend = None
+    if env('GMARUP_RATE_LIMIT_BACKEND', 'memory').lower() == 'sqlite':
+        from rate_limit_sqlite import SQLiteBuckets
+        path = env('GMARUP_RATE_LIMIT_DB') or os.path.join(os.path.dirname(db_path), 'rate_limit.db')
+        idle = max((rule.burst / rule.rate for rule in rules.values()), default=60)
+        backend = SQLiteBuckets(path, idle_seconds=idle, max_keys=max_keys)
+    else:
+        backend = MemoryBuckets(max_keys=max_keys)
+    return RateLimiter(rules, backend)
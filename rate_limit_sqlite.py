@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+GmarUp Rate Limit (SQLite) - דליי token bucket משותפים לכל ה-workers
+
+קובץ SQLite נפרד ממסד הלידים, כדי שהמגביל לא יתחרה על ה-writer היחיד של
+leads.db - בדיוק המשאב שהוא מגן עליו. כל בקשה היא פקודת UPSERT אחת (מילוי,
+לקיחת אסימון והחלטה בתוך SQLite, אטומי בין תהליכים). מצב המגביל לא קריטי,
+ולכן synchronous=OFF; דליים שהתמלאו מזמן נמחקים מדי פעם.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+# כל כמה בקשות מנקים דליים ישנים
+PRUNE_EVERY = 1000
+
+# מילוי, לקיחת אסימון וההחלטה בפקודה אחת. ב-SET כל הביטויים מחושבים מול
+# הערכים הישנים של השורה, כך ש-allowed ו-tokens רואים את אותו מילוי
+TAKE_SQL = '''
+    INSERT INTO buckets (key, tokens, updated_at, allowed) VALUES (:key, :burst - 1, :now, 1)
+    ON CONFLICT(key) DO UPDATE SET
+        tokens = MIN(:burst, tokens + (:now - updated_at) * :rate)
+                 - (MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1),
+        allowed = MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1,
+        updated_at = :now
+    RETURNING tokens, allowed
+'''
+
+
+class SQLiteBuckets:
+    def __init__(self, path, idle_seconds=3600, max_keys=100000, clock=time.time):
+        self.path = path
+        # דלי שלא נגעו בו יותר מזה כבר מלא - מחיקתו לא משנה כלום
+        self.idle_seconds = idle_seconds
+        self.max_keys = max_keys
+        self.clock = clock
+        self._local = threading.local()
+        self._calls = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                allowed INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_buckets_updated_at ON buckets(updated_at)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # autocommit - כל UPSERT הוא טרנזקציה משלו
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rule):
+        now = self.clock()
+        conn = self._connection()
+        tokens, allowed = conn.execute(TAKE_SQL, {
+            'key': key, 'burst': rule.burst, 'rate': rule.rate, 'now': now,
+        }).fetchone()
+
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self.prune(now)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rule.rate
+
+    def prune(self, now=None):
+        now = self.clock() if now is None else now
+        conn = self._connection()
+        conn.execute('DELETE FROM buckets WHERE updated_at < ?', (now - self.idle_seconds,))
+        # הגנה מפני ריסוס מפתחות: מעבר לתקרה נמחקים הישנים ביותר
+        conn.execute('''
+            DELETE FROM buckets WHERE key IN (
+                SELECT key FROM buckets ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_keys,))
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+GmarUp Search - חיפוש טקסט מלא (FTS5) ברישומים ובתרומות לדשבורד
+
+האינדקס search_index נבנה במיגרציות 7 ו-10 ומתעדכן ע"י טריגרים, כך שאין קוד
+כתיבה נוסף. rowid באינדקס = id*2 לרישום, id*2+1 לתרומה - שתי הטבלאות
+באינדקס אחד עם דירוג bm25 משותף.
+
+הטוקנייזר unicode61 מפרק עברית לפי רווחים ופיסוק אבל לא מסיר ניקוד, ולכן
+הנרמול נעשה כאן - אותו דבר בתוכן ובשאילתה:
+- ניקוד וטעמים מוסרים (search_text) - "דָּוִד" נשמר ומחופש כ"דוד"
+- עמודת terms מחזיקה כל מילה בלי אות או שתיים מאותיות השימוש (ו, ה, ב, כ, ל,
+  מ, ש) בתחילתה (search_prefixes) - "משפחה" מוצא את "ולמשפחה"
+בצד השאילתה כל מילה היא חיפוש תחילית ("דוד" מוצא "דודי"), בלי הורדת אותיות.
+
+הטריגרים קוראים לפונקציות האלה, ולכן כל חיבור שכותב לרישומים/תרומות צריך
+register(conn) - ConnectionPool ו-migrations.migrate() עושים את זה לבד.
+"""
+
+import re
+
+# משקלות bm25 לעמודות: kind, name, email, phone, body, terms
+COLUMN_WEIGHTS = (0.0, 10.0, 6.0, 6.0, 1.0, 1.0)
+
+KINDS = {'r': 'registrations', 'd': 'donations'}
+
+HEBREW_PREFIXES = 'והבכלמש'
+MAX_PREFIX_LETTERS = 2
+MAX_TERMS = 8
+
+_NIQQUD = re.compile(r'[\u0591-\u05bd\u05bf-\u05c7]')  # טעמים וניקוד (בלי מקף)
+_TOKEN = re.compile(r'\w+')
+
+REGISTRATION_HIT_FIELDS = ('id', 'name', 'email', 'phone', 'status', 'source', 'created_at')
+DONATION_HIT_FIELDS = ('id', 'donor_name', 'donor_email', 'donor_phone', 'amount', 'status', 'created_at')
+
+
+def search_text(text):
+    """טקסט בלי ניקוד וטעמים - לתוכן האינדקס ולשאילתה"""
+    return _NIQQUD.sub('', text) if text else text
+
+
+def _stripped(token):
+    """המילה בלי אות ואחר כך שתיים מאותיות השימוש (נשארות לפחות 3 אותיות)"""
+    variants = []
+    for _ in range(MAX_PREFIX_LETTERS):
+        if len(token) > 3 and token[0] in HEBREW_PREFIXES:
+            token = token[1:]
+            variants.append(token)
+    return variants
+
+
+def search_prefixes(text):
+    """עמודת terms: המילים בלי אותיות השימוש בתחילתן ("ולמשפחה" -> "למשפחה משפחה")"""
+    tokens = _TOKEN.findall(search_text(text or ''))
+    seen = set(tokens)
+    variants = []
+    for token in tokens:
+        for variant in _stripped(token):
+            if variant not in seen:
+                seen.add(variant)
+                variants.append(variant)
+    return ' '.join(variants)
+
+
+def register(conn):
+    """הפונקציות שהטריגרים של האינדקס קוראים להן (מיגרציה 10)"""
+    conn.create_function('search_text', 1, search_text, deterministic=True)
+    conn.create_function('search_prefixes', 1, search_prefixes, deterministic=True)
+
+
+def build_match(query):
+    """ביטוי MATCH של FTS5 מטקסט חופשי - כל המילים (AND), כל מילה כתחילית.
+
+    זורק ValueError אם אין בשאילתה אף מילה.
+    """
+    tokens = _TOKEN.findall(search_text(query or '').lower())
+    if not tokens:
+        raise ValueError('שאילתת חיפוש ריקה')
+    return ' '.join(f'"{token}"*' for token in tokens[:MAX_TERMS])
+
+
+def _highlight(text, match, words=12):
+    """קטע מהטקסט עם [סימון] של מילים שתחילית מהשאילתה מתאימה להן גם בלי אותיות השימוש"""
+    prefixes = re.findall(r'"([^"]+)"', match)
+    tokens = text.split()
+    marked = [i for i, token in enumerate(tokens)
+              if any(variant.startswith(prefix) for variant in [token] + _stripped(token) for prefix in prefixes)]
+    start = max(0, (marked[0] if marked else 0) - words // 2)
+    parts = [f'[{token}]' if i in marked else token for i, token in enumerate(tokens)][start:start + words]
+    return ('…' if start else '') + ' '.join(parts) + ('…' if start + words < len(tokens) else '')
+
+
+def search(conn, query, kind=None, limit=20, offset=0):
+    """תוצאות מדורגות (bm25) מהאינדקס. מחזיר (hits, total)"""
+    match = build_match(query)
+    where, params = 'search_index MATCH ?', [match]
+    if kind:
+        where += ' AND kind = ?'
+        params.append(kind)
+
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT COUNT(*) FROM search_index WHERE {where}', params)
+    total = cursor.fetchone()[0]
+
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    cursor.execute(f'''
+        SELECT rowid, kind, bm25(search_index, {weights}) AS score,
+               snippet(search_index, -1, '[', ']', '…', 12) AS snippet,
+               snippet(search_index, 5, '[', ']', '…', 12) AS terms_snippet,
+               name, body
+        FROM search_index
+        WHERE {where}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    ''', params + [limit, offset])
+    matches = cursor.fetchall()
+
+    # שליפת השורות עצמן - שאילתה אחת לכל טבלה
+    ids = {'r': [], 'd': []}
+    for row in matches:
+        ids[row[1]].append(row[0] // 2)
+    rows = {}
+    for code, fields in (('r', REGISTRATION_HIT_FIELDS), ('d', DONATION_HIT_FIELDS)):
+        if ids[code]:
+            cursor.execute(f'''
+                SELECT {', '.join(fields)} FROM {KINDS[code]}
+                WHERE id IN ({','.join('?' for _ in ids[code])})
+            ''', ids[code])
+            rows.update({(code, row[0]): dict(zip(fields, tuple(row))) for row in cursor.fetchall()})
+
+    hits = []
+    for rowid, code, score, snippet, terms_snippet, name, body in (tuple(row) for row in matches):
+        record = rows.get((code, rowid // 2))
+        if record is None:
+            continue
+        if snippet == terms_snippet:
+            # ההתאמה רק בעמודת terms - מציגים את הטקסט עצמו עם המילה המקורית מסומנת
+            snippet = _highlight(body or name or '', match)
+        hits.append({
+            'type': KINDS[code],
+            'id': rowid // 2,
+            'score': round(-score, 4),
+            'snippet': snippet,
+            'record': record,
+        })
+    return hits, total
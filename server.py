@@ -3,156 +3,424 @@
 GmarUp Robust Server - גרסה מחזקת שתתמודד טוב יותר עם בעיות מסד נתונים
 """
 
-from flask import Flask, request, jsonify, send_from_directory
-import sqlite3
+from flask import Flask, Response, request, jsonify
 import os
+import sys
+import argparse
 import traceback
-from datetime import datetime
-import uuid
+from datetime import datetime, timedelta
 import webbrowser
 from threading import Timer
+import io
+import csv
 import json
+import zlib
 import logging
+from urllib.parse import urlencode
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+from db import ConnectionPool, DB_PATH
+from write_queue import WriteBehindQueue
+from settings_cache import SettingsCache
+from analytics_rollup import AnalyticsRollup
+from archive import Archive, TABLES as ARCHIVE_TABLES
+from backup import BackupManager
+from static_assets import StaticAssets
+from image_variants import ImageVariants
+from metrics import Metrics
+from sql_profiler import SQLProfiler
+from event_stream import EventHub
+import migrations
+import ingest
+import search_index
+import list_query
+import rate_limit
+from ingest import ACTIVITY_LOG_SQL, DONATION_ACTIVITY_SQL
+
+# הקבצים הסטטיים מוגשים דרך static_files() (static_assets.py) ולא דרך ה-route המובנה של Flask
+app = Flask(__name__, static_folder=None)
 
 # הגדרות
-DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'leads.db')
-PORT = 8080
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = int(os.environ.get('GMARUP_PORT', 8080))
+
+# כמה reverse proxies לפני השרת - כדי ש-remote_addr (והגבלת הקצב לפי IP) יהיה של הלקוח
+PROXY_HOPS = int(os.environ.get('GMARUP_PROXY_HOPS', 0))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+
+# כמה ימים נשארים אירועי אנליטיקס ולוגי פעילות במסד החם - אחר כך עוברים לארכיון
+# החודשי (המגמות נשמרות ב-rollup לתמיד)
+ANALYTICS_RETENTION_DAYS = int(os.environ.get('GMARUP_ANALYTICS_RETENTION_DAYS', 30))
 
 # הגדרת לוגים
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# פונקציות עזר למסד נתונים
-def create_connection():
-    """יוצר חיבור בטוח למסד נתונים"""
+# פרופיילר SQL אופציונלי (GMARUP_SQL_PROFILE=1) - דוח ב-/api/admin/sql-profile
+sql_profiler = None
+if os.environ.get('GMARUP_SQL_PROFILE', '').lower() in ('1', 'true', 'yes'):
+    sql_profiler = SQLProfiler(slow_ms=float(os.environ.get('GMARUP_SQL_SLOW_MS', 50)))
+
+# pool חיבורים משותף - כל route לוקח חיבור דרך db.connection()
+db = ConnectionPool(DB_PATH, factory=sql_profiler.connection_factory() if sql_profiler else None)
+
+# מטמון הגדרות - נטען פעם אחת, מתעדכן אחרי update_settings או שינוי מתהליך אחר
+settings_cache = SettingsCache(DB_PATH)
+
+# קובצי ארכיון חודשיים לטבלאות הלוג (archive.py)
+archive = Archive(os.environ.get('GMARUP_ARCHIVE_DIR') or os.path.join(os.path.dirname(DB_PATH), 'archive'))
+
+# צבירת אנליטיקס לדליים והעברת שורות לוג ישנות לארכיון - job ברקע
+analytics_rollup = AnalyticsRollup(db.connection, retention_days=ANALYTICS_RETENTION_DAYS, archive=archive)
+
+# קבצים סטטיים מ-dist/ (python build_assets.py) - דחוסים מראש ועם fingerprint,
+# ותמונות בגרסאות מוקטנות WebP/AVIF (image_variants.py)
+static_assets = StaticAssets(BASE_DIR, os.path.join(BASE_DIR, 'dist'), images=ImageVariants(BASE_DIR))
+
+# גיבוי חי של המסד עם רוטציה (backup.py) - רק כשההגדרה auto_backup_enabled פעילה
+backups = BackupManager(
+    DB_PATH,
+    os.environ.get('GMARUP_BACKUP_DIR') or os.path.join(os.path.dirname(DB_PATH), 'backups'),
+    keep=int(os.environ.get('GMARUP_BACKUP_KEEP', 14)),
+    interval_hours=float(os.environ.get('GMARUP_BACKUP_INTERVAL_HOURS', 24)),
+    enabled=lambda: settings_cache.get('auto_backup_enabled'),
+)
+
+# תור כתיבה באצוות ללוגים ולאנליטיקס (fire-and-forget)
+write_queue = WriteBehindQueue(db)
+
+# הגבלת קצב לנקודות הכתיבה הציבוריות (rate_limit.py)
+rate_limiter = rate_limit.from_env(DB_PATH)
+
+# מדדי בקשות ל-/api/metrics (ולוג גישה JSON עם GMARUP_ACCESS_LOG=1)
+metrics = Metrics(access_log=os.environ.get('GMARUP_ACCESS_LOG', '').lower() in ('1', 'true', 'yes'))
+metrics.init_app(app, db)
+
+def runtime_gauges():
+    pool = db.stats()
+    queue = write_queue.stats()
+    stream = event_hub.stats()
+    limits = rate_limiter.stats()
+    archived = archive.stats()
+    backed_up = backups.stats()
+    return [
+        ('db_pool_connections_in_use', 'gauge', 'Pooled connections currently checked out', pool['in_use']),
+        ('db_pool_connections_idle', 'gauge', 'Idle pooled connections', pool['idle']),
+        ('db_pool_max_size', 'gauge', 'Pool size limit', pool['max_size']),
+        ('write_queue_depth', 'gauge', 'Rows waiting in the write-behind queue', queue['depth']),
+        ('write_queue_written_total', 'counter', 'Rows written by the write-behind queue', queue['written']),
+        ('write_queue_overflow_total', 'counter', 'Rows written synchronously because the queue was full', queue['overflow']),
+        ('write_queue_failed_total', 'counter', 'Rows dropped after a failed write', queue['failed']),
+        ('stream_subscribers', 'gauge', 'Open admin SSE connections', stream['subscribers']),
+        ('stream_events_total', 'counter', 'Change events published to SSE subscribers', stream['published']),
+        ('stream_overflows_total', 'counter', 'SSE connections dropped for falling behind', stream['overflows']),
+        ('rate_limit_allowed_total', 'counter', 'Requests admitted by the rate limiter',
+         {(rule,): count for rule, count in limits['allowed'].items()}, ('rule',)),
+        ('rate_limit_rejected_total', 'counter', 'Requests rejected with 429 by the rate limiter',
+         {(rule,): count for rule, count in limits['rejected'].items()}, ('rule',)),
+        ('rate_limit_buckets', 'gauge', 'Rate-limit buckets currently tracked', limits['keys']),
+        ('archive_partitions', 'gauge', 'Monthly archive database files', archived['partitions']),
+        ('archive_rows_moved_total', 'counter', 'Log rows moved from the hot database to the archive',
+         {(table,): count for table, count in archived['moved'].items()}, ('table',)),
+        ('backup_total', 'counter', 'Database backups completed by this process', backed_up['total']),
+        ('backup_failures_total', 'counter', 'Database backups that failed', backed_up['failures']),
+        ('backup_last_duration_seconds', 'gauge', 'Duration of the last backup', backed_up['last_seconds']),
+        ('backup_last_size_bytes', 'gauge', 'Compressed size of the last backup', backed_up['last_bytes']),
+        ('backup_last_raw_size_bytes', 'gauge', 'Uncompressed size of the last backup', backed_up['last_raw_bytes']),
+        ('backup_last_success_timestamp', 'gauge', 'Unix time of the last successful backup', backed_up['last_finished_at']),
+        ('backup_files', 'gauge', 'Backup files kept after rotation', backed_up['count']),
+    ]
+
+metrics.add_collector(runtime_gauges)
+
+# עמודות שמותר להחזיר מרשימות האדמין (גם ל-fields=)
+REGISTRATION_FIELDS = (
+    'id', 'name', 'email', 'phone', 'source', 'status', 'created_at', 'updated_at',
+    'lead_score', 'notes', 'last_contacted', 'attempt_count'
+)
+DONATION_FIELDS = (
+    'id', 'donation_id', 'amount', 'donor_name', 'donor_email', 'donor_phone',
+    'message', 'status', 'created_at', 'completed_at', 'source', 'is_anonymous'
+)
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+# סנכרון דלתא לדשבורד
+CHANGE_LOG_RETENTION_DAYS = 7
+MAX_DELTA_CHANGES = 5000
+
+# ייצוא בסטרימינג - טבלה: עמודות (המסננים מ-list_query; טבלאות הלוג כוללות את הארכיון)
+ANALYTICS_FIELDS = (
+    'id', 'session_id', 'category', 'action', 'label', 'value', 'url',
+    'ip_address', 'user_agent', 'created_at'
+)
+EXPORT_TABLES = {
+    'registrations': REGISTRATION_FIELDS,
+    'donations': DONATION_FIELDS,
+    'analytics': ANALYTICS_FIELDS,
+    'activity_log': ('id', 'lead_id', 'action', 'details', 'created_at'),
+    'donation_activity': ('id', 'donation_id', 'action', 'details', 'created_at'),
+}
+EXPORT_BATCH_SIZE = 500
+
+# פעולות מרובות מהדשבורד - טבלה: (טבלת לוג הפעילות, עמודת המזהה בלוג)
+BULK_TABLES = {
+    'registrations': ('activity_log', 'lead_id'),
+    'donations': ('donation_activity', 'donation_id'),
+}
+BULK_ACTIONS = ('status', 'note', 'delete')
+MAX_BULK_IDS = 5000
+
+# פיד חי לדשבורד (event_stream.py) - אותן עמודות כמו ברשימות
+event_hub = EventHub(
+    db,
+    {'registrations': REGISTRATION_FIELDS, 'donations': DONATION_FIELDS},
+    max_subscribers=int(os.environ.get('GMARUP_STREAM_MAX_CLIENTS', 16))
+)
+
+# חיפוש בדשבורד (search_index.py) - type בבקשה: קוד באינדקס
+SEARCH_TYPES = {'registrations': 'r', 'donations': 'd'}
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+def fetch_page(conn, table, allowed_fields, args):
+    """עימוד keyset עם סינון ומיון לפי list_query, ובחירת עמודות.
+
+    מחזיר (rows, next_cursor, total). זורק ValueError על פרמטרים לא תקינים.
+    """
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f'שדות לא מוכרים: {", ".join(unknown)}')
+    else:
+        fields = list(allowed_fields)
+
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if limit < 1:
+        raise ValueError('limit חייב להיות חיובי')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    sort_column, _ = list_query.parse_sort(table, args.get('sort'))
+    # id ועמודת המיון נדרשים לבניית ה-cursor
+    columns = list(dict.fromkeys(['id', sort_column] + fields))
+
+    sql, params, sort_column, sort = list_query.page_query(table, columns, args, limit + 1)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = list_query.encode_cursor(sort, rows[-1][sort_column], rows[-1]['id'])
+
+    cursor.execute(*list_query.count_query(table, args))
+    total = cursor.fetchone()[0]
+
+    return [{f: row[f] for f in fields} for row in rows], next_cursor, total
+
+def current_change_token(cursor):
+    """token = "<seq ביומן השינויים>.<id אחרון באנליטיקס>" - שני החלקים רק עולים"""
+    cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+    seq = cursor.fetchone()[0]
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM analytics')
+    analytics_id = cursor.fetchone()[0]
+    return seq, analytics_id
+
+def parse_change_token(token):
     try:
-        if not os.path.exists(os.path.dirname(DB_PATH)):
-            os.makedirs(os.path.dirname(DB_PATH))
-        
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except Exception as e:
-        logger.error(f"שגיאה ביצירת חיבור למסד נתונים: {e}")
-        raise
+        seq, analytics_id = token.split('.')
+        return int(seq), int(analytics_id)
+    except (AttributeError, ValueError):
+        raise ValueError('token לא תקין')
+
+def fetch_rows_by_id(cursor, table, fields, ids):
+    if not ids:
+        return []
+    placeholders = ','.join('?' for _ in ids)
+    cursor.execute(f'SELECT {", ".join(fields)} FROM {table} WHERE id IN ({placeholders})', list(ids))
+    return [dict(row) for row in cursor.fetchall()]
+
+def page_response(items, next_cursor, total):
+    """תשובת JSON (מערך) עם כותרות עימוד"""
+    response = jsonify(items)
+    response.headers['X-Total-Count'] = str(total)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
+
+def export_query(conn, table, where, params, aliases=(), include_main=True):
+    """(sql, params) לייצוא - טבלאות הלוג כ-UNION ALL על הטבלה החמה ועל מחיצות הארכיון המחוברות"""
+    fields = EXPORT_TABLES[table]
+    if table in ARCHIVE_TABLES:
+        sql, params = archive.union_query(conn, table, fields, where, params, aliases, include_main)
+        if not sql:
+            return None, []
+    else:
+        sql = f'SELECT {", ".join(fields)} FROM {table}'
+        if where:
+            sql += ' WHERE ' + where
+    return sql + ' ORDER BY created_at, id', params
+
+def bulk_targets(cursor, table, data):
+    """ids לפעולה מרובה - מרשימת ids או מ-filter (כמו ברשימות). מחזיר (קיימים, חסרים)"""
+    if data.get('ids') is not None:
+        try:
+            ids = list(dict.fromkeys(int(i) for i in data['ids']))
+        except (TypeError, ValueError):
+            raise ValueError('ids חייב להיות רשימת מספרים')
+        if not ids:
+            raise ValueError('רשימת ids ריקה')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'יותר מ-{MAX_BULK_IDS} ids בבקשה אחת')
+        cursor.execute(f'SELECT id FROM {table} WHERE id IN ({",".join("?" for _ in ids)})', ids)
+        found = {row[0] for row in cursor.fetchall()}
+        return [i for i in ids if i in found], [i for i in ids if i not in found]
+    
+    where, params = list_query.where_clause(table, data.get('filter') or {})
+    if not where:
+        # בלי תנאי זו הייתה פעולה על כל הטבלה
+        raise ValueError('חובה לציין ids או filter עם לפחות תנאי אחד')
+    cursor.execute(f'SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT ?', params + [MAX_BULK_IDS + 1])
+    ids = [row[0] for row in cursor.fetchall()]
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'ה-filter תואם יותר מ-{MAX_BULK_IDS} רשומות')
+    return ids, []
+
+def apply_bulk(conn, table, data):
+    """פעולה מרובה בטרנזקציה אחת - עדכונים ולוג פעילות ב-executemany.
+
+    מחזיר [{'id', 'result'}] לכל id. זורק ValueError על בקשה לא תקינה.
+    """
+    log_table, log_column = BULK_TABLES[table]
+    action = data.get('action')
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'פעולה לא מוכרת: {action}')
+    status = data.get('status')
+    note = (data.get('note') or '').strip()
+    if action == 'status' and not status:
+        raise ValueError('חסר status')
+    if action == 'note' and not note:
+        raise ValueError('חסרה הערה')
+    
+    cursor = conn.cursor()
+    # IMMEDIATE - בחירת ה-ids והכתיבה על אותה תמונת מצב
+    cursor.execute('BEGIN IMMEDIATE')
+    ids, missing = bulk_targets(cursor, table, data)
+    now = datetime.now().isoformat()
+    rows = [(row_id,) for row_id in ids]
+    
+    if action == 'delete':
+        cursor.executemany(f'DELETE FROM {log_table} WHERE {log_column} = ?', rows)
+        cursor.executemany(f'DELETE FROM {table} WHERE id = ?', rows)
+        result = 'deleted'
+    else:
+        if action == 'status':
+            if table == 'registrations':
+                cursor.executemany('''
+                    UPDATE registrations
+                    SET status = ?, updated_at = ?,
+                        last_contacted = CASE WHEN ? = 'contacted' THEN ? ELSE last_contacted END
+                    WHERE id = ?
+                ''', [(status, now, status, now, row_id) for row_id in ids])
+            else:
+                cursor.executemany(
+                    'UPDATE donations SET status = ?, completed_at = ? WHERE id = ?',
+                    [(status, now if status == 'completed' else None, row_id) for row_id in ids]
+                )
+            log_action, details = 'status_update', f'סטטוס עודכן ל-{status} (פעולה מרובה)'
+        else:
+            # לתרומות אין עמודת הערות - ההערה נשמרת בלוג הפעילות בלבד
+            if table == 'registrations':
+                cursor.executemany('''
+                    UPDATE registrations
+                    SET notes = CASE WHEN COALESCE(notes, '') = '' THEN ? ELSE notes || char(10) || ? END,
+                        updated_at = ?
+                    WHERE id = ?
+                ''', [(note, note, now, row_id) for row_id in ids])
+            log_action, details = 'note', note
+        cursor.executemany(
+            f'INSERT INTO {log_table} ({log_column}, action, details, created_at) VALUES (?, ?, ?, ?)',
+            [(row_id, log_action, details, now) for row_id in ids]
+        )
+        result = 'updated'
+    
+    return [{'id': row_id, 'result': result} for row_id in ids] + \
+           [{'id': row_id, 'result': 'not_found'} for row_id in missing]
+
+def stream_export(table, where, params, fmt, args):
+    """generator - שורות מ-cursor ב-fetchmany, כך שהזיכרון לא תלוי בגודל הטבלה"""
+    fields = EXPORT_TABLES[table]
+    with db.connection() as conn:
+        # טבלאות לוג: חודשי הארכיון בטווח, בקבוצות שנכנסות למגבלת ה-ATTACH
+        parts = archive.query_parts(conn, args.get('from'), args.get('to')) if table in ARCHIVE_TABLES else [[]]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        
+        if fmt == 'csv':
+            # BOM כדי שאקסל יזהה UTF-8 ויציג עברית נכון
+            buffer.write('\ufeff')
+            writer.writerow(fields)
+        
+        for index, months in enumerate(parts):
+            with archive.attached(conn, months) as aliases:
+                # snapshot אחד לכל קבוצה (WAL - לא חוסם כתיבות)
+                conn.execute('BEGIN')
+                sql, part_params = export_query(conn, table, where, params, aliases, include_main=index == len(parts) - 1)
+                if sql is None:
+                    continue
+                cursor = conn.execute(sql, part_params)
+                
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        if fmt == 'csv':
+                            writer.writerow(row)
+                        else:
+                            buffer.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+                            buffer.write('\n')
+                    yield buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 def init_database():
-    """אתחול מסד הנתונים עם כל הטבלאות הנדרשות"""
+    """אתחול/שדרוג מסד הנתונים דרך מנוע המיגרציות (migrations.py)"""
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        # יצירת טבלת רישומים
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS registrations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                source TEXT DEFAULT 'website',
-                status TEXT DEFAULT 'new',
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                ip_address TEXT,
-                user_agent TEXT,
-                lead_score INTEGER DEFAULT 75,
-                notes TEXT,
-                last_contacted TEXT,
-                attempt_count INTEGER DEFAULT 1
-            )
-        ''')
-        
-        # יצירת טבלת תרומות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS donations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                donation_id TEXT UNIQUE NOT NULL,
-                amount REAL NOT NULL,
-                donor_name TEXT NOT NULL,
-                donor_email TEXT,
-                donor_phone TEXT,
-                message TEXT,
-                source TEXT DEFAULT 'website',
-                status TEXT DEFAULT 'pending',
-                created_at TEXT NOT NULL,
-                completed_at TEXT,
-                ip_address TEXT,
-                user_agent TEXT,
-                is_anonymous INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # יצירת טבלת אנליטיקס
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                category TEXT NOT NULL,
-                action TEXT NOT NULL,
-                label TEXT,
-                value INTEGER,
-                url TEXT,
-                ip_address TEXT,
-                created_at TEXT NOT NULL
-            )
-        ''')
-        
-        # יצירת טבלת הגדרות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                key TEXT UNIQUE NOT NULL,
-                value TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        ''')
-        
-        # יצירת טבלת לוגים לרישומים
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lead_id INTEGER,
-                action TEXT NOT NULL,
-                details TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (lead_id) REFERENCES registrations (id)
-            )
-        ''')
-        
-        # יצירת טבלת לוגים לתרומות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS donation_activity (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                donation_id INTEGER,
-                action TEXT NOT NULL,
-                details TEXT,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (donation_id) REFERENCES donations (id)
-            )
-        ''')
-        
-        
-        # הכנסת הגדרות ברירת מחדל
-        default_settings = [
-            ('whatsapp_link', 'https://chat.whatsapp.com/LNmVCXvv35S9SsbWTol2qW'),
-            ('bit_phone', '0502277660'),
-            ('admin_email', 'gmarupil@gmail.com'),
-            ('site_title', 'גמראפ - לימוד גמרא לכל אחד'),
-            ('memorial_counter_start', '2500'),
-            ('admin_password', '0544227754')
-        ]
-        
-        for key, value in default_settings:
-            cursor.execute('''
-                INSERT OR IGNORE INTO settings (key, value, updated_at)
-                VALUES (?, ?, ?)
-            ''', (key, value, datetime.now().isoformat()))
+        with db.connection() as conn:
+            applied = migrations.migrate(conn, connection=db.connection)
+            
+            # ניקוי יומן שינויים ישן (תמיד משאירים את השורה האחרונה כעוגן ל-token)
+            conn.execute('''
+                DELETE FROM change_log
+                WHERE changed_at < strftime('%Y-%m-%dT%H:%M:%S', 'now', ?)
+                  AND seq < (SELECT MAX(seq) FROM change_log)
+            ''', (f'-{CHANGE_LOG_RETENTION_DAYS} days',))
+            
+            # מפתחות idempotency שפג תוקפם
+            ingest.prune_idempotency_keys(conn)
         
-        conn.commit()
-        conn.close()
-        logger.info("✅ מסד הנתונים אותחל בהצלחה")
+        if applied:
+            logger.info(f"✅ מסד הנתונים עודכן לגרסה {migrations.LATEST_VERSION}")
+        else:
+            logger.info("✅ מסד הנתונים עדכני")
         
     except Exception as e:
         logger.error(f"❌ שגיאה באתחול מסד הנתונים: {e}")
@@ -162,8 +430,9 @@ def init_database():
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Idempotency-Key')
     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'X-Total-Count, X-Next-Cursor, Link, Idempotent-Replayed, Retry-After')
     return response
 
 # Handle OPTIONS requests
@@ -179,64 +448,49 @@ def handle_options(path=''):
 # Serve static files
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    return static_assets.send('index.html', request)
 
 @app.route('/<path:filename>')
 def static_files(filename):
-    return send_from_directory('.', filename)
+    return static_assets.send(filename, request)
+
+def too_many_requests(*hits):
+    """תשובת 429 עם Retry-After אם אחד הדליים (כלל, מזהה) ריק, אחרת None"""
+    retry_after = rate_limiter.check(*hits)
+    if not retry_after:
+        return None
+    response = jsonify({'success': False, 'error': f'יותר מדי בקשות - נסה שוב בעוד {retry_after} שניות'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
 # API לרישום
 @app.route('/api/register', methods=['POST'])
 def register():
     try:
+        limited = too_many_requests(('register', request.remote_addr))
+        if limited:
+            return limited
+        
         data = request.get_json()
+        try:
+            ingest.validate_registration(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # וידוא שהנתונים הגיעו
-        if not data:
-            return jsonify({'success': False, 'error': 'לא התקבלו נתונים'}), 400
+        with db.connection() as conn:
+            reg_id, now, attempt_count = ingest.insert_registration(
+                conn, data, request.remote_addr, request.headers.get('User-Agent', '')
+            )
+        
+        # לוג פעילות - דרך תור הכתיבה
+        write_queue.enqueue(*ingest.registration_activity(reg_id, now, attempt_count))
+        event_hub.notify()
         
-        # בדיקת שדות חובה
-        required_fields = ['fullName', 'email', 'phone', 'emailConsent']
-        for field in required_fields:
-            if field == 'emailConsent':
-                if not data.get(field):
-                    return jsonify({'success': False, 'error': 'חובה לאשר קבלת עדכונים באימייל'}), 400
-            elif not data.get(field):
-                return jsonify({'success': False, 'error': f'שדה חובה חסר: {field}'}), 400
-        
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        # הכנסת הרישום
-        now = datetime.now().isoformat()
-        cursor.execute('''
-            INSERT INTO registrations 
-            (name, email, phone, source, created_at, updated_at, ip_address, user_agent, lead_score, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('fullName', ''),
-            data.get('email', ''),
-            data.get('phone', ''),
-            data.get('source', 'website'),
-            now,
-            now,
-            request.remote_addr,
-            request.headers.get('User-Agent', ''),
-            75,  # ציון ליד ברירת מחדל
-            f"רמת לימוד: {data.get('studyLevel', 'לא צוין')}, אישור דיוור: {'כן' if data.get('emailConsent', False) else 'לא'}"
-        ))
-        
-        # לוג פעילות
-        reg_id = cursor.lastrowid
-        cursor.execute('''
-            INSERT INTO activity_log (lead_id, action, details, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (reg_id, 'registration', 'רישום חדש דרך האתר', now))
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"✅ רישום חדש נשמר בהצלחה: {data.get('fullName')} - {data.get('email')}")
+        if attempt_count > 1:
+            logger.info(f"🔁 רישום חוזר אוחד לרישום {reg_id}: {data.get('fullName')} - {data.get('email')}")
+        else:
+            logger.info(f"✅ רישום חדש נשמר בהצלחה: {data.get('fullName')} - {data.get('email')}")
         
         return jsonify({
             'success': True, 
@@ -253,71 +507,34 @@ def register():
 @app.route('/api/donate', methods=['POST'])
 def donate():
     try:
-        data = request.get_json()
+        limited = too_many_requests(('donate', request.remote_addr))
+        if limited:
+            return limited
         
-        if not data or not data.get('amount'):
-            return jsonify({'success': False, 'error': 'חסר סכום תרומה'}), 400
-        
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        # יצירת מזהה תרומה ייחודי
-        donation_id = f"DON_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
-        now = datetime.now().isoformat()
-        
-        cursor.execute('''
-            INSERT INTO donations 
-            (donation_id, amount, donor_name, donor_email, donor_phone, message, source, status, created_at, ip_address, user_agent, is_anonymous)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            donation_id,
-            data.get('amount', 0),
-            data.get('donor_name', 'תורם אנונימי'),
-            data.get('donor_email', ''),
-            data.get('donor_phone', ''),
-            data.get('message', ''),
-            data.get('source', 'website'),
-            'pending',
-            now,
-            request.remote_addr,
-            request.headers.get('User-Agent', ''),
-            data.get('is_anonymous', 0)
-        ))
-        
-        # לוג פעילות תרומה
-        don_db_id = cursor.lastrowid
-        cursor.execute('''
-            INSERT INTO donation_activity (donation_id, action, details, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (don_db_id, 'created', f'תרומה חדשה של ₪{data.get("amount", 0)}', now))
-        
-        conn.commit()
-        conn.close()
-        
-        # קבלת מספר BIT מההגדרות
+        data = request.get_json()
         try:
-            conn = create_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT value FROM settings WHERE key = ?', ('bit_phone',))
-            result = cursor.fetchone()
-            bit_phone = result[0] if result else '0502277660'
-            conn.close()
-        except:
-            bit_phone = '0502277660'
+            ingest.validate_donation(data)
+            key = ingest.idempotency_key(request.headers.get('Idempotency-Key'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # יצירת קישור תשלום BIT
-        amount = data.get('amount', 0)
-        description = f'תרומה לזכר אור מנצור - {donation_id}'
-        payment_url = f'https://www.bitpay.co.il/app/me/14D6AE95-19DD-340D-BE3D-1EB146D9A0B420D2?amount={amount}'
-        
-        logger.info(f"✅ תרומה חדשה נוצרה: {donation_id} - ₪{amount}")
-        
-        return jsonify({
-            'success': True,
-            'donation_id': donation_id,
-            'payment_url': payment_url,
-            'message': 'תרומה נוצרה בהצלחה - סטטוס: ממתין לאישור תשלום'
-        })
+        # תרומה + לוג פעילות + מפתח ה-idempotency - חיבור אחד, commit אחד
+        try:
+            with db.connection() as conn:
+                body, replayed = ingest.create_donation(
+                    conn, data, request.remote_addr, request.headers.get('User-Agent', ''), key
+                )
+        except ingest.IdempotencyConflict:
+            return jsonify({'success': False, 'error': 'Idempotency-Key כבר שימש לתרומה אחרת'}), 422
+        
+        response = jsonify(body)
+        if replayed:
+            logger.info(f"🔁 ניסיון חוזר לתרומה {body['donation_id']} - הוחזרה התשובה השמורה")
+            response.headers['Idempotent-Replayed'] = 'true'
+        else:
+            event_hub.notify()
+            logger.info(f"✅ תרומה חדשה נוצרה: {body['donation_id']} - ₪{data.get('amount', 0)}")
+        return response
         
     except Exception as e:
         logger.error(f"❌ שגיאה ביצירת תרומה: {e}")
@@ -328,22 +545,14 @@ def donate():
 @app.route('/api/admin/registrations', methods=['GET'])
 def get_registrations():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
+        with db.connection() as conn:
+            registrations, next_cursor, total = fetch_page(conn, 'registrations', REGISTRATION_FIELDS, request.args)
         
-        cursor.execute('''
-            SELECT id, name, email, phone, source, status, created_at, updated_at, 
-                   lead_score, notes, last_contacted, attempt_count
-            FROM registrations 
-            ORDER BY created_at DESC
-        ''')
-        
-        registrations = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        logger.info(f"📊 נשלחו {len(registrations)} רישומים לדשבורד האדמין")
-        return jsonify(registrations)
+        logger.info(f"📊 נשלחו {len(registrations)} מתוך {total} רישומים לדשבורד האדמין")
+        return page_response(registrations, next_cursor, total)
         
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
     except Exception as e:
         logger.error(f"❌ שגיאה בקבלת רישומים: {e}")
         logger.error(traceback.format_exc())
@@ -353,22 +562,14 @@ def get_registrations():
 @app.route('/api/admin/donations', methods=['GET'])
 def get_donations():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, donation_id, amount, donor_name, donor_email, donor_phone, 
-                   message, status, created_at, completed_at, source, is_anonymous
-            FROM donations 
-            ORDER BY created_at DESC
-        ''')
+        with db.connection() as conn:
+            donations, next_cursor, total = fetch_page(conn, 'donations', DONATION_FIELDS, request.args)
         
-        donations = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        
-        logger.info(f"💰 נשלחו {len(donations)} תרומות לדשבורד האדמין")
-        return jsonify(donations)
+        logger.info(f"💰 נשלחו {len(donations)} מתוך {total} תרומות לדשבורד האדמין")
+        return page_response(donations, next_cursor, total)
         
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
     except Exception as e:
         logger.error(f"❌ שגיאה בקבלת תרומות: {e}")
         logger.error(traceback.format_exc())
@@ -378,19 +579,18 @@ def get_donations():
 @app.route('/api/admin/analytics', methods=['GET'])
 def get_analytics():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
+        with db.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, session_id, category, action, label, value, 
-                   url, ip_address, created_at
-            FROM analytics 
-            ORDER BY created_at DESC
-            LIMIT 200
-        ''')
+            cursor.execute('''
+                SELECT id, session_id, category, action, label, value, 
+                       url, ip_address, created_at
+                FROM analytics 
+                ORDER BY created_at DESC
+                LIMIT 200
+            ''')
         
-        analytics = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            analytics = [dict(row) for row in cursor.fetchall()]
         
         logger.info(f"📈 נשלחו {len(analytics)} אירועי אנליטיקס לדשבורד")
         return jsonify(analytics)
@@ -400,20 +600,76 @@ def get_analytics():
         logger.error(traceback.format_exc())
         return jsonify({'error': 'שגיאה בטעינת האנליטיקס'}), 500
 
-# Admin API - הגדרות
-@app.route('/api/admin/settings', methods=['GET'])
-def get_admin_settings():
+# Admin API - מגמות אנליטיקס מטבלת ה-rollup (כל טווח תאריכים)
+@app.route('/api/admin/analytics/trends', methods=['GET'])
+def get_analytics_trends():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
+        end = request.args.get('to') or datetime.now().isoformat()
+        start = request.args.get('from') or (datetime.fromisoformat(end) - timedelta(days=7)).isoformat()
+        group_by = [d for d in request.args.get('group_by', 'category,action,label,url').split(',') if d]
+        
+        with db.connection() as conn:
+            granularity, buckets = analytics_rollup.trends(
+                conn, start, end,
+                granularity=request.args.get('granularity'),
+                category=request.args.get('category'),
+                action=request.args.get('action'),
+                group_by=group_by
+            )
         
-        cursor.execute('SELECT key, value FROM settings')
-        rows = cursor.fetchall()
+        return jsonify({
+            'from': start,
+            'to': end,
+            'granularity': granularity,
+            'rolled_up_at': analytics_rollup.last_run,
+            'buckets': buckets
+        })
         
-        settings = {row['key']: row['value'] for row in rows}
-        conn.close()
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
+    except Exception as e:
+        logger.error(f"❌ שגיאה בקבלת מגמות אנליטיקס: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בטעינת המגמות'}), 500
+
+# Admin API - ייצוא מלא בסטרימינג (CSV / NDJSON)
+@app.route('/api/admin/export/<table>', methods=['GET'])
+def export_table(table):
+    try:
+        if table not in EXPORT_TABLES:
+            return jsonify({'error': f'טבלה לא מוכרת לייצוא: {table}'}), 404
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            raise ValueError(f'פורמט לא נתמך: {fmt}')
+        
+        where, params = list_query.where_clause(table, request.args)
+        body = stream_export(table, where, params, fmt, request.args.to_dict())
+        headers = {
+            'Content-Disposition': f'attachment; filename="gmarup-{table}-{datetime.now():%Y-%m-%d}.{fmt}"',
+            'Cache-Control': 'no-store',
+            'Vary': 'Accept-Encoding',
+        }
+        if request.args.get('gzip') == '1' or 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = gzip_stream(body)
+            headers['Content-Encoding'] = 'gzip'
         
-        return jsonify(settings)
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        logger.info(f"📁 ייצוא {table} ({fmt}) התחיל")
+        return Response(body, headers=headers, content_type=f'{mimetype}; charset=utf-8')
+        
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
+    except Exception as e:
+        logger.error(f"❌ שגיאה בייצוא {table}: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בייצוא הנתונים'}), 500
+
+# Admin API - הגדרות
+@app.route('/api/admin/settings', methods=['GET'])
+def get_admin_settings():
+    try:
+        return jsonify(settings_cache.all())
         
     except Exception as e:
         logger.error(f"❌ שגיאה בקבלת הגדרות אדמין: {e}")
@@ -424,33 +680,18 @@ def get_admin_settings():
 @app.route('/api/settings', methods=['GET'])
 def get_public_settings():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        # הגדרות שמותר לגשת אליהן בלי אותנטיקציה
-        public_keys = ['whatsapp_link', 'bit_phone', 'admin_email', 'site_title', 'memorial_counter_start']
-        placeholders = ','.join(['?' for _ in public_keys])
-        
-        cursor.execute(f'SELECT key, value FROM settings WHERE key IN ({placeholders})', public_keys)
-        rows = cursor.fetchall()
-        
-        settings = {row['key']: row['value'] for row in rows}
-        conn.close()
-        
-        # ברירות מחדל
-        defaults = {
-            'whatsapp_link': 'https://chat.whatsapp.com/LNmVCXvv35S9SsbWTol2qW',
-            'bit_phone': '0502277660',
-            'admin_email': 'gmarupil@gmail.com',
-            'site_title': 'גמראפ - לימוד גמרא לכל אחד',
-            'memorial_counter_start': '2500'
-        }
+        # הגדרות ציבוריות (עם ברירות מחדל) מהמטמון
+        settings, etag = settings_cache.public()
         
-        for key, default_value in defaults.items():
-            if key not in settings:
-                settings[key] = default_value
+        # מבקר חוזר - 304 בלי לגעת במסד הנתונים
+        if etag in request.if_none_match:
+            response = app.response_class(status=304)
+        else:
+            response = jsonify(settings)
         
-        return jsonify(settings)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"❌ שגיאה בקבלת הגדרות ציבוריות: {e}")
@@ -466,19 +707,18 @@ def update_settings():
         if not data:
             return jsonify({'success': False, 'error': 'לא התקבלו נתונים'}), 400
         
-        conn = create_connection()
-        cursor = conn.cursor()
-        
-        now = datetime.now().isoformat()
-        for key, value in data.items():
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (key, value, updated_at)
-                VALUES (?, ?, ?)
-            ''', (key, value, now))
-        
-        conn.commit()
-        conn.close()
+        with db.connection() as conn:
+            cursor = conn.cursor()
         
+            now = datetime.now().isoformat()
+            for key, value in data.items():
+                cursor.execute('''
+                    INSERT OR REPLACE INTO settings (key, value, updated_at)
+                    VALUES (?, ?, ?)
+                ''', (key, value, now))
+        
+        settings_cache.invalidate()
+        event_hub.notify()
         logger.info(f"⚙️ הגדרות עודכנו: {list(data.keys())}")
         return jsonify({'success': True, 'message': 'הגדרות עודכנו בהצלחה'})
         
@@ -499,48 +739,50 @@ def update_registration():
         if not reg_id:
             return jsonify({'success': False, 'error': 'חסר מזהה רישום'}), 400
         
-        conn = create_connection()
-        cursor = conn.cursor()
-        
         if action == 'delete':
-            # מחיקת לוגים קשורים
-            cursor.execute('DELETE FROM activity_log WHERE lead_id = ?', (reg_id,))
-            
-            # מחיקת הרישום
-            cursor.execute('DELETE FROM registrations WHERE id = ?', (reg_id,))
+            # לוגים שעדיין בתור חייבים להיכתב לפני שמוחקים אותם
+            write_queue.flush()
+        
+        with db.connection() as conn:
+            cursor = conn.cursor()
+        
+            if action == 'delete':
+                # מחיקת לוגים קשורים
+                cursor.execute('DELETE FROM activity_log WHERE lead_id = ?', (reg_id,))
             
-            conn.commit()
-            conn.close()
+                # מחיקת הרישום
+                cursor.execute('DELETE FROM registrations WHERE id = ?', (reg_id,))
             
-            logger.info(f"🗑️ רישום נמחק: ID {reg_id}")
-            return jsonify({'success': True, 'message': 'רישום נמחק בהצלחה'})
-        
-        else:
-            # עדכון רישום
-            now = datetime.now().isoformat()
-            cursor.execute('''
-                UPDATE registrations 
-                SET status = ?, notes = ?, updated_at = ?, last_contacted = ?
-                WHERE id = ?
-            ''', (
-                data.get('status'),
-                data.get('notes', ''),
-                now,
-                now if data.get('status') == 'contacted' else None,
-                reg_id
-            ))
+                # והלוגים שכבר עברו לארכיון (אחרי commit של המחיקה מהמסד החם)
+                archive.delete(conn, 'activity_log', 'lead_id', [reg_id])
             
-            # לוג פעילות
-            cursor.execute('''
-                INSERT INTO activity_log (lead_id, action, details, created_at)
-                VALUES (?, ?, ?, ?)
-            ''', (reg_id, 'status_update', f'סטטוס עודכן ל-{data.get("status")}', now))
+                logger.info(f"🗑️ רישום נמחק: ID {reg_id}")
+                message = 'רישום נמחק בהצלחה'
+        
+            else:
+                # עדכון רישום
+                now = datetime.now().isoformat()
+                cursor.execute('''
+                    UPDATE registrations 
+                    SET status = ?, notes = ?, updated_at = ?, last_contacted = ?
+                    WHERE id = ?
+                ''', (
+                    data.get('status'),
+                    data.get('notes', ''),
+                    now,
+                    now if data.get('status') == 'contacted' else None,
+                    reg_id
+                ))
             
-            conn.commit()
-            conn.close()
+                # לוג פעילות
+                write_queue.enqueue(ACTIVITY_LOG_SQL, (reg_id, 'status_update', f'סטטוס עודכן ל-{data.get("status")}', now))
             
-            logger.info(f"✏️ רישום עודכן: ID {reg_id}")
-            return jsonify({'success': True, 'message': 'רישום עודכן בהצלחה'})
+                logger.info(f"✏️ רישום עודכן: ID {reg_id}")
+                message = 'רישום עודכן בהצלחה'
+        
+        # אחרי ה-commit - הפיד החי קורא את השינוי מיומן השינויים
+        event_hub.notify()
+        return jsonify({'success': True, 'message': message})
         
     except Exception as e:
         logger.error(f"❌ שגיאה בעדכון רישום: {e}")
@@ -559,46 +801,48 @@ def update_donation():
         if not don_id:
             return jsonify({'success': False, 'error': 'חסר מזהה תרומה'}), 400
         
-        conn = create_connection()
-        cursor = conn.cursor()
-        
         if action == 'delete':
-            # מחיקת לוגים קשורים
-            cursor.execute('DELETE FROM donation_activity WHERE donation_id = ?', (don_id,))
-            
-            # מחיקת התרומה
-            cursor.execute('DELETE FROM donations WHERE id = ?', (don_id,))
+            # לוגים שעדיין בתור חייבים להיכתב לפני שמוחקים אותם
+            write_queue.flush()
+        
+        with db.connection() as conn:
+            cursor = conn.cursor()
+        
+            if action == 'delete':
+                # מחיקת לוגים קשורים
+                cursor.execute('DELETE FROM donation_activity WHERE donation_id = ?', (don_id,))
             
-            conn.commit()
-            conn.close()
+                # מחיקת התרומה
+                cursor.execute('DELETE FROM donations WHERE id = ?', (don_id,))
             
-            logger.info(f"🗑️ תרומה נמחקה: ID {don_id}")
-            return jsonify({'success': True, 'message': 'תרומה נמחקה בהצלחה'})
-        
-        else:
-            # עדכון תרומה
-            now = datetime.now().isoformat()
-            cursor.execute('''
-                UPDATE donations 
-                SET status = ?, completed_at = ?
-                WHERE id = ?
-            ''', (
-                data.get('status'),
-                now if data.get('status') == 'completed' else None,
-                don_id
-            ))
+                # והלוגים שכבר עברו לארכיון (אחרי commit של המחיקה מהמסד החם)
+                archive.delete(conn, 'donation_activity', 'donation_id', [don_id])
             
-            # לוג פעילות
-            cursor.execute('''
-                INSERT INTO donation_activity (donation_id, action, details, created_at)
-                VALUES (?, ?, ?, ?)
-            ''', (don_id, 'status_update', f'סטטוס עודכן ל-{data.get("status")}', now))
+                logger.info(f"🗑️ תרומה נמחקה: ID {don_id}")
+                message = 'תרומה נמחקה בהצלחה'
+        
+            else:
+                # עדכון תרומה
+                now = datetime.now().isoformat()
+                cursor.execute('''
+                    UPDATE donations 
+                    SET status = ?, completed_at = ?
+                    WHERE id = ?
+                ''', (
+                    data.get('status'),
+                    now if data.get('status') == 'completed' else None,
+                    don_id
+                ))
             
-            conn.commit()
-            conn.close()
+                # לוג פעילות
+                write_queue.enqueue(DONATION_ACTIVITY_SQL, (don_id, 'status_update', f'סטטוס עודכן ל-{data.get("status")}', now))
             
-            logger.info(f"✏️ תרומה עודכנה: ID {don_id}")
-            return jsonify({'success': True, 'message': 'תרומה עודכנה בהצלחה'})
+                logger.info(f"✏️ תרומה עודכנה: ID {don_id}")
+                message = 'תרומה עודכנה בהצלחה'
+        
+        # אחרי ה-commit - הפיד החי קורא את השינוי מיומן השינויים
+        event_hub.notify()
+        return jsonify({'success': True, 'message': message})
         
     except Exception as e:
         logger.error(f"❌ שגיאה בעדכון תרומה: {e}")
@@ -609,17 +853,112 @@ def update_donation():
 
 
 
+# חיפוש טקסט מלא ברישומים ובתרומות (FTS5) - תוצאות מדורגות עם עימוד
+@app.route('/api/admin/search', methods=['GET'])
+def admin_search():
+    try:
+        kind = request.args.get('type')
+        if kind and kind not in SEARCH_TYPES:
+            raise ValueError(f'type לא מוכר: {kind}')
+        limit = min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), MAX_SEARCH_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError('limit/offset לא תקינים')
+        
+        with db.connection() as conn:
+            hits, total = search_index.search(
+                conn, request.args.get('q', ''), SEARCH_TYPES.get(kind), limit, offset
+            )
+        
+        next_offset = offset + limit if offset + limit < total else None
+        return jsonify({
+            'query': request.args.get('q', ''),
+            'total': total,
+            'results': hits,
+            'next_offset': next_offset
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
+    except Exception as e:
+        logger.error(f"❌ שגיאה בחיפוש: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בחיפוש'}), 500
+
+# פיד חי של שינויים (Server-Sent Events) - ממשיך מ-Last-Event-ID אחרי ניתוק
+@app.route('/api/admin/stream', methods=['GET'])
+def admin_stream():
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'פרמטר לא תקין: Last-Event-ID'}), 400
+    
+    try:
+        subscribed = event_hub.subscribe(last_event_id)
+    except Exception as e:
+        logger.error(f"❌ שגיאה בפתיחת הפיד החי: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בפתיחת הפיד החי'}), 500
+    
+    if subscribed is None:
+        # יותר מדי חיבורים פתוחים - הדשבורד ממשיך בסנכרון התקופתי
+        response = jsonify({'error': 'יותר מדי חיבורים לפיד החי'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    return Response(event_hub.stream(*subscribed), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+# API לפעולות מרובות (ids או filter) על רישומים/תרומות
+@app.route('/api/admin/bulk/<table>', methods=['POST'])
+def bulk_update(table):
+    if table not in BULK_TABLES:
+        return jsonify({'success': False, 'error': 'טבלה לא מוכרת'}), 404
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('action') == 'delete':
+            # לוגים שעדיין בתור חייבים להיכתב לפני שמוחקים אותם
+            write_queue.flush()
+        
+        with db.connection() as conn:
+            results = apply_bulk(conn, table, data)
+            if data.get('action') == 'delete':
+                # לוגים שכבר עברו לארכיון - אחרי ה-commit של הטרנזקציה הראשית
+                log_table, log_column = BULK_TABLES[table]
+                archive.delete(conn, log_table, log_column, [r['id'] for r in results if r['result'] == 'deleted'])
+        event_hub.notify()
+        
+        affected = sum(1 for r in results if r['result'] != 'not_found')
+        logger.info(f"📦 פעולה מרובה ({data.get('action')}) על {affected} רשומות ב-{table}")
+        return jsonify({
+            'success': True,
+            'action': data.get('action'),
+            'affected': affected,
+            'results': results
+        })
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'פרמטר לא תקין: {e}'}), 400
+    except Exception as e:
+        logger.error(f"❌ שגיאה בפעולה מרובה: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'success': False, 'error': 'שגיאה בביצוע הפעולה המרובה'}), 500
+
 # פונקציית בדיקה לחיבור
 @app.route('/api/test', methods=['GET'])
 def test_connection():
     try:
-        conn = create_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM registrations')
-        reg_count = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM donations')
-        don_count = cursor.fetchone()[0]
-        conn.close()
+        # ספירות מטבלאות הסיכום - בלי COUNT(*) על הטבלאות המלאות
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(SUM(count), 0) FROM registration_stats')
+            reg_count = cursor.fetchone()[0]
+            cursor.execute('SELECT COALESCE(SUM(count), 0) FROM donation_stats')
+            don_count = cursor.fetchone()[0]
         
         return jsonify({
             'success': True,
@@ -639,6 +978,164 @@ def test_connection():
             'details': str(e)
         }), 500
 
+# Admin API - סיכום לדשבורד מטבלאות ה-rollup (קריאה אחת במקום טבלאות מלאות)
+@app.route('/api/admin/summary', methods=['GET'])
+def get_summary():
+    try:
+        today = datetime.now().strftime('%Y-%m-%d')
+        
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT day, status, source, study_level, count
+                FROM registration_stats
+                WHERE count != 0
+            ''')
+            reg_rows = cursor.fetchall()
+            
+            cursor.execute('''
+                SELECT day, status, count, amount
+                FROM donation_stats
+                WHERE count != 0
+            ''')
+            don_rows = cursor.fetchall()
+        
+        registrations = {'total': 0, 'today': 0, 'by_status': {}, 'by_source': {}, 'by_study_level': {}}
+        for row in reg_rows:
+            registrations['total'] += row['count']
+            if row['day'] == today:
+                registrations['today'] += row['count']
+            for key, value in (('by_status', row['status']), ('by_source', row['source']), ('by_study_level', row['study_level'])):
+                registrations[key][value] = registrations[key].get(value, 0) + row['count']
+        
+        donations = {'total_count': 0, 'today_count': 0, 'by_status': {}}
+        for row in don_rows:
+            donations['total_count'] += row['count']
+            if row['day'] == today:
+                donations['today_count'] += row['count']
+            status = donations['by_status'].setdefault(row['status'], {'count': 0, 'amount': 0})
+            status['count'] += row['count']
+            status['amount'] += row['amount']
+        
+        completed = donations['by_status'].get('completed', {'count': 0, 'amount': 0})
+        donations['completed_count'] = completed['count']
+        donations['completed_amount'] = completed['amount']
+        
+        return jsonify({
+            'registrations': registrations,
+            'donations': donations,
+            'server_time': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ שגיאה בקבלת סיכום: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בטעינת הסיכום'}), 500
+
+# Admin API - שינויים מאז token (סנכרון דלתא לרענון האוטומטי)
+@app.route('/api/admin/changes', methods=['GET'])
+def get_changes():
+    try:
+        since = request.args.get('since')
+        
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            # snapshot אחד לכל הקריאות כדי שה-token יתאים לנתונים
+            cursor.execute('BEGIN')
+            seq, analytics_id = current_change_token(cursor)
+            token = f'{seq}.{analytics_id}'
+            
+            if not since:
+                return jsonify({'token': token, 'reset': True})
+            since_seq, since_analytics_id = parse_change_token(since)
+            
+            # token ישן מדי (היומן נוקה) או יותר מדי שינויים - הלקוח יטען הכל מחדש
+            cursor.execute('SELECT MIN(seq) FROM change_log')
+            min_seq = cursor.fetchone()[0]
+            if min_seq is not None and since_seq < min_seq - 1:
+                return jsonify({'token': token, 'reset': True})
+            
+            cursor.execute('''
+                SELECT table_name, row_id, op FROM change_log
+                WHERE seq > ? AND seq <= ?
+                ORDER BY seq
+                LIMIT ?
+            ''', (since_seq, seq, MAX_DELTA_CHANGES + 1))
+            changes = cursor.fetchall()
+            if len(changes) > MAX_DELTA_CHANGES:
+                return jsonify({'token': token, 'reset': True})
+            
+            # השינוי האחרון לכל שורה קובע
+            latest = {}
+            for change in changes:
+                latest[(change['table_name'], change['row_id'])] = change['op']
+            
+            delta = {'token': token, 'reset': False}
+            for table, fields in (('registrations', REGISTRATION_FIELDS), ('donations', DONATION_FIELDS)):
+                upsert_ids = [row_id for (t, row_id), op in latest.items() if t == table and op == 'upsert']
+                deleted = [row_id for (t, row_id), op in latest.items() if t == table and op == 'delete']
+                upserted = fetch_rows_by_id(cursor, table, fields, upsert_ids)
+                # שורה שעודכנה ונמחקה אחרי ה-snapshot לא תחזור - נחשבת מחוקה
+                found = {row['id'] for row in upserted}
+                deleted += [row_id for row_id in upsert_ids if row_id not in found]
+                delta[table] = {'upserted': upserted, 'deleted': deleted}
+            
+            delta['settings'] = None
+            if any(t == 'settings' for (t, _) in latest):
+                cursor.execute('SELECT key, value FROM settings')
+                delta['settings'] = {row['key']: row['value'] for row in cursor.fetchall()}
+            
+            cursor.execute('''
+                SELECT id, session_id, category, action, label, value, 
+                       url, ip_address, created_at
+                FROM analytics
+                WHERE id > ? AND id <= ?
+                ORDER BY id DESC
+                LIMIT 200
+            ''', (since_analytics_id, analytics_id))
+            delta['analytics'] = [dict(row) for row in cursor.fetchall()]
+        
+        return jsonify(delta)
+        
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
+    except Exception as e:
+        logger.error(f"❌ שגיאה בקבלת שינויים: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'שגיאה בטעינת השינויים'}), 500
+
+# דוח פרופיילר ה-SQL (שאילתות לפי זמן מצטבר, תוכניות ביצוע לשאילתות איטיות)
+@app.route('/api/admin/sql-profile', methods=['GET'])
+def get_sql_profile():
+    if sql_profiler is None:
+        return jsonify({'enabled': False, 'error': 'הפרופיילר כבוי - הפעל עם GMARUP_SQL_PROFILE=1'}), 404
+    try:
+        report = sql_profiler.report(
+            sort=request.args.get('sort', 'total_ms'),
+            limit=int(request.args.get('limit', 50))
+        )
+        return jsonify(dict(report, enabled=True))
+    except ValueError as e:
+        return jsonify({'error': f'פרמטר לא תקין: {e}'}), 400
+
+@app.route('/api/admin/sql-profile/reset', methods=['POST'])
+def reset_sql_profile():
+    if sql_profiler is None:
+        return jsonify({'enabled': False, 'error': 'הפרופיילר כבוי - הפעל עם GMARUP_SQL_PROFILE=1'}), 404
+    sql_profiler.reset()
+    logger.info("🔄 נתוני פרופיילר ה-SQL אופסו")
+    return jsonify({'success': True})
+
+# מדדים בפורמט Prometheus
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# מצב תור הכתיבה (עומק, אצוות, גלישות)
+@app.route('/api/admin/write-queue', methods=['GET'])
+def write_queue_stats():
+    return jsonify(write_queue.stats())
+
 # API למעקב ביקורים דרך analytics
 @app.route('/api/admin/actions', methods=['POST'])
 def admin_actions():
@@ -652,28 +1149,12 @@ def admin_actions():
         action = data.get('action', '')
         
         if action == 'track_analytics':
-            # Track analytics event
-            conn = create_connection()
-            cursor = conn.cursor()
-            
-            now = datetime.now().isoformat()
-            cursor.execute('''
-                INSERT INTO analytics 
-                (session_id, category, action, label, value, url, ip_address, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data.get('sessionId', ''),
-                data.get('category', 'Page'),
-                data.get('eventAction', data.get('action', 'visit')),
-                data.get('label', ''),
-                data.get('value', 1),
-                data.get('url', '/'),
-                request.remote_addr,
-                now
-            ))
+            limited = too_many_requests(('track', request.remote_addr), ('track_session', data.get('sessionId')))
+            if limited:
+                return limited
             
-            conn.commit()
-            conn.close()
+            # Track analytics event - נכתב באצווה דרך תור הכתיבה
+            write_queue.enqueue(*ingest.analytics_event(data, request.remote_addr))
             
             return jsonify({'success': True, 'message': 'Analytics tracked'})
         
@@ -685,7 +1166,34 @@ def admin_actions():
         logger.error(traceback.format_exc())
         return jsonify({'success': False, 'error': 'שגיאה בביצוע הפעולה'}), 500
 
+def parse_args():
+    """מצב production דרך --production או GMARUP_PRODUCTION=1 (ושאר ההגדרות גם ממשתני סביבה)"""
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description='GmarUp server')
+    parser.add_argument('--production', action='store_true',
+                        default=env('GMARUP_PRODUCTION', '').lower() in ('1', 'true', 'yes'),
+                        help='הרצה תחת gunicorn עם כמה workers (ללא פתיחת דפדפן)')
+    parser.add_argument('--workers', type=int, default=env('GMARUP_WORKERS'))
+    parser.add_argument('--threads', type=int, default=env('GMARUP_THREADS'))
+    parser.add_argument('--bind', default=env('GMARUP_BIND'), help='למשל 0.0.0.0:8080 או unix:/run/gmarup.sock')
+    parser.add_argument('--keepalive', type=int, default=env('GMARUP_KEEPALIVE'), help='שניות')
+    parser.add_argument('--timeout', type=int, default=env('GMARUP_TIMEOUT'), help='שניות לבקשה לפני הפעלה מחדש של ה-worker')
+    parser.add_argument('--graceful-timeout', type=int, default=env('GMARUP_GRACEFUL_TIMEOUT'))
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.production:
+        import production
+        return production.run({
+            'workers': args.workers,
+            'threads': args.threads,
+            'bind': args.bind,
+            'keepalive': args.keepalive,
+            'timeout': args.timeout,
+            'graceful_timeout': args.graceful_timeout,
+        })
+    
     print("Starting GmarUp Robust Server...")
     
     # אתחול מסד הנתונים
@@ -695,6 +1203,10 @@ def main():
         print(f"Database init error: {e}")
         return
     
+    # jobs ברקע
+    analytics_rollup.start()
+    backups.start()
+    
     print(f"Server running: http://localhost:{PORT}")
     print(f"Admin dashboard: http://localhost:{PORT}/admin.html")
     print("Admin password: 0544227754")
@@ -702,14 +1214,22 @@ def main():
     print(f"Test connection: http://localhost:{PORT}/api/test")
     print("-" * 50)
     
-    # פתיחת דפדפן
-    Timer(1.0, lambda: webbrowser.open(f"http://localhost:{PORT}")).start()
+    # פתיחת דפדפן (לא בהרצה אוטומטית, למשל benchmarks/load_test.py)
+    if not os.environ.get('GMARUP_NO_BROWSER'):
+        Timer(1.0, lambda: webbrowser.open(f"http://localhost:{PORT}")).start()
     
     # הפעלת שרת Flask
     try:
         app.run(host='0.0.0.0', port=PORT, debug=False)
     except Exception as e:
         print(f"❌ שגיאה בהפעלת השרת: {e}")
+    finally:
+        event_hub.close()
+        analytics_rollup.stop()
+        backups.stop()
+        write_queue.stop()
+        settings_cache.close()
+        db.close_all()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
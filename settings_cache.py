@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+GmarUp Settings Cache - מטמון הגדרות בזיכרון עם זיהוי שינויים בין תהליכים
+
+ההגדרות נטענות פעם אחת ונשמרות בזיכרון. update_settings() מבטל את המטמון מקומית,
+ושינויים מתהליכים אחרים מזוהים דרך PRAGMA data_version על חיבור ייעודי.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# key: (ערך ברירת מחדל, טיפוס)
+SETTINGS_SCHEMA = {
+    'whatsapp_link': ('https://chat.whatsapp.com/LNmVCXvv35S9SsbWTol2qW', str),
+    'bit_phone': ('0502277660', str),
+    'admin_email': ('gmarupil@gmail.com', str),
+    'site_title': ('גמראפ - לימוד גמרא לכל אחד', str),
+    'memorial_counter_start': (2500, int),
+    'donations_counter_start': (120000, int),
+    'auto_backup_enabled': (True, bool),
+    'email_notifications': (True, bool),
+    'analytics_enabled': (True, bool),
+}
+
+# הגדרות שמותר לגשת אליהן בלי אותנטיקציה
+PUBLIC_KEYS = ('whatsapp_link', 'bit_phone', 'admin_email', 'site_title', 'memorial_counter_start')
+
+
+def _coerce(value, kind):
+    if kind is bool:
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+    return kind(value)
+
+
+def _as_text(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+
+class SettingsCache:
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._watch_conn = None
+        self._pid = None
+        self._data_version = None
+        self._last_check = 0.0
+        self._stale = True
+
+        self._raw = {}
+        self._typed = {}
+        self._public = {}
+        self._public_etag = None
+        self.reloads = 0
+
+    def _watch(self):
+        # data_version נספר לכל חיבור בנפרד - לכן חיבור ייעודי שלא משמש לכתיבה
+        if self._watch_conn is None or self._pid != os.getpid():
+            self._watch_conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+            self._stale = True
+        return self._watch_conn
+
+    def _load(self, conn):
+        rows = conn.execute('SELECT key, value FROM settings').fetchall()
+        raw = {key: value for key, value in rows}
+
+        typed = {}
+        for key, (default, kind) in SETTINGS_SCHEMA.items():
+            try:
+                typed[key] = _coerce(raw[key], kind) if key in raw else default
+            except (TypeError, ValueError):
+                logger.warning(f"⚠️ ערך לא תקין להגדרה {key}: {raw[key]!r} - משתמש בברירת מחדל")
+                typed[key] = default
+
+        public = {key: raw.get(key, _as_text(SETTINGS_SCHEMA[key][0])) for key in PUBLIC_KEYS}
+        body = json.dumps(public, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+        self._raw = raw
+        self._typed = typed
+        self._public = public
+        self._public_etag = hashlib.sha1(body).hexdigest()
+        self.reloads += 1
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if not self._stale and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            conn = self._watch()
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if self._stale or data_version != self._data_version:
+                self._load(conn)
+                self._data_version = data_version
+                self._stale = False
+            self._last_check = now
+
+    def invalidate(self):
+        """נקרא אחרי עדכון הגדרות - הקריאה הבאה תטען מחדש"""
+        self._stale = True
+
+    def get(self, key, default=None):
+        """ערך מוקלד (int/bool/str) לפי SETTINGS_SCHEMA"""
+        self._ensure_fresh()
+        if key in self._typed:
+            return self._typed[key]
+        return self._raw.get(key, default)
+
+    def all(self):
+        """כל ההגדרות כמחרוזות, כפי שנשמרו בטבלה"""
+        self._ensure_fresh()
+        return dict(self._raw)
+
+    def public(self):
+        """(הגדרות ציבוריות, ETag)"""
+        self._ensure_fresh()
+        return self._public, self._public_etag
+
+    def close(self):
+        with self._lock:
+            if self._watch_conn is not None and self._pid == os.getpid():
+                self._watch_conn.close()
+            self._watch_conn = None
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+GmarUp SQL Profiler - מדידת זמן לכל שאילתה ודיווח על שאילתות איטיות
+
+אופציונלי (GMARUP_SQL_PROFILE=1): ה-pool פותח חיבורים דרך connection_factory()
+של ה-profiler. כל execute/executemany/fetch נמדד ונצבר לפי הצורה המנורמלת של
+השאילתה (ערכים -> ?, רשימות IN מקוצרות). שאילתה שעוברת את סף ה-slow_ms מקבלת
+EXPLAIN QUERY PLAN פעם אחת, ומסומנת אם יש בה סריקת טבלה מלאה או מיון זמני.
+
+set_trace_callback סופר את מה שלא עובר דרך execute (BEGIN אוטומטי, triggers),
+ו-set_progress_handler סופר פקודות VM - מדד עבודה שלא תלוי בהמתנה לנעילות.
+הדוח זמין ב-/api/admin/sql-profile ודרך python sql_report.py.
+"""
+
+import re
+import time
+import sqlite3
+import threading
+
+# כל כמה פקודות VM נקרא ה-progress handler
+PROGRESS_STEPS = 1000
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w?])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+# EXPLAIN רק לשאילתות DML - DDL ו-PRAGMA כבר בוצעו ואין להם תוכנית מעניינת
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLAC')
+
+
+def normalize(sql):
+    """צורה קנונית של שאילתה - ערכים ורשימות IN הופכים ל-?"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?, ...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def plan_warnings(plan):
+    """סריקות מלאות ומיונים זמניים מתוך שורות EXPLAIN QUERY PLAN"""
+    warnings = []
+    for detail in plan:
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            warnings.append(f'full scan: {detail}')
+        elif 'USE TEMP B-TREE' in detail:
+            warnings.append(f'temp sort: {detail}')
+    return warnings
+
+
+class SQLProfiler:
+    def __init__(self, slow_ms=50.0, max_statements=500):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started_at = time.time()
+        self.statements = {}
+        self.implicit = {}
+
+    # --- איסוף ---
+
+    def _entry(self, key):
+        entry = self.statements.get(key)
+        if entry is None:
+            if len(self.statements) >= self.max_statements:
+                key = '<other>'
+                entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = {
+                    'sql': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'vm_steps': 0, 'slow_calls': 0, 'plan': None, 'warnings': [],
+                }
+        return entry
+
+    def record(self, sql, elapsed_ms, vm_steps=0, rows=0, calls=1):
+        key = normalize(sql)
+        with self._lock:
+            entry = self._entry(key)
+            entry['calls'] += calls
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['vm_steps'] += vm_steps
+            entry['rows'] += rows
+            slow = elapsed_ms >= self.slow_ms
+            if slow:
+                entry['slow_calls'] += calls
+            needs_plan = slow and entry['plan'] is None
+        return key, needs_plan
+
+    def record_plan(self, key, plan):
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is not None:
+                entry['plan'] = plan
+                entry['warnings'] = plan_warnings(plan)
+
+    def record_implicit(self, sql):
+        key = normalize(sql)
+        with self._lock:
+            self.implicit[key] = self.implicit.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.implicit = {}
+            self.started_at = time.time()
+
+    # --- דוח ---
+
+    def report(self, sort='total_ms', limit=50):
+        if sort not in ('total_ms', 'max_ms', 'calls', 'vm_steps', 'mean_ms'):
+            raise ValueError(f'מיון לא מוכר: {sort}')
+        with self._lock:
+            rows = [dict(entry, warnings=list(entry['warnings'])) for entry in self.statements.values()]
+            implicit = dict(self.implicit)
+        for row in rows:
+            row['mean_ms'] = round(row['total_ms'] / row['calls'], 3) if row['calls'] else 0.0
+            row['total_ms'] = round(row['total_ms'], 3)
+            row['max_ms'] = round(row['max_ms'], 3)
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return {
+            'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'slow_ms': self.slow_ms,
+            'statements': len(rows),
+            'total_ms': round(sum(row['total_ms'] for row in rows), 3),
+            'flagged': [row['sql'] for row in rows if row['warnings']],
+            'top': rows[:limit],
+            'implicit': dict(sorted(implicit.items(), key=lambda item: -item[1])[:limit]),
+        }
+
+    # --- factory לחיבורים ---
+
+    def connection_factory(self):
+        """מחלקת Connection למסירה ל-sqlite3.connect(factory=...)"""
+        profiler = self
+
+        class ProfiledCursor(sqlite3.Cursor):
+            _key = None
+
+            def execute(self, sql, parameters=()):
+                self._key = self.connection._profile(super().execute, sql, parameters)
+                return self
+
+            def executemany(self, sql, seq_of_parameters):
+                seq = list(seq_of_parameters)
+                self._key = self.connection._profile(super().executemany, sql, seq, calls=len(seq), many=True)
+                return self
+
+            def _fetch(self, method, *args):
+                start = time.perf_counter()
+                rows = method(*args)
+                if self._key is not None:
+                    count = len(rows) if isinstance(rows, list) else int(rows is not None)
+                    profiler.record(self._key, (time.perf_counter() - start) * 1000, rows=count, calls=0)
+                return rows
+
+            def fetchone(self):
+                return self._fetch(super().fetchone)
+
+            def fetchmany(self, size=None):
+                return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+            def fetchall(self):
+                return self._fetch(super().fetchall)
+
+        class ProfiledConnection(sqlite3.Connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self._steps = 0
+                self._explaining = False
+                self.set_trace_callback(self._on_trace)
+                self.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+
+            def _on_progress(self):
+                self._steps += PROGRESS_STEPS
+                return 0
+
+            def _on_trace(self, statement):
+                # מה שלא יצא מ-execute שלנו: BEGIN אוטומטי, גוף triggers ("-- TRIGGER ...")
+                if not getattr(profiler._local, 'active', False) or statement.startswith(('--', 'BEGIN')):
+                    if not self._explaining:
+                        profiler.record_implicit(statement)
+
+            def _profile(self, run, sql, parameters, calls=1, many=False):
+                profiler._local.active = True
+                self._steps = 0
+                start = time.perf_counter()
+                try:
+                    run(sql, parameters)
+                finally:
+                    profiler._local.active = False
+                elapsed = (time.perf_counter() - start) * 1000
+                key, needs_plan = profiler.record(sql, elapsed, vm_steps=self._steps, calls=calls)
+                # ב-executemany מסבירים עם שורת הפרמטרים הראשונה (אין שורות - אין מה להסביר)
+                if many:
+                    parameters = parameters[0] if parameters else None
+                if needs_plan and parameters is not None and sql.lstrip()[:6].upper() in _EXPLAINABLE:
+                    self._explain(key, sql, parameters)
+                return key
+
+            def _explain(self, key, sql, parameters):
+                self._explaining = True
+                try:
+                    rows = sqlite3.Connection.execute(self, f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+                    profiler.record_plan(key, [row[3] for row in rows])
+                except sqlite3.Error as e:
+                    profiler.record_plan(key, [f'EXPLAIN נכשל: {e}'])
+                finally:
+                    self._explaining = False
+
+            def cursor(self, factory=ProfiledCursor):
+                return super().cursor(factory)
+
+            def execute(self, sql, parameters=()):
+                return self.cursor().execute(sql, parameters)
+
+            def executemany(self, sql, seq_of_parameters):
+                return self.cursor().executemany(sql, seq_of_parameters)
+
+            def commit(self):
+                if not self.in_transaction:
+                    return super().commit()
+                profiler._local.active = True
+                start = time.perf_counter()
+                try:
+                    super().commit()
+                finally:
+                    profiler._local.active = False
+                profiler.record('COMMIT', (time.perf_counter() - start) * 1000)
+
+        return ProfiledConnection
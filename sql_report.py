@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+GmarUp SQL Report - הדפסת דוח פרופיילר ה-SQL
+
+השרת צריך לרוץ עם GMARUP_SQL_PROFILE=1 (סף איטיות: GMARUP_SQL_SLOW_MS, ברירת מחדל 50).
+    python sql_report.py                        # מהשרת המקומי
+    python sql_report.py --sort max_ms --limit 10
+    python sql_report.py --save profile.json    # שמירת הדוח להשוואה מאוחרת
+    python sql_report.py --file profile.json    # הדפסת דוח שמור
+"""
+
+import sys
+import json
+import argparse
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+
+def fetch_report(url, sort, limit):
+    query = urlencode({'sort': sort, 'limit': limit})
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/api/admin/sql-profile?{query}", timeout=10) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        body = json.load(e)
+        raise SystemExit(f"❌ {body.get('error', e)}")
+
+
+def print_report(report):
+    print(f"📊 פרופיל SQL מאז {report['since']} - {report['statements']} שאילתות, "
+          f"{report['total_ms']:.1f}ms סה\"כ, סף איטיות {report['slow_ms']}ms")
+    print()
+    print(f"{'calls':>7} {'total_ms':>10} {'mean_ms':>8} {'max_ms':>8} {'rows':>7} {'vm_steps':>9}  sql")
+    for row in report['top']:
+        sql = row['sql'] if len(row['sql']) <= 100 else row['sql'][:97] + '...'
+        print(f"{row['calls']:>7} {row['total_ms']:>10.2f} {row['mean_ms']:>8.3f} {row['max_ms']:>8.2f} "
+              f"{row['rows']:>7} {row['vm_steps']:>9}  {sql}")
+        for warning in row['warnings']:
+            print(f"{'':>53}⚠️  {warning}")
+
+    flagged = [row for row in report['top'] if row['plan']]
+    if flagged:
+        print()
+        print('🔍 תוכניות ביצוע לשאילתות איטיות:')
+        for row in flagged:
+            print(f"  {row['sql'][:120]}")
+            for detail in row['plan']:
+                print(f"      {detail}")
+
+    if report['implicit']:
+        print()
+        print('🔁 פקודות שלא עברו דרך execute (BEGIN אוטומטי, triggers):')
+        for sql, count in report['implicit'].items():
+            print(f"  {count:>7}  {sql[:100]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='דוח פרופיילר ה-SQL של GmarUp')
+    parser.add_argument('--url', default='http://localhost:8080', help='כתובת השרת')
+    parser.add_argument('--file', help='קריאת דוח שמור במקום פנייה לשרת')
+    parser.add_argument('--sort', default='total_ms', choices=('total_ms', 'max_ms', 'mean_ms', 'calls', 'vm_steps'))
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--save', help='שמירת הדוח כ-JSON')
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            report = json.load(f)
+    else:
+        report = fetch_report(args.url, args.sort, args.limit)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 הדוח נשמר ב-{args.save}")
+
+    print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+GmarUp Static Assets - הגשת קבצים סטטיים מתוך dist/ (build_assets.py)
+
+- קבצים עם fingerprint מוגשים עם Cache-Control: immutable לשנה
+- בחירת גרסה דחוסה מראש (br / gzip) לפי Accept-Encoding
+- ETag חזק מה-manifest, 304 על If-None-Match, ובקשות Range (ה-PDF)
+- תמונות: גרסה מוקטנת ב-WebP/AVIF לפי Accept ו-?w= (image_variants.py)
+- בלי build - נופל חזרה ל-send_from_directory מהתיקייה הראשית
+"""
+
+import os
+import json
+import logging
+import mimetypes
+
+from flask import send_file, send_from_directory
+
+from image_variants import MIMETYPES
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+# שמות לא-מגובבים (HTML, קישורים ישירים לתמונות) - תמיד לוודא מול השרת
+REVALIDATE_CACHE = 'no-cache'
+
+# סדר העדפה כשהלקוח מקבל כמה קידודים באותו משקל
+ENCODING_PREFERENCE = ('br', 'gzip')
+ENCODING_SUFFIX = {'br': '.br', 'gzip': '.gz'}
+
+
+def parse_accept_encoding(header):
+    """{'gzip': 1.0, 'br': 0.8, ...} מתוך כותרת Accept-Encoding"""
+    accepted = {}
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+    return accepted
+
+
+def width_hint(request):
+    """רוחב מבוקש מ-?w= (srcset) או מ-client hints"""
+    for value in (request.args.get('w'), request.headers.get('Sec-CH-Width'), request.headers.get('Width')):
+        try:
+            if value:
+                return max(1, int(float(value)))
+        except ValueError:
+            continue
+    return None
+
+
+class StaticAssets:
+    def __init__(self, root, build_dir, images=None):
+        self.root = root
+        self.build_dir = build_dir
+        self.images = images
+        self.manifest = {}
+        self.reload()
+
+    def reload(self):
+        path = os.path.join(self.build_dir, 'manifest.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            logger.info(f"📦 נטענו {len(self.manifest)} קבצים סטטיים מ-{self.build_dir}")
+        except FileNotFoundError:
+            self.manifest = {}
+            logger.info("📦 אין build לקבצים סטטיים - מגיש מהתיקייה הראשית (python build_assets.py)")
+
+    def choose_encoding(self, entry, request):
+        # ל-Range מגישים תמיד את הקובץ המקורי - טווחים על קובץ דחוס לא שימושיים ללקוח
+        if request.range is not None:
+            return None
+        accepted = parse_accept_encoding(request.headers.get('Accept-Encoding'))
+        wildcard = accepted.get('*', 0.0)
+        best, best_quality = None, 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in entry['encodings']:
+                continue
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def send_image(self, source, request, immutable):
+        """גרסה מוקטנת/מומרת של תמונה, או None אם עדיף המקור"""
+        choice = self.images.negotiate(source, request.headers.get('Accept'), width_hint(request))
+        if choice is None:
+            return None
+        fmt, width, etag = choice
+        try:
+            path = self.images.path(source, fmt, width)
+        except Exception as e:
+            logger.warning(f"⚠️ יצירת גרסה {fmt}/{width} של {source} נכשלה - מוגש המקור: {e}")
+            return None
+        response = send_file(path, mimetype=MIMETYPES[fmt], etag=etag, conditional=True, max_age=0)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+        return response
+
+    def send(self, filename, request):
+        entry = self.manifest.get(filename)
+        source = entry.get('source', filename) if entry else filename
+        is_image = self.images is not None and self.images.handles(source)
+
+        if is_image:
+            response = self.send_image(source, request, entry is not None and entry['immutable'])
+            if response is not None:
+                response.vary.add('Accept')
+                return response
+
+        if entry is None:
+            response = send_from_directory(self.root, filename)
+            if is_image:
+                response.vary.add('Accept')
+            return response
+
+        encoding = self.choose_encoding(entry, request)
+        path = os.path.join(self.build_dir, filename)
+        # ETag חזק לכל ייצוג - גרסה דחוסה היא ייצוג אחר של אותו משאב
+        etag = entry['etag'] + (f'-{encoding}' if encoding else '')
+        if encoding:
+            path += ENCODING_SUFFIX[encoding]
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=0)
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        if is_image:
+            response.vary.add('Accept')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if entry['immutable'] else REVALIDATE_CACHE
+        return response
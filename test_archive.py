@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+בדיקות לארכיון החודשי (archive.py) ולהעברה אליו (analytics_rollup.py)
+
+- לוגי פעילות עוברים לארכיון גם כשאין עדיין אירועי אנליטיקס (אין watermark),
+  ואנליטיקס לא עובר לפני שה-rollup חישב אותו
+- Archive.delete מוחק לוגים של רשומה שנמחקה מכל קובצי החודשים, גם מעבר
+  למגבלת ה-ATTACH, ולא נוגע בשאר השורות
+
+הרצה: python test_archive.py   (או pytest)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import migrations
+from analytics_rollup import AnalyticsRollup
+from archive import Archive
+from db import ConnectionPool
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def months_ago(count):
+    return (NOW - timedelta(days=31 * count)).isoformat()
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.pool = ConnectionPool(os.path.join(self.tmp, 'leads.db'))
+        with self.pool.connection() as conn:
+            migrations.migrate(conn)
+        self.archive = Archive(os.path.join(self.tmp, 'archive'), pause=0)
+        self.rollup = AnalyticsRollup(self.pool.connection, retention_days=30, archive=self.archive)
+
+    def tearDown(self):
+        self.pool.close_all()
+        shutil.rmtree(self.tmp)
+
+    def add_logs(self, lead_id, created_at, count=1):
+        with self.pool.connection() as conn:
+            conn.executemany(
+                'INSERT INTO activity_log (lead_id, action, details, created_at) VALUES (?, ?, ?, ?)',
+                [(lead_id, 'status_update', 'x', created_at)] * count
+            )
+
+    def count(self, table, where='1', params=()):
+        """(בטבלה החמה, בכל קובצי הארכיון)"""
+        with self.pool.connection() as conn:
+            hot = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params).fetchone()[0]
+            archived = 0
+            for months in self.archive.query_parts(conn):
+                with self.archive.attached(conn, months) as aliases:
+                    sql, all_params = self.archive.union_query(
+                        conn, table, ['id'], where, params, aliases, include_main=False
+                    )
+                    if sql:
+                        archived += conn.execute(f'SELECT COUNT(*) FROM ({sql})', all_params).fetchone()[0]
+        return hot, archived
+
+    def test_activity_archived_without_analytics(self):
+        self.add_logs(1, months_ago(3), count=3)
+        self.add_logs(1, NOW.isoformat())
+        self.assertEqual(self.rollup.prune(NOW), 3)
+        self.assertEqual(self.count('activity_log'), (1, 3))
+
+    def test_analytics_waits_for_rollup(self):
+        with self.pool.connection() as conn:
+            conn.execute(
+                'INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)',
+                ('analytics_rollup_watermark', months_ago(4), NOW.isoformat())
+            )
+            conn.executemany(
+                'INSERT INTO analytics (session_id, category, action, created_at) VALUES (?, ?, ?, ?)',
+                [('s', 'page', 'view', months_ago(3)), ('s', 'page', 'view', months_ago(5))]
+            )
+        self.add_logs(1, months_ago(3))
+        self.rollup.prune(NOW)
+        # אנליטיקס רק עד ה-watermark; לוגי הפעילות לפי חלון השמירה
+        self.assertEqual(self.count('analytics'), (1, 1))
+        self.assertEqual(self.count('activity_log'), (0, 1))
+
+    def test_delete_reaches_every_partition(self):
+        with self.pool.connection() as conn:
+            limit = self.archive.max_months_per_query(conn)
+        # יותר חודשים ממה שאפשר לחבר בבת אחת
+        for month in range(1, limit + 4):
+            self.add_logs(1, months_ago(month))
+            self.add_logs(2, months_ago(month))
+        self.rollup.prune(NOW)
+        self.assertEqual(len(self.archive.months()), limit + 3)
+
+        with self.pool.connection() as conn:
+            deleted = self.archive.delete(conn, 'activity_log', 'lead_id', [1])
+        self.assertEqual(deleted, limit + 3)
+        self.assertEqual(self.count('activity_log', 'lead_id = ?', (1,)), (0, 0))
+        self.assertEqual(self.count('activity_log', 'lead_id = ?', (2,)), (0, limit + 3))
+
+    def test_delete_commits_pending_hot_delete(self):
+        self.add_logs(1, months_ago(3))
+        self.rollup.prune(NOW)
+        self.add_logs(1, NOW.isoformat())
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM activity_log WHERE lead_id = ?', (1,))
+            self.archive.delete(conn, 'activity_log', 'lead_id', [1])
+            self.assertFalse(conn.in_transaction)
+        self.assertEqual(self.count('activity_log'), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
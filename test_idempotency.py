@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+בדיקות ל-Idempotency-Key ב-/api/donate (ingest.create_donation)
+
+דרך Flask test client על מסד זמני: ניסיון חוזר עם אותו מפתח מחזיר את אותה
+תשובה עם Idempotent-Replayed ובלי תרומה נוספת, אותו מפתח עם גוף אחר מקבל 422,
+ניסיונות מקבילים עם אותו מפתח יוצרים תרומה אחת בלבד, ומפתח שפג תוקפו נחשב חדש.
+
+הרצה: python test_idempotency.py   (או pytest)
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+TMP = tempfile.mkdtemp(prefix='gmarup-idempotency-')
+os.environ['GMARUP_DB_PATH'] = os.path.join(TMP, 'leads.db')
+os.environ['GMARUP_RATE_LIMITS'] = 'donate=off'
+
+import ingest  # noqa: E402
+import server  # noqa: E402
+
+
+def setUpModule():
+    server.init_database()
+
+
+def tearDownModule():
+    server.write_queue.stop()
+    server.settings_cache.close()
+    server.db.close_all()
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+class IdempotencyTest(unittest.TestCase):
+    def setUp(self):
+        self.client = server.app.test_client()
+        with server.db.connection() as conn:
+            for table in ('donation_activity', 'donations', 'idempotency_keys'):
+                conn.execute(f'DELETE FROM {table}')
+
+    def donate(self, body, key=None, client=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        return (client or self.client).post('/api/donate', json=body, headers=headers)
+
+    def count(self, table):
+        with server.db.connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def test_replay_returns_stored_response(self):
+        body = {'amount': 180, 'donor_name': 'יוסי', 'source': 'website'}
+        first = self.donate(body, 'key-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+
+        again = self.donate(body, 'key-1')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(again.get_json(), first.get_json())
+
+        self.assertEqual(self.count('donations'), 1)
+        self.assertEqual(self.count('donation_activity'), 1)
+        self.assertEqual(self.count('idempotency_keys'), 1)
+
+    def test_same_key_different_body_is_422(self):
+        self.assertEqual(self.donate({'amount': 100}, 'key-2').status_code, 200)
+        conflict = self.donate({'amount': 500}, 'key-2')
+        self.assertEqual(conflict.status_code, 422)
+        self.assertFalse(conflict.get_json()['success'])
+        self.assertEqual(self.count('donations'), 1)
+
+    def test_without_key_every_request_creates_a_donation(self):
+        for _ in range(2):
+            self.assertEqual(self.donate({'amount': 50}).status_code, 200)
+        self.assertEqual(self.count('donations'), 2)
+        self.assertEqual(self.count('idempotency_keys'), 0)
+
+    def test_invalid_key_is_400(self):
+        self.assertEqual(self.donate({'amount': 50}, 'x' * 300).status_code, 400)
+        self.assertEqual(self.count('donations'), 0)
+
+    def test_concurrent_retries_create_one_donation(self):
+        body = {'amount': 365, 'donor_name': 'רחל'}
+        responses = []
+
+        def attempt():
+            responses.append(self.donate(body, 'key-race', client=server.app.test_client()))
+
+        threads = [threading.Thread(target=attempt) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in responses], [200] * 8)
+        self.assertEqual(len({r.get_json()['donation_id'] for r in responses}), 1)
+        self.assertEqual(sum(r.headers.get('Idempotent-Replayed') == 'true' for r in responses), 7)
+        self.assertEqual(self.count('donations'), 1)
+
+    def test_expired_key_creates_new_donation(self):
+        first = self.donate({'amount': 100}, 'key-3').get_json()
+        expired = (datetime.now() - timedelta(hours=ingest.IDEMPOTENCY_TTL_HOURS + 1)).isoformat()
+        with server.db.connection() as conn:
+            conn.execute('UPDATE idempotency_keys SET created_at = ?', (expired,))
+            self.assertEqual(ingest.prune_idempotency_keys(conn), 1)
+
+        second = self.donate({'amount': 100}, 'key-3')
+        self.assertNotIn('Idempotent-Replayed', second.headers)
+        self.assertNotEqual(second.get_json()['donation_id'], first['donation_id'])
+        self.assertEqual(self.count('donations'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
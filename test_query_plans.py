@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+בדיקת תוכניות ביצוע לרשימות האדמין (list_query.py)
+
+לכל צירוף של מסננים ומיון שהדקדוק תומך בו - עם cursor ובלי - מריצים
+EXPLAIN QUERY PLAN על סכמה מלאה (migrations). שאילתה עם מסנן או cursor - וגם
+ה-COUNT(*) שמאחורי X-Total-Count - חייבת להיות SEARCH על אינדקס (לא SCAN, גם
+לא SCAN לאורך אינדקס עם סינון שורה-שורה). רשימה בלי מסננים חייבת לצאת ישירות
+מהאינדקס, בלי מיון זמני, וספירה בלי מסננים - מאינדקס מכסה.
+
+הרצה: python test_query_plans.py   (או pytest)
+"""
+
+import re
+import sqlite3
+import unittest
+from itertools import combinations
+
+import list_query
+import migrations
+
+# ערכים לדוגמה לכל מסנן - מפתח אחד או יותר ב-args
+FILTER_SAMPLES = {
+    'status': {'status': 'new,contacted'},
+    'single_status': {'status': 'completed'},
+    'source': {'source': 'website'},
+    'dates': {'from': '2024-01-01', 'to': '2024-12-31'},
+    'amount': {'min_amount': '50', 'max_amount': '500'},
+}
+
+TABLE_FILTERS = {
+    'registrations': ('status', 'single_status', 'source', 'dates'),
+    'donations': ('status', 'single_status', 'source', 'dates', 'amount'),
+}
+
+
+def filter_combinations(table):
+    names = TABLE_FILTERS[table]
+    for size in range(len(names) + 1):
+        for combo in combinations(names, size):
+            if 'status' in combo and 'single_status' in combo:
+                continue
+            args = {}
+            for name in combo:
+                args.update(FILTER_SAMPLES[name])
+            yield combo, args
+
+
+def plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def full_scans(details, table):
+    return [d for d in details if d.startswith(f'SCAN {table}') and ' USING ' not in d]
+
+
+def non_index_searches(details, table):
+    """גישות לטבלה שאינן SEARCH ... USING [COVERING] INDEX (ריק = תקין)"""
+    accesses = [d for d in details if re.match(rf'(SCAN|SEARCH) {table}\b', d)]
+    if not accesses:
+        return ['no access to ' + table]
+    return [d for d in accesses if not re.match(rf'SEARCH {table} USING (COVERING )?INDEX ', d)]
+
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = sqlite3.connect(':memory:')
+        cls.conn.row_factory = sqlite3.Row
+        migrations.migrate(cls.conn)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_filtered_and_keyset_queries_search_an_index(self):
+        checked = 0
+        for table, sorts in list_query.SORT_COLUMNS.items():
+            for combo, filters in filter_combinations(table):
+                for column in sorts:
+                    for sort in (column, f'-{column}'):
+                        sample = 100 if column == 'amount' else '2024-06-01T00:00:00'
+                        for cursor in (None, list_query.encode_cursor(sort, sample, 10)):
+                            args = dict(filters, sort=sort)
+                            if cursor:
+                                args['cursor'] = cursor
+                            sql, params, _, _ = list_query.page_query(table, ['id', column], args, 50)
+                            details = plan(self.conn, sql, params)
+                            with self.subTest(table=table, filters=combo, sort=sort, cursor=bool(cursor)):
+                                if combo or cursor:
+                                    self.assertEqual(non_index_searches(details, table), [], details)
+                                else:
+                                    self.assertEqual(full_scans(details, table), [], details)
+                            checked += 1
+        self.assertGreater(checked, 100)
+
+    def test_total_count_queries(self):
+        """ה-COUNT(*) של fetch_page (X-Total-Count) לכל צירוף מסננים"""
+        for table in list_query.SORT_COLUMNS:
+            for combo, filters in filter_combinations(table):
+                details = plan(self.conn, *list_query.count_query(table, filters))
+                with self.subTest(table=table, filters=combo):
+                    if combo:
+                        self.assertEqual(non_index_searches(details, table), [], details)
+                    else:
+                        self.assertTrue(details and all('USING COVERING INDEX' in d for d in details), details)
+
+    def test_unfiltered_list_reads_in_index_order(self):
+        for table, sorts in list_query.SORT_COLUMNS.items():
+            for column in sorts:
+                for sort in (column, f'-{column}'):
+                    sql, params, _, _ = list_query.page_query(table, ['id', column], {'sort': sort}, 50)
+                    details = plan(self.conn, sql, params)
+                    with self.subTest(table=table, sort=sort):
+                        self.assertEqual(full_scans(details, table), [], details)
+                        self.assertFalse(any('TEMP B-TREE' in d for d in details), details)
+
+    def test_whitelist_rejects_unknown_columns(self):
+        with self.assertRaises(ValueError):
+            list_query.parse_sort('registrations', 'name; DROP TABLE registrations')
+        with self.assertRaises(ValueError):
+            list_query.parse_sort('registrations', '-amount')
+        with self.assertRaises(ValueError):
+            list_query.where_clause('registrations', {'min_amount': '10'})
+        with self.assertRaises(ValueError):
+            list_query.where_clause('analytics', {'status': 'new'})
+
+    def test_values_are_parameters(self):
+        where, params = list_query.where_clause('donations', {'status': "x') OR 1=1 --,pending", 'min_amount': '5'})
+        self.assertNotIn('OR 1=1', where)
+        self.assertEqual(params, ["x') OR 1=1 --", 'pending', 5.0])
+
+    def test_cursor_is_bound_to_its_sort(self):
+        token = list_query.encode_cursor('-amount', 100, 7)
+        self.assertEqual(list_query.decode_cursor(token, '-amount'), (100, 7))
+        with self.assertRaises(ValueError):
+            list_query.decode_cursor(token, '-created_at')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+בדיקות לאיחוד רישומים כפולים (מיגרציה 6) ול-UPSERT של רישום (ingest.py)
+
+מסד בגרסה 5 עם כפילויות שנבדלות רק בכתיבה (Gmail עם נקודות/+תגית, טלפון עם
+972+) עולה לגרסה האחרונה: נשארת השורה הוותיקה עם הפרטים העדכניים, attempt_count
+הוא סכום הניסיונות, לוגי הפעילות עוברים אליה, והאינדקס הייחודי על email_key
+קיים. האיחוד נשמר באצוות (commit אחרי כל אצווה) ורץ שוב בלי נזק.
+
+הרצה: python test_registration_keys.py   (או pytest)
+"""
+
+import sqlite3
+import unittest
+
+import migrations
+from ingest import canonical_email, canonical_phone, insert_registration
+
+
+def migrate_to(conn, target):
+    for version, _, apply in migrations.MIGRATIONS:
+        if version > target:
+            break
+        apply(conn)
+        conn.execute(f'PRAGMA user_version = {version}')
+        conn.commit()
+
+
+class RegistrationMergeTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        migrate_to(self.conn, 5)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def add(self, name, email, phone, updated_at, attempt_count=1, notes='', status='new'):
+        cursor = self.conn.execute('''
+            INSERT INTO registrations (name, email, phone, status, notes, attempt_count, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, email, phone, status, notes, attempt_count, '2026-01-01T10:00:00', updated_at))
+        self.conn.execute(
+            'INSERT INTO activity_log (lead_id, action, details, created_at) VALUES (?, ?, ?, ?)',
+            (cursor.lastrowid, 'registration', name, updated_at)
+        )
+        return cursor.lastrowid
+
+    def registrations(self):
+        return [dict(row) for row in self.conn.execute('SELECT * FROM registrations ORDER BY id')]
+
+    def test_canonical_keys(self):
+        self.assertEqual(canonical_email(' A.b+x@GMail.com '), 'ab@gmail.com')
+        self.assertEqual(canonical_email('A.b+x@example.com'), 'a.b+x@example.com')
+        for phone in ('+972-50-1234567', '972501234567', '00972 50 123 4567', '050-1234567'):
+            with self.subTest(phone=phone):
+                self.assertEqual(canonical_phone(phone), '0501234567')
+
+    def test_merge_keeps_oldest_row_with_latest_details(self):
+        first = self.add('דוד', 'A.b+x@gmail.com', '+972-50-1234567', '2026-01-01T10:00:00', 2, 'הערה ראשונה')
+        self.add('דוד כהן', 'ab@gmail.com', '050-1234567', '2026-03-01T10:00:00', 1, 'הערה שנייה', 'contacted')
+        other = self.add('שרה', 'sara@example.com', '052-7654321', '2026-02-01T10:00:00')
+        self.conn.commit()
+
+        migrations.migrate(self.conn)
+
+        rows = self.registrations()
+        self.assertEqual([row['id'] for row in rows], [first, other])
+        survivor = rows[0]
+        self.assertEqual(survivor['name'], 'דוד כהן')
+        self.assertEqual(survivor['phone'], '050-1234567')
+        self.assertEqual(survivor['status'], 'contacted')
+        self.assertEqual(survivor['attempt_count'], 3)
+        self.assertEqual(survivor['notes'], 'הערה ראשונה\nהערה שנייה')
+        self.assertEqual((survivor['email_key'], survivor['phone_key']), ('ab@gmail.com', '0501234567'))
+        self.assertEqual(rows[1]['attempt_count'], 1)
+
+        actions = [row[0] for row in self.conn.execute(
+            'SELECT action FROM activity_log WHERE lead_id = ? ORDER BY id', (first,)
+        )]
+        self.assertEqual(actions, ['registration', 'registration', 'merged'])
+
+    def test_unique_index_after_merge(self):
+        self.add('א', 'x.y@gmail.com', '050-1111111', '2026-01-01T10:00:00')
+        self.add('ב', 'xy+news@gmail.com', '050-1111111', '2026-01-02T10:00:00')
+        self.conn.commit()
+        migrations.migrate(self.conn)
+
+        indexes = {row['name']: row['unique'] for row in self.conn.execute('PRAGMA index_list(registrations)')}
+        self.assertEqual(indexes.get('idx_registrations_email_key'), 1)
+        self.assertNotIn('idx_registrations_email_key_merge', indexes)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute(
+                "INSERT INTO registrations (name, email, created_at, updated_at, email_key) VALUES ('ג', 'xy@gmail.com', '', '', 'xy@gmail.com')"
+            )
+
+    def test_merge_commits_per_batch(self):
+        original = migrations.MERGE_BATCH_SIZE
+        migrations.MERGE_BATCH_SIZE = 2
+        try:
+            for group in range(5):
+                for copy in range(3):
+                    self.add(f'g{group}', f'user.{group}+{copy}@gmail.com', '050-0000000', f'2026-01-0{copy + 1}')
+            self.conn.commit()
+            statements = []
+            self.conn.set_trace_callback(statements.append)
+            migrations.migrate(self.conn)
+            self.conn.set_trace_callback(None)
+        finally:
+            migrations.MERGE_BATCH_SIZE = original
+
+        self.assertEqual(len(self.registrations()), 5)
+        self.assertTrue(all(row['attempt_count'] == 3 for row in self.registrations()))
+        # מילוי מפתחות: 8 אצוות, איחוד: 3 אצוות, ועוד ה-commit של סוף כל מיגרציה
+        self.assertGreaterEqual(statements.count('COMMIT'), 8 + 3 + len(migrations.MIGRATIONS) - 5)
+
+    def test_merge_is_idempotent(self):
+        self.add('א', 'q@example.com', '050-1', '2026-01-01T10:00:00')
+        self.add('א', 'Q@example.com', '050-1', '2026-01-02T10:00:00')
+        self.conn.commit()
+        migrations.migrate(self.conn)
+        before = self.registrations()
+        # worker שני שנכנס בין האצוות מריץ את אותה מיגרציה שוב
+        self.conn.execute('BEGIN IMMEDIATE')
+        migrations._v6_registration_keys(self.conn)
+        self.conn.commit()
+        self.assertEqual(self.registrations(), before)
+
+
+class RegistrationUpsertTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        migrations.migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def register(self, name, email, phone):
+        data = {'fullName': name, 'email': email, 'phone': phone, 'emailConsent': True}
+        return insert_registration(self.conn, data, '127.0.0.1', 'test')
+
+    def test_repeat_registration_updates_same_row(self):
+        reg_id, _, attempts = self.register('דוד', 'A.b+x@gmail.com', '+972-50-1234567')
+        self.assertEqual(attempts, 1)
+        again_id, _, attempts = self.register('דוד כהן', 'ab@gmail.com', '050-7654321')
+        self.assertEqual((again_id, attempts), (reg_id, 2))
+
+        rows = [dict(row) for row in self.conn.execute('SELECT * FROM registrations')]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], 'דוד כהן')
+        self.assertEqual(rows[0]['email'], 'A.b+x@gmail.com')
+        self.assertEqual(rows[0]['phone_key'], '0507654321')
+
+    def test_different_people_get_rows(self):
+        first = self.register('א', 'a@example.com', '050-1111111')[0]
+        second = self.register('ב', 'b@example.com', '050-1111111')[0]
+        self.assertNotEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
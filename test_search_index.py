@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+בדיקות לחיפוש בדשבורד (search_index.py, מיגרציה 10)
+
+הנרמול רץ על התוכן שנכנס לאינדקס ולא רק על השאילתה: רשומה שנשמרה עם ניקוד
+נמצאת בלעדיו (ולהפך), ומילה שנשמרה עם אותיות שימוש ("ולמשפחה") נמצאת לפי
+השורש ("משפחה"). השאילתה עצמה לא מאבדת אותיות שורש.
+
+הרצה: python test_search_index.py   (או pytest)
+"""
+
+import sqlite3
+import unittest
+from datetime import datetime
+
+import migrations
+import search_index
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        migrations.migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def add_registration(self, name, notes=''):
+        now = datetime.now().isoformat()
+        cursor = self.conn.execute('''
+            INSERT INTO registrations (name, email, phone, notes, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, f'{abs(hash(name))}@example.com', '050-1234567', notes, now, now))
+        return cursor.lastrowid
+
+    def add_donation(self, donor_name, message):
+        now = datetime.now().isoformat()
+        cursor = self.conn.execute('''
+            INSERT INTO donations (donation_id, amount, donor_name, message, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (f'DON_{donor_name}', 100, donor_name, message, 'completed', now))
+        return cursor.lastrowid
+
+    def found(self, query, kind=None):
+        hits, total = search_index.search(self.conn, query, kind=kind)
+        self.assertEqual(total, len(hits))
+        return [(hit['type'], hit['id']) for hit in hits]
+
+    # --- ניקוד ---
+
+    def test_niqqud_in_content(self):
+        reg_id = self.add_registration('דָּוִד כהן')
+        for query in ('דוד', 'דָּוִד', 'דוד כהן', 'דו'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [('registrations', reg_id)])
+
+    def test_niqqud_in_query_only(self):
+        reg_id = self.add_registration('שרה לוי')
+        self.assertEqual(self.found('שָׂרָה'), [('registrations', reg_id)])
+
+    # --- אותיות שימוש ---
+
+    def test_prefixed_word_in_content(self):
+        reg_id = self.add_registration('משה לוי', 'תודה ולמשפחה')
+        don_id = self.add_donation('רחל', 'לזכר אור בבית הכנסת')
+        for query, expected in (
+            ('משפחה', [('registrations', reg_id)]),
+            ('למשפחה', [('registrations', reg_id)]),
+            ('ולמשפחה', [('registrations', reg_id)]),
+            ('זכר', [('donations', don_id)]),
+            ('בית', [('donations', don_id)]),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), expected)
+
+    def test_snippet_shows_original_word(self):
+        self.add_registration('משה לוי', 'תודה רבה ולמשפחה היקרה')
+        hits, _ = search_index.search(self.conn, 'משפחה')
+        self.assertEqual(hits[0]['snippet'], 'תודה רבה [ולמשפחה] היקרה')
+
+    def test_query_keeps_root_letters(self):
+        self.assertEqual(search_index.build_match('משפחה'), '"משפחה"*')
+        self.assertEqual(search_index.build_match('דָּוִד  כהן'), '"דוד"* "כהן"*')
+        # מילה שמתחילה באות שימוש לא מוצאת מילים אחרות בלי האות
+        self.add_registration('שפחה')
+        self.assertEqual(self.found('משפחה'), [])
+
+    def test_short_words_keep_prefix_letter(self):
+        self.assertEqual(search_index.search_prefixes('לוי מה ולדוד'), 'לדוד דוד')
+
+    # --- טריגרים ---
+
+    def test_update_and_delete_follow_the_row(self):
+        reg_id = self.add_registration('יוסף')
+        self.conn.execute('UPDATE registrations SET notes = ? WHERE id = ?', ('שִׂמְחָה ובְּרָכָה', reg_id))
+        self.assertEqual(self.found('ברכה'), [('registrations', reg_id)])
+        self.assertEqual(self.found('שמחה'), [('registrations', reg_id)])
+        self.conn.execute('DELETE FROM registrations WHERE id = ?', (reg_id,))
+        self.assertEqual(self.found('ברכה'), [])
+
+    def test_rebuild_normalizes_existing_rows(self):
+        # שורות שנכתבו לפני מיגרציה 10 נכנסות לאינדקס מנורמלות
+        reg_id = self.add_registration('אַבְרָהָם', 'והמשפחה')
+        migrations._v10_search_terms(self.conn)
+        self.assertEqual(self.found('אברהם משפחה'), [('registrations', reg_id)])
+
+
+if __name__ == '__main__':
+    unittest.main()
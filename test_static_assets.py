@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+בדיקות להגשת הקבצים הסטטיים והתמונות (static_assets.py, image_variants.py)
+
+אתר זמני עם תמונה אמיתית, תמונה פגומה ו-manifest עם שם מגובב ושם רגיל, מוגש
+דרך Flask test client כמו ב-server.py: בחירת AVIF/WebP/מקור לפי Accept,
+עיגול ?w= לרוחבים הקבועים, Cache-Control לפי סוג השם, ו-404 לתמונה חסרה
+או לנתיב עם '..' (גם כשהקובץ שמחוץ לתיקייה קיים).
+
+הרצה: python test_static_assets.py   (או pytest)
+"""
+
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, request
+
+import image_variants
+from image_variants import ImageVariants, WIDTHS
+from static_assets import StaticAssets, IMMUTABLE_CACHE, REVALIDATE_CACHE
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+HASHED = 'assets/images/logo.0123456789.png'
+PLAIN = 'assets/images/logo.png'
+
+
+def png_bytes(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 160, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@unittest.skipIf(Image is None, 'Pillow לא מותקן')
+class StaticImagesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, 'site')
+        build_dir = os.path.join(self.root, 'dist')
+        os.makedirs(os.path.join(self.root, 'assets', 'images'))
+        os.makedirs(os.path.join(build_dir, 'assets', 'images'))
+
+        logo = png_bytes(400, 200)
+        for path in (os.path.join(self.root, PLAIN), os.path.join(build_dir, HASHED), os.path.join(build_dir, PLAIN)):
+            with open(path, 'wb') as f:
+                f.write(logo)
+        with open(os.path.join(self.root, 'assets', 'images', 'broken.png'), 'wb') as f:
+            f.write(b'not an image')
+        # קובץ מחוץ לשורש האתר
+        with open(os.path.join(self.tmp, 'secret.png'), 'wb') as f:
+            f.write(png_bytes(100, 100))
+
+        entry = {'encodings': [], 'etag': '0123456789abcdef', 'source': PLAIN}
+        with open(os.path.join(build_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({HASHED: dict(entry, immutable=True), PLAIN: dict(entry, immutable=False)}, f)
+
+        self.variants = ImageVariants(self.root, os.path.join(self.tmp, 'cache'))
+        self.assets = StaticAssets(self.root, build_dir, images=self.variants)
+        app = Flask(__name__)
+
+        @app.route('/<path:filename>')
+        def static_files(filename):
+            return self.assets.send(filename, request)
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def get(self, path, accept='*/*'):
+        return self.client.get(path, headers={'Accept': accept})
+
+    def image_size(self, response):
+        with Image.open(io.BytesIO(response.data)) as image:
+            return image.format, image.size
+
+    # --- בחירת פורמט ---
+
+    def test_webp_when_accepted(self):
+        response = self.get(f'/{PLAIN}', 'image/webp,*/*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/webp')
+        self.assertEqual(self.image_size(response), ('WEBP', (400, 200)))
+        self.assertIn('Accept', response.vary)
+
+    def test_avif_when_accepted(self):
+        response = self.get(f'/{PLAIN}', 'image/avif,image/webp,*/*')
+        self.assertEqual(response.status_code, 200)
+        # בלי מקודד AVIF (Pillow בלי avif ובלי avifenc) - WebP
+        self.assertEqual(response.mimetype, 'image/avif' if self.variants.avif else 'image/webp')
+
+    def test_original_without_modern_formats(self):
+        response = self.get(f'/{PLAIN}', 'image/png,*/*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertEqual(self.image_size(response), ('PNG', (400, 200)))
+
+    # --- רוחב ---
+
+    def test_width_snaps_up_to_fixed_widths(self):
+        response = self.get(f'/{PLAIN}?w=100', 'image/webp')
+        self.assertEqual(self.image_size(response), ('WEBP', (WIDTHS[1], 80)))
+
+    def test_width_never_upscales(self):
+        response = self.get(f'/{PLAIN}?w=5000', 'image/png')
+        self.assertEqual(self.image_size(response), ('PNG', (400, 200)))
+
+    def test_etag_per_variant(self):
+        first = self.get(f'/{PLAIN}?w=80', 'image/webp')
+        again = self.client.get(f'/{PLAIN}?w=80', headers={'Accept': 'image/webp', 'If-None-Match': first.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+        other = self.get(f'/{PLAIN}?w=160', 'image/webp')
+        self.assertNotEqual(first.headers['ETag'], other.headers['ETag'])
+
+    # --- Cache-Control ---
+
+    def test_hashed_name_is_immutable(self):
+        for accept in ('image/webp', 'image/png'):
+            with self.subTest(accept=accept):
+                response = self.get(f'/{HASHED}?w=80', accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE)
+
+    def test_plain_name_revalidates(self):
+        for path in (f'/{PLAIN}', f'/{PLAIN}?w=80'):
+            with self.subTest(path=path):
+                response = self.get(path, 'image/webp')
+                self.assertEqual(response.headers['Cache-Control'], REVALIDATE_CACHE)
+
+    # --- נפילה חזרה ---
+
+    def test_missing_image_is_404(self):
+        self.assertEqual(self.get('/assets/images/nope.png?w=80', 'image/webp').status_code, 404)
+
+    def test_traversal_is_404(self):
+        for path in ('/assets/images/..%2f..%2fsecret.png?w=80',
+                     '/assets/images/..%2f..%2f..%2f..%2ftmp%2fsecret.png',
+                     '/assets/images/../../secret.png'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path, 'image/webp').status_code, 404)
+        self.assertFalse(os.path.exists(self.variants.cache_dir))
+
+    def test_corrupt_image_served_as_is(self):
+        response = self.get('/assets/images/broken.png?w=80', 'image/webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'not an image')
+
+    def test_render_failure_falls_back_to_original(self):
+        original = image_variants.ImageVariants._render
+
+        def fail(*args):
+            raise OSError('disk full')
+
+        image_variants.ImageVariants._render = fail
+        try:
+            response = self.get(f'/{PLAIN}?w=80', 'image/webp')
+        finally:
+            image_variants.ImageVariants._render = original
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+GmarUp Write Queue - כתיבה מאוחרת (write-behind) לטבלאות לוג ואנליטיקס
+
+הכנסות בעדיפות נמוכה (analytics, activity_log, donation_activity) נכנסות לתור
+בזיכרון, ו-thread רקע כותב אותן באצוות - טרנזקציה אחת לכל N שורות או T מילישניות.
+רישומים ותרומות לא עוברים כאן - הם נשמרים סינכרונית.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _FlushMarker:
+    """סימון בתור - ה-writer מאותת עליו אחרי שכל מה שלפניו נכתב"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriteBehindQueue:
+    def __init__(self, pool, max_size=10000, batch_size=200, flush_interval=0.05):
+        self.pool = pool
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'overflow': 0,
+            'failed': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0,
+        }
+
+    # --- צד הבקשות ---
+
+    def enqueue(self, sql, params):
+        """מוסיף הכנסה לתור. אם התור מלא - כותב סינכרונית (backpressure)"""
+        if self._stopping:
+            # אחרי stop() אין writer - כותבים ישירות
+            self._write_batch([(sql, params)])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((sql, params))
+            self._stats['enqueued'] += 1
+        except queue.Full:
+            self._stats['overflow'] += 1
+            self._write_batch([(sql, params)])
+
+    def flush(self, timeout=5.0):
+        """ממתין עד שכל מה שנכנס לתור עד עכשיו נכתב למסד"""
+        if not self._is_running():
+            return
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def stats(self):
+        return {
+            'depth': self._queue.qsize(),
+            'max_size': self.max_size,
+            'batch_size': self.batch_size,
+            'flush_interval_ms': int(self.flush_interval * 1000),
+            'running': self._is_running(),
+            **self._stats,
+        }
+
+    # --- מחזור חיים ---
+
+    def _is_running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_started(self):
+        if self._is_running() or self._stopping:
+            return
+        with self._lock:
+            if self._is_running():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # אחרי fork התור של האב לא שייך לנו
+                self._queue = queue.Queue(maxsize=self.max_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout=10.0):
+        """מרוקן את התור ועוצר את ה-writer (נקרא גם ב-atexit)"""
+        if not self._is_running():
+            return
+        self._stopping = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        logger.info(f"💾 תור הכתיבה נסגר - נכתבו {self._stats['written']} שורות")
+
+    # --- ה-writer ---
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._drain_and_exit()
+                return
+
+            batch, markers, stop = [], [], False
+            self._collect(item, batch, markers)
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                self._collect(item, batch, markers)
+                if markers:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for marker in markers:
+                marker.done.set()
+            if stop:
+                self._drain_and_exit()
+                return
+
+    def _collect(self, item, batch, markers):
+        if isinstance(item, _FlushMarker):
+            markers.append(item)
+        else:
+            batch.append(item)
+
+    def _drain_and_exit(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushMarker):
+                item.done.set()
+            elif item is not None:
+                batch.append(item)
+        for i in range(0, len(batch), self.batch_size):
+            self._write_batch(batch[i:i + self.batch_size])
+
+    def _write_batch(self, batch):
+        # קיבוץ לפי SQL כדי להריץ executemany לכל סוג הכנסה
+        grouped = {}
+        for sql, params in batch:
+            grouped.setdefault(sql, []).append(params)
+
+        start = time.perf_counter()
+        try:
+            with self.pool.connection() as conn:
+                for sql, rows in grouped.items():
+                    conn.executemany(sql, rows)
+            self._stats['written'] += len(batch)
+        except Exception as e:
+            logger.error(f"❌ כתיבת אצווה נכשלה ({len(batch)} שורות): {e}")
+            self._write_rows(batch)
+
+        self._stats['batches'] += 1
+        self._stats['last_batch_size'] = len(batch)
+        self._stats['last_batch_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _write_rows(self, batch):
+        # ניסיון חוזר שורה-שורה כדי ששורה פגומה אחת לא תפיל את כל האצווה
+        for sql, params in batch:
+            try:
+                with self.pool.connection() as conn:
+                    conn.execute(sql, params)
+                self._stats['written'] += 1
+            except Exception as e:
+                self._stats['failed'] += 1
+                logger.error(f"❌ שורה נזרקה מתור הכתיבה: {e}")